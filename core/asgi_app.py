@@ -0,0 +1,4 @@
+from src.api.asgi import create_asgi_app
+
+# 使用 ASGI 服务器运行，例如: uvicorn asgi_app:app --port 5001
+app = create_asgi_app()
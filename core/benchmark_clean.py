@@ -0,0 +1,85 @@
+import argparse
+import re
+import time
+import numpy as np
+import pandas as pd
+from src.clean.clean_readers_csv import ID_PATTERN, clean_chunk
+from src.clean.utils import non_blank_mask
+
+
+def make_readers(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    生成带有空值、空白字符串与非法 ID 的模拟读者数据
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.array([f"PCSAS{i % 100000:05d}" for i in range(rows)], dtype=object)
+    ids[rng.random(rows) < 0.02] = "bad id"
+    df = pd.DataFrame(
+        {
+            "NO": np.arange(rows),
+            "ID": ids,
+            "GENDER": rng.choice(
+                ["F", "M", " m ", ""], rows, p=[0.48, 0.48, 0.02, 0.02]
+            ),
+            "ENROLLYEAR": rng.choice(["2016", "2020.0", "1999", ""], rows),
+            "TYPE": rng.choice(["本科生", " 研究生 ", " "], rows, p=[0.6, 0.38, 0.02]),
+            "DEPARTMENT": rng.choice(["音乐系", "法学院", "信息学院"], rows),
+        }
+    )
+    df.loc[rng.random(rows) < 0.01, "DEPARTMENT"] = None
+    return df
+
+
+# 优化前的实现: 逐列过滤空白字符串，逐行匹配 ID
+def legacy_filter(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk = chunk.dropna(how="any")
+    for col in chunk.columns:
+        chunk = chunk[chunk[col].astype(str).str.strip() != ""]
+    ids = chunk["ID"].astype(str).str.strip()
+    return chunk[ids.apply(lambda x: bool(re.match(r"^[A-Z]{3,5}\d{5}$", str(x))))]
+
+
+# 优化后的实现: 一次构建组合掩码，向量化匹配 ID
+def vectorized_filter(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk = chunk[non_blank_mask(chunk)]
+    ids = chunk["ID"].astype(str).str.strip()
+    return chunk[ids.str.fullmatch(ID_PATTERN, na=False)]
+
+
+def measure(func, df: pd.DataFrame, repeat: int):
+    """
+    返回多次执行中的最短耗时与最后一次的结果
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        chunk = df.copy()
+        start = time.perf_counter()
+        result = func(chunk)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(rows: int, repeat: int):
+    df = make_readers(rows)
+    print(f"模拟读者数据: {rows} 行，每项取 {repeat} 次中的最短耗时")
+
+    legacy_time, legacy_result = measure(legacy_filter, df, repeat)
+    new_time, new_result = measure(vectorized_filter, df, repeat)
+    if not legacy_result.index.equals(new_result.index):
+        print("\033[91m错误: 优化前后保留的行不一致\033[0m")
+        return
+    print(f"空白过滤与 ID 校验 (优化前): {rows / legacy_time:,.0f} 行/s")
+    print(f"空白过滤与 ID 校验 (优化后): {rows / new_time:,.0f} 行/s")
+    print(f"加速比: {legacy_time / new_time:.1f}x")
+
+    chunk_time, _ = measure(clean_chunk, df, repeat)
+    print(f"完整分块清洗 clean_chunk: {rows / chunk_time:,.0f} 行/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="读者数据清洗的性能基准")
+    parser.add_argument("--rows", type=int, default=200000, help="模拟数据行数")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复执行次数")
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
@@ -1,30 +1,132 @@
-from src.clean.clean_books_csv import main as booksClean
-from src.clean.clean_readers_csv import main as readersClean
-from src.virtual.virtual_borrow_records import main as borrowRecordsInitial
+import argparse
+import os
+import src.clean.clean_books_csv as books_clean
+import src.clean.clean_readers_csv as readers_clean
+import src.clean.incremental as clean_incremental
+import src.clean.utils as clean_utils
+import src.virtual.virtual_borrow_records as borrow_records
+from src.clean.utils import CSV_ENGINES
 from src.create_dirs import main as ensure_dirs
+from src.pipeline import print_report, run_pipeline
 
 
-def main():
+def _source(module) -> str:
+    return os.path.relpath(module.__file__)
+
+
+def build_stages(
+    workers: int = 1, engine: str = "pandas", incremental: bool = False
+) -> dict:
+    """
+    初始化流程的各个阶段: 图书与读者清洗互不依赖，借阅记录生成依赖两者的清洗结果
+
+    incremental 为 True 时清洗阶段只处理原始文件新增的行，增量与全量的输出内容一致，
+    因此不计入阶段指纹
+    """
+    return {
+        "books": {
+            "run": books_clean.main,
+            "args": (workers, engine, incremental),
+            "inputs": [books_clean.CSV_FILE],
+            "outputs": [
+                books_clean.PARQUET_FILE,
+                books_clean.CLEANED_CSV_FILE,
+                books_clean.STATS_OUTPUT,
+            ],
+            "code": [
+                _source(books_clean),
+                _source(clean_utils),
+                _source(clean_incremental),
+            ],
+            "params": {"engine": engine, "chunk_size": books_clean.CHUNK_SIZE},
+        },
+        "readers": {
+            "run": readers_clean.main,
+            "args": (workers, engine, incremental),
+            "inputs": [readers_clean.CSV_FILE],
+            "outputs": [
+                readers_clean.PARQUET_FILE,
+                readers_clean.CLEANED_CSV_FILE,
+                readers_clean.STATS_OUTPUT,
+            ],
+            "code": [
+                _source(readers_clean),
+                _source(clean_utils),
+                _source(clean_incremental),
+            ],
+            "params": {"engine": engine, "chunk_size": readers_clean.CHUNK_SIZE},
+        },
+        "borrow_records": {
+            "run": borrow_records.main,
+            "inputs": [borrow_records.READERS_FILE, borrow_records.BOOKS_FILE],
+            "outputs": [
+                borrow_records.BORROW_RECORDS_FILE,
+                borrow_records.BORROW_PARQUET_FILE,
+            ],
+            "code": [_source(borrow_records)],
+            "params": {
+                "num_readers": borrow_records.NUM_READERS_TO_GENERATE,
+                "min_borrows": borrow_records.MIN_BORROWS_PER_READER,
+                "max_borrows": borrow_records.MAX_BORROWS_PER_READER,
+                "row_group_size": borrow_records.ROW_GROUP_SIZE,
+            },
+            "depends": ["books", "readers"],
+        },
+    }
+
+
+def main(
+    workers: int = 1,
+    engine: str = "pandas",
+    force: bool = False,
+    incremental: bool = False,
+):
     try:
         print("初始化开始...")
 
         print("正在创建数据目录...")
         ensure_dirs()
 
-        print("正在清洗图书数据...")
-        booksClean()
+        # 输入与参数未变化的阶段直接跳过，图书与读者清洗同时进行
+        results = run_pipeline(build_stages(workers, engine, incremental), force=force)
+        print_report(results)
 
-        print("正在清洗读者数据...")
-        readersClean()
-
-        print("正在生成借阅记录...")
-        borrowRecordsInitial()
-
-        print("\033[4;96m===== 数据清洗与生成已完成 =====\033[0m")
+        if all(result["status"] in ("done", "skipped") for result in results.values()):
+            print("\033[4;96m===== 数据清洗与生成已完成 =====\033[0m")
 
     except Exception as e:
         print(f"\033[91m[出现错误-> {e}]\033[0m")
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="初始化数据: 清洗图书与读者数据并生成借阅记录"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="清洗数据时并行处理分块的进程数，默认为 1 即单进程",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=CSV_ENGINES,
+        default="pandas",
+        help="读取原始 CSV 的引擎，arrow 为 pyarrow 流式多线程读取",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="忽略上次执行的记录，重新执行所有阶段",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="只清洗原始文件末尾新增的行，追加为新的 Parquet 分片并合并统计结果",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(args.workers, args.engine, args.force, args.incremental)
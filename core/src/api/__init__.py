@@ -2,6 +2,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_restx import Api
 from .config import Config
+from ..query.config import Config as QueryConfig
 
 db = SQLAlchemy()
 
@@ -29,4 +30,11 @@ def create_app():
     api.add_namespace(query_ns, path="/query")
     api.add_namespace(ops_ns, path="/operations")
 
+    # 启动时加载进程内图书目录，清洗流程导出新文件后由 get_catalog 按修改时间在后台重新加载；
+    # 不注册导出回调，否则 fork 出的任务进程会在每次清洗后各自重建一份目录
+    if QueryConfig.CATALOG_ENABLED:
+        from ..query.catalog import load_catalog
+
+        load_catalog()
+
     return app
@@ -0,0 +1,269 @@
+import json
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+from ..query.async_connection import close_async_pool
+from ..query.async_query import AsyncLibraryQuery
+from ..query.catalog import get_catalog
+from ..query.config import Config as QueryConfig
+from ..query.library_query import nest_borrow_record
+from .recommendation_service import get_book_recommendations_async
+
+# 与 Flask 应用相同的路径前缀
+API_PREFIX = "/api/v1/query"
+
+READER_FIELDS = ("reader_id", "gender", "enroll_year", "reader_type", "department")
+BOOK_FIELDS = (
+    "book_id",
+    "title",
+    "author",
+    "publisher",
+    "publication_year",
+    "call_no",
+    "language",
+    "doc_type",
+)
+RECOMMENDATION_FIELDS = ("title", "author", "introduction", "reason")
+
+
+class APIResponse(JSONResponse):
+    """
+    日期等无法直接序列化的值转换为字符串，与 Flask 应用的输出保持一致
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(content, ensure_ascii=True, default=str).encode("utf-8")
+
+
+def _abort(status_code: int, message: str) -> APIResponse:
+    return APIResponse({"message": message}, status_code=status_code)
+
+
+def _int_arg(request: Request, name: str, default: int = None) -> int:
+    value = request.query_params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"参数 {name} 必须为整数")
+
+
+def _pick(row: Dict[str, Any], fields: tuple) -> Dict[str, Any]:
+    return {field: row.get(field) for field in fields}
+
+
+def _book_list(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "books": [_pick(book, BOOK_FIELDS) for book in result["books"]],
+        "pagination": result["pagination"],
+    }
+
+
+async def list_books(request: Request):
+    """
+    分页列出所有书籍
+    """
+    try:
+        kwargs = {
+            "page": _int_arg(request, "page", 1),
+            "limit": _int_arg(request, "limit", 20),
+            "sort_by": request.query_params.get("sort_by", "title"),
+            "sort_order": request.query_params.get("sort_order", "asc"),
+            "after": request.query_params.get("after"),
+            "count_mode": request.query_params.get("count_mode", "exact"),
+        }
+        catalog = get_catalog() if QueryConfig.CATALOG_ENABLED else None
+        if catalog is not None:
+            return APIResponse(_book_list(catalog.get_all_books(**kwargs)))
+        async with AsyncLibraryQuery() as query:
+            return APIResponse(_book_list(await query.get_all_books(**kwargs)))
+    except ValueError as e:
+        return _abort(400, str(e))
+
+
+async def search_books(request: Request):
+    """
+    根据多个条件搜索书籍
+    """
+    try:
+        kwargs = {
+            "search": request.query_params.get("search", ""),
+            "language": request.query_params.get("language", ""),
+            "year": _int_arg(request, "year"),
+            "publisher": request.query_params.get("publisher", ""),
+            "author": request.query_params.get("author", ""),
+            "page": _int_arg(request, "page", 1),
+            "limit": _int_arg(request, "limit", 20),
+            "after": request.query_params.get("after"),
+            "count_mode": request.query_params.get("count_mode", "exact"),
+        }
+        catalog = get_catalog() if QueryConfig.CATALOG_ENABLED else None
+        if catalog is not None:
+            return APIResponse(_book_list(catalog.search_books(**kwargs)))
+        async with AsyncLibraryQuery() as query:
+            return APIResponse(_book_list(await query.search_books(**kwargs)))
+    except ValueError as e:
+        return _abort(400, str(e))
+
+
+async def get_reader(request: Request):
+    """
+    根据读者标识符获取读者信息
+    """
+    reader_id = request.path_params["reader_id"]
+    async with AsyncLibraryQuery() as query:
+        reader = await query.get_reader_info(reader_id)
+    if not reader:
+        return _abort(404, f"未找到 ID 为 '{reader_id}' 的读者")
+    return APIResponse(_pick(reader, READER_FIELDS))
+
+
+async def get_reader_history(request: Request):
+    """
+    获取指定读者的近期借阅历史记录
+    """
+    reader_id = request.path_params["reader_id"]
+    try:
+        limit = _int_arg(request, "limit", 10)
+    except ValueError as e:
+        return _abort(400, str(e))
+    async with AsyncLibraryQuery() as query:
+        reader = await query.get_reader_info(reader_id)
+        if not reader:
+            return _abort(404, f"未找到 ID 为 '{reader_id}' 的读者")
+        records = await query.get_reader_borrow_history(reader_id, limit)
+    return APIResponse([nest_borrow_record(record) for record in records])
+
+
+async def get_reader_full_history(request: Request):
+    """
+    获取读者的完整历史记录，包括个人信息、借阅记录和统计数据
+    """
+    reader_id = request.path_params["reader_id"]
+    try:
+        limit = _int_arg(request, "limit", 10)
+    except ValueError as e:
+        return _abort(400, str(e))
+    async with AsyncLibraryQuery() as query:
+        history = await query.get_reader_full_history(reader_id, limit)
+    if not history:
+        return _abort(404, f"未找到 ID 为 '{reader_id}' 的读者")
+    history["borrow_records"] = [
+        nest_borrow_record(record) for record in history["borrow_records"]
+    ]
+    return APIResponse(history)
+
+
+async def get_readers_batch(request: Request):
+    """
+    一次查询获取多位读者的完整历史记录或借阅统计
+    """
+    try:
+        payload = await request.json()
+    except ValueError:
+        return _abort(400, "请求体必须为 JSON")
+    reader_ids = payload.get("reader_ids") if isinstance(payload, dict) else None
+    if not isinstance(reader_ids, list) or not all(
+        isinstance(reader_id, str) for reader_id in reader_ids
+    ):
+        return _abort(400, "reader_ids 必须为字符串列表")
+    if len(reader_ids) > QueryConfig.READER_BATCH_MAX_SIZE:
+        return _abort(400, f"单次最多查询 {QueryConfig.READER_BATCH_MAX_SIZE} 位读者")
+    # 与 Flask 端 batch_request_model 的校验一致，布尔值不视为整数
+    limit = payload.get("limit", 10)
+    if not isinstance(limit, int) or isinstance(limit, bool):
+        return _abort(400, "limit 必须为整数")
+    statistics_only = payload.get("statistics_only", False)
+    if not isinstance(statistics_only, bool):
+        return _abort(400, "statistics_only 必须为布尔值")
+
+    async with AsyncLibraryQuery() as query:
+        if statistics_only:
+            statistics = await query.get_readers_statistics_batch(reader_ids)
+            readers = [
+                {"reader_id": reader_id, "statistics": stats}
+                for reader_id, stats in statistics.items()
+                if stats is not None
+            ]
+            missing = [reader_id for reader_id, s in statistics.items() if s is None]
+            return APIResponse({"readers": readers, "missing": missing})
+        histories = await query.get_readers_history_batch(reader_ids, limit=limit)
+
+    readers = []
+    for reader_id, history in histories.items():
+        if history is None:
+            continue
+        history["reader_id"] = reader_id
+        history["borrow_records"] = [
+            nest_borrow_record(record) for record in history["borrow_records"]
+        ]
+        readers.append(history)
+    missing = [reader_id for reader_id, h in histories.items() if h is None]
+    return APIResponse({"readers": readers, "missing": missing})
+
+
+async def get_reader_recommendations(request: Request):
+    """
+    基于关键词获取书籍推荐，等待模型响应期间不占用工作线程
+    """
+    reader_id = request.path_params["reader_id"]
+    try:
+        count = _int_arg(request, "limit", 10)
+    except ValueError as e:
+        return _abort(400, str(e))
+    try:
+        result = await get_book_recommendations_async(
+            reader_id=reader_id,
+            model=request.query_params.get("model", "ollama"),
+            query=request.query_params.get("query", ""),
+            count=count,
+        )
+        if not result["success"]:
+            return _abort(404, "无法生成推荐，请检查关键词是否有效")
+        return APIResponse(
+            {
+                "success": result["success"],
+                "reader_id": result["reader_id"],
+                "model_used": result["model_used"],
+                "recommendations_count": result["recommendations_count"],
+                "recommendations": [
+                    _pick(rec, RECOMMENDATION_FIELDS)
+                    for rec in result["recommendations"]
+                ],
+            }
+        )
+    except Exception as e:
+        return _abort(500, f"推荐服务出错: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    # 启动时加载进程内图书目录，关闭时释放异步连接池
+    if QueryConfig.CATALOG_ENABLED:
+        from ..query.catalog import load_catalog
+
+        load_catalog()
+    yield
+    await close_async_pool()
+
+
+def create_asgi_app() -> Starlette:
+    """
+    创建查询与推荐接口的 ASGI 应用，路径与响应结构与 Flask 应用相同
+
+    所有数据库访问与模型调用均为异步，单个进程可同时保持大量等待模型响应的推荐请求
+    """
+    routes = [
+        Route("/books", list_books),
+        Route("/books/search", search_books),
+        Route("/readers/batch", get_readers_batch, methods=["POST"]),
+        Route("/readers/{reader_id}", get_reader),
+        Route("/readers/{reader_id}/history", get_reader_history),
+        Route("/readers/{reader_id}/full-history", get_reader_full_history),
+        Route("/readers/{reader_id}/recommendations", get_reader_recommendations),
+    ]
+    return Starlette(routes=[Mount(API_PREFIX, routes=routes)], lifespan=lifespan)
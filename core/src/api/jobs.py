@@ -0,0 +1,293 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from src.clean.clean_books_csv import main as clean_books_main
+from src.clean.clean_readers_csv import main as clean_readers_main
+from src.progress import register_progress_hook, unregister_progress_hook
+from src.virtual.virtual_borrow_records import main as virtual_borrow_main
+
+# 任务记录目录，每个任务一个 JSON 文件，每种任务类型一个锁文件
+JOBS_DIR = os.path.join("data", "jobs")
+# 执行任务的进程数
+JOB_WORKERS = 2
+# 任务进度写入记录文件的最短间隔 (秒)
+PROGRESS_INTERVAL = 1.0
+# 锁文件创建后超过该时间 (秒) 仍未写入任务 ID 时视为失效
+LOCK_WRITE_TIMEOUT = 10.0
+
+# 任务类型 -> 执行函数，需为模块级函数以便在进程池中执行
+JOB_TYPES: Dict[str, Callable[[], Any]] = {
+    "clean_books": clean_books_main,
+    "clean_readers": clean_readers_main,
+    "generate_borrow_records": virtual_borrow_main,
+}
+# 任务状态: queued 等待执行；running 执行中；succeeded 成功；failed 失败
+FINISHED_STATUSES = ("succeeded", "failed")
+
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _job_file(job_id: str, jobs_dir: str) -> str:
+    return os.path.join(jobs_dir, f"{job_id}.json")
+
+
+def _lock_file(job_type: str, jobs_dir: str) -> str:
+    return os.path.join(jobs_dir, f"{job_type}.lock")
+
+
+def _write_job(job: Dict[str, Any], jobs_dir: str):
+    path = _job_file(job["id"], jobs_dir)
+    # 临时文件名带进程号，API 进程与任务进程同时写入时互不覆盖临时文件
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, path)
+
+
+def load_job(job_id: str, jobs_dir: str = JOBS_DIR) -> Optional[Dict[str, Any]]:
+    """
+    读取任务记录，任务不存在或 ID 格式无效时返回 None
+    """
+    if not JOB_ID_PATTERN.fullmatch(job_id or ""):
+        return None
+    try:
+        with open(_job_file(job_id, jobs_dir), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_stale(job: Optional[Dict[str, Any]]) -> bool:
+    """
+    锁的持有任务已结束，或执行它的进程已不存在 (例如服务重启) 时，锁视为失效
+    """
+    if job is None or job["status"] in FINISHED_STATUSES:
+        return True
+    pid = job.get("pid") if job["status"] == "running" else job.get("owner_pid")
+    return not _pid_alive(pid)
+
+
+def _acquire_lock(job_type: str, job_id: str, jobs_dir: str) -> Optional[str]:
+    """
+    以 O_EXCL 创建锁文件，保证同一类型同时只有一个任务；成功返回 None，否则返回正在执行的任务 ID
+    """
+    path = _lock_file(job_type, jobs_dir)
+    # 每轮循环要么取得锁，要么返回持有者，要么清除一个失效的锁
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    holder = f.read().strip()
+                age = time.time() - os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            if not holder:
+                # 其他请求刚创建锁文件还未写入任务 ID
+                if age < LOCK_WRITE_TIMEOUT:
+                    time.sleep(0.01)
+                    continue
+                _release_lock(job_type, "", jobs_dir)
+                continue
+            if not _is_stale(load_job(holder, jobs_dir)):
+                return holder
+            _release_lock(job_type, holder, jobs_dir)
+            continue
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(job_id)
+        return None
+
+
+def _lock_holder(job_type: str, jobs_dir: str) -> Optional[str]:
+    try:
+        with open(_lock_file(job_type, jobs_dir), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _release_lock(job_type: str, job_id: str, jobs_dir: str):
+    """
+    只删除 job_id 持有的锁
+
+    先将锁文件原子地改名为独占的临时文件再检查持有者，检查与删除之间锁不会被替换；
+    持有者不是 job_id 时以硬链接放回原路径，原路径已有新锁时不覆盖
+    """
+    path = _lock_file(job_type, jobs_dir)
+    claimed = f"{path}.{uuid.uuid4().hex}.release"
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return
+    try:
+        with open(claimed, "r", encoding="utf-8") as f:
+            holder = f.read().strip()
+        if holder != job_id:
+            try:
+                os.link(claimed, path)
+            except FileExistsError:
+                pass
+    finally:
+        os.remove(claimed)
+
+
+def _finish(job: Dict[str, Any], jobs_dir: str, error: str = None):
+    """
+    先释放锁再写入结束状态，读到任务结束的请求总能立即提交同类型的新任务
+    """
+    _release_lock(job["type"], job["id"], jobs_dir)
+    job["finished_at"] = time.time()
+    if error is None:
+        job["status"] = "succeeded"
+        job["progress"] = 100.0
+    else:
+        job["status"] = "failed"
+        job["error"] = error
+    _write_job(job, jobs_dir)
+
+
+def _run_job(job_id: str, func: Callable[[], Any], jobs_dir: str):
+    """
+    在工作进程中执行任务，执行期间通过进度回调定期更新任务记录
+    """
+    job = load_job(job_id, jobs_dir)
+    job.update(status="running", pid=os.getpid(), started_at=time.time())
+    _write_job(job, jobs_dir)
+    last_write = time.monotonic()
+
+    def on_progress(rows: int, fraction: float):
+        nonlocal last_write
+        job["rows_processed"] = rows
+        job["progress"] = round(fraction * 100, 1)
+        if time.monotonic() - last_write >= PROGRESS_INTERVAL:
+            _write_job(job, jobs_dir)
+            last_write = time.monotonic()
+
+    register_progress_hook(on_progress)
+    try:
+        func()
+    except Exception as e:
+        _finish(job, jobs_dir, str(e))
+        return
+    finally:
+        unregister_progress_hook(on_progress)
+    _finish(job, jobs_dir)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=JOB_WORKERS)
+        return _executor
+
+
+def _on_done(job_id: str, jobs_dir: str, future):
+    """
+    工作进程异常退出时 (例如被系统终止) 任务无法自行更新记录，由 API 进程标记为失败
+    """
+    global _executor
+    error = future.exception()
+    if error is None:
+        return
+    job = load_job(job_id, jobs_dir)
+    if job is not None and job["status"] not in FINISHED_STATUSES:
+        _finish(job, jobs_dir, f"任务进程异常退出: {error}")
+    with _executor_lock:
+        # 进程池损坏后不再可用，下次提交时重新创建
+        if _executor is not None and getattr(_executor, "_broken", False):
+            _executor = None
+
+
+def submit_job(
+    job_type: str, jobs_dir: str = JOBS_DIR, func: Callable[[], Any] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    创建任务并提交到进程池，立即返回 (任务记录, 是否新建)
+
+    同一类型已有任务在等待或执行时不再创建，返回该任务的记录与 False；
+    func 默认为 JOB_TYPES 中该类型的执行函数
+    """
+    if job_type not in JOB_TYPES and func is None:
+        raise ValueError(f"无效的任务类型: {job_type}，可选 {list(JOB_TYPES)}")
+    os.makedirs(jobs_dir, exist_ok=True)
+    job = {
+        "id": uuid.uuid4().hex,
+        "type": job_type,
+        "status": "queued",
+        "progress": 0.0,
+        "rows_processed": 0,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "error": None,
+        "owner_pid": os.getpid(),
+        "pid": None,
+    }
+    # 先写入任务记录再加锁，其他请求检查锁时总能读到持有者的记录
+    _write_job(job, jobs_dir)
+    holder = _acquire_lock(job_type, job["id"], jobs_dir)
+    if holder is not None:
+        os.remove(_job_file(job["id"], jobs_dir))
+        return load_job(holder, jobs_dir) or {"id": holder, "type": job_type}, False
+
+    try:
+        future = _get_executor().submit(
+            _run_job, job["id"], func or JOB_TYPES[job_type], jobs_dir
+        )
+    except Exception as e:
+        _finish(job, jobs_dir, str(e))
+        raise
+    future.add_done_callback(lambda f: _on_done(job["id"], jobs_dir, f))
+    return job, True
+
+
+def job_summary(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    任务记录的对外表示: 时间为 ISO 格式，附加已耗时与吞吐量 (行/秒)
+    """
+    started, finished = job.get("started_at"), job.get("finished_at")
+    elapsed = None
+    if started is not None:
+        elapsed = round((finished or time.time()) - started, 3)
+    rows = job.get("rows_processed", 0)
+
+    def iso(timestamp):
+        if timestamp is None:
+            return None
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(timestamp))
+
+    return {
+        "job_id": job["id"],
+        "type": job["type"],
+        "status": job.get("status"),
+        "progress": job.get("progress", 0.0),
+        "rows_processed": rows,
+        "throughput": round(rows / elapsed, 1) if elapsed else None,
+        "elapsed_seconds": elapsed,
+        "created_at": iso(job.get("created_at")),
+        "started_at": iso(started),
+        "finished_at": iso(finished),
+        "error": job.get("error"),
+    }
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import re
 import json
@@ -15,20 +16,74 @@ class RecommendationClient(ABC):
     ) -> list:
         pass
 
+    async def get_recommendations_async(
+        self, recent_books: list, query: str = "", limit: int = 5, retries: int = 2
+    ) -> list:
+        """
+        get_recommendations 的异步版本，默认在线程池中执行同步调用
+        """
+        return await asyncio.to_thread(
+            self.get_recommendations, recent_books, query, limit, retries
+        )
+
 
 class OllamaClient(RecommendationClient):
     def get_recommendations(
         self, recent_books: list, query: str = "", limit: int = 5, retries: int = 2
     ) -> list:
         system_prompt = self._get_system_prompt()
+        user_prompt = self._build_user_prompt(recent_books, query, limit)
 
-        # 构建用户提示词结合历史记录和关键词
+        for attempt in range(retries):
+            try:
+                response = ollama.chat(
+                    model=OLLAMA_MODEL,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    stream=False,
+                )
+                recommendation_text = response["message"]["content"]
+                return self._parse_recommendations(recommendation_text)
+            except Exception as e:
+                print(f"Ollama API call failed on attempt {attempt + 1}: {e}")
+        return []
+
+    async def get_recommendations_async(
+        self, recent_books: list, query: str = "", limit: int = 5, retries: int = 2
+    ) -> list:
+        system_prompt = self._get_system_prompt()
+        user_prompt = self._build_user_prompt(recent_books, query, limit)
+
+        # 使用 ollama 的异步客户端，等待模型期间不阻塞事件循环
+        client = ollama.AsyncClient()
+        for attempt in range(retries):
+            try:
+                response = await client.chat(
+                    model=OLLAMA_MODEL,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    stream=False,
+                )
+                recommendation_text = response["message"]["content"]
+                return self._parse_recommendations(recommendation_text)
+            except Exception as e:
+                print(f"Ollama API call failed on attempt {attempt + 1}: {e}")
+        return []
+
+    def _build_user_prompt(self, recent_books: list, query: str, limit: int) -> str:
+        """
+        结合历史记录和关键词构建用户提示词，同步与异步调用共用
+        """
         if recent_books and query:
             # 有关键词和历史记录: 结合推荐
             books_text = "\n".join(
                 [f"- 《{book['title']}》（{book['author']}）" for book in recent_books]
             )
-            user_prompt = f"""
+            return f"""
             我最近阅读了以下书籍: {books_text}
             现在我对关键词含有 "{query}" 的书籍感兴趣，请结合我的阅读历史和这个关键词，为我推荐 {limit} 条相关书籍。请严格按照 {limit} 本的数量进行推荐。"""
         elif recent_books and not query:
@@ -36,31 +91,15 @@ class OllamaClient(RecommendationClient):
             books_text = "\n".join(
                 [f"- 《{book['title']}》（{book['author']}）" for book in recent_books]
             )
-            user_prompt = f"""
+            return f"""
             我最近阅读了以下书籍: {books_text}
             请根据我的阅读历史，为我推荐 {limit} 条可能会感兴趣的新书。请严格按照 {limit} 本的数量进行推荐。"""
         elif not recent_books and query:
             # 只有关键词则纯关键词推荐
-            user_prompt = f"""我对关键词 "{query}" 感兴趣，请为我推荐 {limit} 条相关的优质书籍。请严格按照 {limit} 本的数量进行推荐。"""
+            return f"""我对关键词 "{query}" 感兴趣，请为我推荐 {limit} 条相关的优质书籍。请严格按照 {limit} 本的数量进行推荐。"""
         else:
             # 什么都没有则通用推荐
-            user_prompt = f"""请为我推荐 {limit} 条优质的书籍。请严格按照 {limit} 本的数量进行推荐。"""
-
-        for attempt in range(retries):
-            try:
-                response = ollama.chat(
-                    model=OLLAMA_MODEL,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt},
-                    ],
-                    stream=False,
-                )
-                recommendation_text = response["message"]["content"]
-                return self._parse_recommendations(recommendation_text)
-            except Exception as e:
-                print(f"Ollama API call failed on attempt {attempt + 1}: {e}")
-        return []
+            return f"""请为我推荐 {limit} 条优质的书籍。请严格按照 {limit} 本的数量进行推荐。"""
 
     def _get_system_prompt(self):
         return """你是一位经验丰富的图书管理员，精通图书推荐和阅读指导。
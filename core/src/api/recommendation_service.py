@@ -1,6 +1,7 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from .recommendation_client import get_recommendation_client
-from ..query.library_query import LibraryQuery
+from ..query.async_query import AsyncLibraryQuery
+from ..query.library_query import CachedLibraryQuery, get_or_set_reader_async
 from . import db
 from .models import RecommendationHistory
 
@@ -10,16 +11,9 @@ def get_reader_recent_books(reader_id: str, limit: int = 10) -> list:
     获取指定读者的最近借阅书籍列表
     """
     try:
-        with LibraryQuery() as query:
+        with CachedLibraryQuery() as query:
             borrow_history = query.get_reader_borrow_history(reader_id, limit)
-            recent_books = []
-            for record in borrow_history:
-                book_info = {
-                    "title": record.get("book_title", ""),
-                    "author": record.get("author", ""),
-                }
-                recent_books.append(book_info)
-            return recent_books
+            return _recent_books(borrow_history)
     except Exception as e:
         print(f"查询读者借阅历史时出错: {e}")
         return []
@@ -81,3 +75,82 @@ def get_book_recommendations(
             "recommendations": [],
             "error": str(e),
         }
+
+
+def _recent_books(borrow_history: List[Dict[str, Any]]) -> list:
+    return [
+        {"title": record.get("book_title", ""), "author": record.get("author", "")}
+        for record in borrow_history
+    ]
+
+
+async def get_book_recommendations_async(
+    reader_id: str, model: str = "ollama", query: str = "", count: int = 5
+) -> Dict[str, Any]:
+    """
+    get_book_recommendations 的异步版本，供 ASGI 应用使用，返回结构相同
+
+    借阅历史与 CachedLibraryQuery 共用 reader_cache，等待模型响应期间不占用数据库连接
+    """
+    recent_books = []
+    # 与 CachedLibraryQuery 相同: 查询出错或读者不存在时的空结果不写入缓存
+    cacheable = False
+
+    async def load_borrow_history():
+        nonlocal cacheable
+        async with AsyncLibraryQuery() as library_query:
+            history = await library_query.get_reader_borrow_history(reader_id, 10)
+            exists = bool(history) or (
+                await library_query.get_reader_info(reader_id) is not None
+            )
+            if library_query.db.errors:
+                raise RuntimeError("借阅历史查询失败")
+        cacheable = exists
+        return history
+
+    try:
+        borrow_history = await get_or_set_reader_async(
+            "borrow_history",
+            reader_id,
+            (10,),
+            load_borrow_history,
+            store=lambda result: cacheable,
+        )
+        recent_books = _recent_books(borrow_history)
+    except Exception as e:
+        print(f"查询读者借阅历史时出错: {e}")
+
+    try:
+        client = get_recommendation_client(model)
+        recommendations = await client.get_recommendations_async(
+            recent_books, query, count
+        )
+
+        if recommendations:
+            async with AsyncLibraryQuery() as library_query:
+                saved = await library_query.save_recommendations(
+                    reader_id, model, recommendations
+                )
+            if not saved:
+                raise RuntimeError("保存推荐历史失败")
+
+        return {
+            "success": True if recommendations else False,
+            "reader_id": reader_id,
+            "model_used": model,
+            "query": query,
+            "has_history": len(recent_books) > 0,
+            "recommendations_count": len(recommendations),
+            "recommendations": recommendations,
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "reader_id": reader_id,
+            "model_used": model,
+            "query": query,
+            "has_history": len(recent_books) > 0,
+            "recommendations_count": 0,
+            "recommendations": [],
+            "error": str(e),
+        }
@@ -0,0 +1,97 @@
+import hashlib
+import json
+from functools import wraps
+from flask import make_response, request
+from flask_restx import reqparse
+from src.catalog_version import catalog_version
+from src.query.cache import LRUCache
+from src.query.catalog import get_catalog
+from src.query.config import Config as QueryConfig
+
+# 序列化后的响应缓存，键包含目录版本号，版本递增后旧条目不再命中并被逐步淘汰
+response_cache = LRUCache(
+    max_entries=QueryConfig.RESPONSE_CACHE_SIZE,
+    ttl=QueryConfig.RESPONSE_CACHE_TTL,
+    max_bytes=QueryConfig.RESPONSE_CACHE_MAX_BYTES,
+)
+
+
+def _cache_control() -> str:
+    return f"public, max-age={QueryConfig.RESPONSE_CACHE_MAX_AGE}"
+
+
+def make_etag(endpoint: str, version: int, args: tuple, identity=None) -> str:
+    """
+    由目录版本号、已加载目录的标识与归一化的查询参数生成强 ETag，三者相同时响应内容相同
+    """
+    payload = json.dumps(
+        [endpoint, version, identity, args], ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def loaded_catalog_identity():
+    """
+    启用进程内目录或内存搜索时返回已加载目录的数据修改时间，否则返回 None
+
+    版本号在导出数据时递增，目录随后才在后台重新加载，只按版本号区分会把重新加载前的旧结果
+    缓存在新版本号下
+    """
+    if not (QueryConfig.CATALOG_ENABLED or QueryConfig.SEARCH_BACKEND == "memory"):
+        return None
+    catalog = get_catalog()
+    return None if catalog is None else catalog.loaded_mtime
+
+
+def cached_response(endpoint: str, parser: reqparse.RequestParser):
+    """
+    为返回图书目录数据的 GET 接口添加响应缓存与条件请求支持，放在 marshal_with 之外
+
+    查询参数经 parser 解析并补全默认值后作为缓存键，例如 /books 与 /books?page=1 共用缓存；
+    缓存条目仍在有效期内且请求携带的 If-None-Match 与当前 ETag 一致时直接返回 304，
+    不查询也不序列化；只缓存 200 响应，出错时由原接口照常返回
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not QueryConfig.RESPONSE_CACHE_ENABLED:
+                return func(*args, **kwargs)
+
+            params = tuple(sorted(parser.parse_args().items()))
+            version = catalog_version()
+            identity = loaded_catalog_identity()
+            etag = make_etag(endpoint, version, params, identity)
+            headers = {"Cache-Control": _cache_control()}
+
+            key = (endpoint, version, identity, params)
+            data = response_cache.get(key)
+            # 缓存条目过期后不再返回 304，重新查询以免客户端一直使用过期的内容
+            if data is not None and request.if_none_match.contains(etag):
+                response = make_response("", 304)
+                response.set_etag(etag)
+                response.headers.update(headers)
+                return response
+
+            headers["X-Cache"] = "HIT" if data is not None else "MISS"
+            if data is None:
+                result = func(*args, **kwargs)
+                data, code = (
+                    (result[0], result[1])
+                    if isinstance(result, tuple)
+                    else (result, 200)
+                )
+                if code != 200:
+                    return result
+                # 执行期间版本号或已加载的目录已变化时，结果可能对应旧数据，不写入缓存
+                if (
+                    catalog_version() == version
+                    and loaded_catalog_identity() == identity
+                ):
+                    response_cache.set(key, data)
+            headers["ETag"] = f'"{etag}"'
+            return data, 200, headers
+
+        return wrapper
+
+    return decorator
@@ -1,17 +1,25 @@
+from flask import make_response
 from flask_restx import Namespace, Resource, fields, reqparse
 from .services import (
     get_reader_info,
     get_all_books,
     search_books,
     get_reader_full_history,
+    get_readers_history_batch,
     get_reader_borrow_history,
     get_recommendation_history,
 )
 from .recommendation_service import get_book_recommendations
-from src.clean.clean_books_csv import main as clean_books_main
-from src.clean.clean_readers_csv import main as clean_readers_main
-from src.virtual.virtual_borrow_records import main as virtual_borrow_main
+from src.query.connection_pool import get_pool
+from src.query.prepared import prepared_stats
+from src.query.instrumentation import render_prometheus, slow_query_log
+from src.query.config import Config as QueryConfig
+from src.query.library_query import invalidate_reader, reader_cache
+from src.query.pagination import COUNT_MODES, count_cache
+from src.catalog_version import bump_catalog_version
 from .auth import require_api_key
+from .jobs import job_summary, load_job, submit_job
+from .response_cache import cached_response, response_cache
 
 # 用于数据查询的命名空间
 query_ns = Namespace("查询", description="数据查询操作")
@@ -79,13 +87,54 @@ full_history_model = query_ns.model(
     },
 )
 
+batch_request_model = query_ns.model(
+    "批量读者查询",
+    {
+        "reader_ids": fields.List(
+            fields.String, required=True, description="读者 ID 列表"
+        ),
+        "limit": fields.Integer(default=10, description="每位读者返回的借阅记录数"),
+        "statistics_only": fields.Boolean(
+            default=False, description="只返回借阅统计，不返回读者信息和借阅记录"
+        ),
+    },
+)
+
+batch_history_model = query_ns.model(
+    "批量读者历史",
+    {
+        "reader_id": fields.String(description="读者 ID"),
+        "reader_info": fields.Nested(
+            reader_model, allow_null=True, description="读者个人信息"
+        ),
+        "borrow_records": fields.List(
+            fields.Nested(borrow_record_model), description="借阅记录列表"
+        ),
+        "statistics": fields.Nested(statistics_model, description="借阅统计数据"),
+    },
+)
+
+batch_response_model = query_ns.model(
+    "批量读者查询结果",
+    {
+        "readers": fields.List(
+            fields.Nested(batch_history_model, skip_none=True),
+            description="按请求顺序排列的读者历史",
+        ),
+        "missing": fields.List(fields.String, description="未找到的读者 ID"),
+    },
+)
+
 pagination_model = query_ns.model(
     "分页",
     {
         "page": fields.Integer(description="当前页码"),
         "limit": fields.Integer(description="每页项数"),
-        "total": fields.Integer(description="总项数"),
+        "total": fields.Integer(description="总项数，count_mode 为 none 时为空"),
         "total_pages": fields.Integer(description="总页数"),
+        "has_more": fields.Boolean(description="是否还有下一页"),
+        "next_cursor": fields.String(description="下一页游标，传给 after 参数"),
+        "count_mode": fields.String(description="总数计算方式"),
     },
 )
 
@@ -143,6 +192,16 @@ book_list_parser.add_argument("sort_by", type=str, default="title", help="排序
 book_list_parser.add_argument(
     "sort_order", type=str, default="asc", help="排序顺序 asc/desc"
 )
+book_list_parser.add_argument(
+    "after", type=str, help="上一页返回的 next_cursor，传入后使用游标分页并忽略页码"
+)
+book_list_parser.add_argument(
+    "count_mode",
+    type=str,
+    default="exact",
+    choices=COUNT_MODES,
+    help="总数计算方式 exact/cached/estimate/none",
+)
 
 book_search_parser = reqparse.RequestParser()
 book_search_parser.add_argument(
@@ -154,6 +213,16 @@ book_search_parser.add_argument("publisher", type=str, help="按出版社筛选"
 book_search_parser.add_argument("author", type=str, help="按作者筛选")
 book_search_parser.add_argument("page", type=int, default=1, help="页码")
 book_search_parser.add_argument("limit", type=int, default=20, help="每页项数")
+book_search_parser.add_argument(
+    "after", type=str, help="上一页返回的 next_cursor，传入后使用游标分页并忽略页码"
+)
+book_search_parser.add_argument(
+    "count_mode",
+    type=str,
+    default="exact",
+    choices=COUNT_MODES,
+    help="总数计算方式 exact/cached/estimate/none",
+)
 
 history_parser = reqparse.RequestParser()
 history_parser.add_argument("limit", type=int, default=10, help="要返回的记录数量")
@@ -222,6 +291,33 @@ class ReaderFullHistoryResource(Resource):
         return history_data
 
 
+@query_ns.route("/readers/batch")
+class ReaderBatchResource(Resource):
+    @query_ns.doc("get_readers_batch")
+    @query_ns.expect(batch_request_model, validate=True)
+    @query_ns.marshal_with(batch_response_model)
+    @query_ns.response(400, "请求参数无效")
+    def post(self):
+        """
+        一次查询获取多位读者的完整历史记录或借阅统计
+        """
+        payload = query_ns.payload or {}
+        reader_ids = payload.get("reader_ids") or []
+        if len(reader_ids) > QueryConfig.READER_BATCH_MAX_SIZE:
+            query_ns.abort(
+                400, f"单次最多查询 {QueryConfig.READER_BATCH_MAX_SIZE} 位读者"
+            )
+        histories = get_readers_history_batch(
+            reader_ids,
+            limit=payload.get("limit", 10),
+            statistics_only=payload.get("statistics_only", False),
+        )
+        return {
+            "readers": [h for h in histories.values() if h is not None],
+            "missing": [rid for rid, h in histories.items() if h is None],
+        }
+
+
 @query_ns.route("/readers/<string:reader_id>/recommendations")
 @query_ns.param("reader_id", "读者标识符")
 class ReaderRecommendationsResource(Resource):
@@ -274,83 +370,240 @@ class ReaderRecommendationHistoryResource(Resource):
 class BookListResource(Resource):
     @query_ns.doc("list_books")
     @query_ns.expect(book_list_parser)
+    @query_ns.response(304, "内容未变化")
+    @cached_response("books", book_list_parser)
     @query_ns.marshal_with(book_list_model)
+    @query_ns.response(400, "分页游标无效")
     def get(self):
         """
         分页列出所有书籍
         """
         args = book_list_parser.parse_args()
-        return get_all_books(
-            page=args["page"],
-            limit=args["limit"],
-            sort_by=args["sort_by"],
-            sort_order=args["sort_order"],
-        )
+        try:
+            return get_all_books(
+                page=args["page"],
+                limit=args["limit"],
+                sort_by=args["sort_by"],
+                sort_order=args["sort_order"],
+                after=args["after"],
+                count_mode=args["count_mode"],
+            )
+        except ValueError as e:
+            query_ns.abort(400, str(e))
 
 
 @query_ns.route("/books/search")
 class BookSearchResource(Resource):
     @query_ns.doc("search_books")
     @query_ns.expect(book_search_parser)
+    @query_ns.response(304, "内容未变化")
+    @cached_response("books_search", book_search_parser)
     @query_ns.marshal_with(book_list_model)
+    @query_ns.response(400, "分页游标无效")
     def get(self):
         """
         根据多个条件搜索书籍
         """
         args = book_search_parser.parse_args()
-        return search_books(**args)
+        try:
+            return search_books(**args)
+        except ValueError as e:
+            query_ns.abort(400, str(e))
 
 
 # 数据处理
+def _submit(job_type: str, label: str):
+    """
+    提交后台任务并立即返回任务 ID，同类任务正在执行时返回 409 与该任务的状态
+    """
+    try:
+        job, created = submit_job(job_type)
+    except Exception as e:
+        return {"message": f"提交{label}任务时发生错误: {str(e)}"}, 500
+    summary = job_summary(job) if "status" in job else {"job_id": job["id"]}
+    status_url = ops_ns.apis[0].url_for(JobStatus, job_id=job["id"])
+    if not created:
+        return {
+            "message": f"已有{label}任务正在执行",
+            "status_url": status_url,
+            **summary,
+        }, 409
+    return {
+        "message": f"已提交{label}任务",
+        "status_url": status_url,
+        **summary,
+    }, 202
+
+
 @ops_ns.route("/cleaning/books")
 class CleanBooks(Resource):
     @ops_ns.doc("clean_books", security="apikey")
-    @ops_ns.response(200, "成功清理书籍数据")
+    @ops_ns.response(202, "已提交书籍数据清理任务")
     @ops_ns.response(401, "未经授权")
-    @ops_ns.response(500, "清理书籍数据时出错")
+    @ops_ns.response(409, "已有书籍数据清理任务正在执行")
+    @ops_ns.response(500, "提交书籍数据清理任务时出错")
     @require_api_key
     def post(self):
         """
-        触发书籍数据集的清理流程
+        在后台触发书籍数据集的清理流程，返回任务 ID
         """
-        try:
-            clean_books_main()
-            return {"message": "成功触发书籍数据清理"}, 200
-        except Exception as e:
-            return {"message": f"清理书籍数据时发生错误: {str(e)}"}, 500
+        return _submit("clean_books", "书籍数据清理")
 
 
 @ops_ns.route("/cleaning/readers")
 class CleanReaders(Resource):
     @ops_ns.doc("clean_readers", security="apikey")
-    @ops_ns.response(200, "成功清理读者数据")
+    @ops_ns.response(202, "已提交读者数据清理任务")
     @ops_ns.response(401, "未经授权")
-    @ops_ns.response(500, "清理读者数据时出错")
+    @ops_ns.response(409, "已有读者数据清理任务正在执行")
+    @ops_ns.response(500, "提交读者数据清理任务时出错")
     @require_api_key
     def post(self):
         """
-        触发读者数据集的清理流程
+        在后台触发读者数据集的清理流程，返回任务 ID
         """
-        try:
-            clean_readers_main()
-            return {"message": "成功触发读者数据清理"}, 200
-        except Exception as e:
-            return {"message": f"清理读者数据时发生错误: {str(e)}"}, 500
+        return _submit("clean_readers", "读者数据清理")
 
 
 @ops_ns.route("/virtual/borrow-records")
 class GenerateBorrowRecords(Resource):
     @ops_ns.doc("generate_borrow_records", security="apikey")
-    @ops_ns.response(200, "成功生成虚拟借阅记录")
+    @ops_ns.response(202, "已提交虚拟借阅记录生成任务")
     @ops_ns.response(401, "未经授权")
-    @ops_ns.response(500, "生成虚拟借阅记录时出错")
+    @ops_ns.response(409, "已有虚拟借阅记录生成任务正在执行")
+    @ops_ns.response(500, "提交虚拟借阅记录生成任务时出错")
     @require_api_key
     def post(self):
         """
-        触发虚拟借阅记录的生成流程
+        在后台触发虚拟借阅记录的生成流程，返回任务 ID
         """
-        try:
-            virtual_borrow_main()
-            return {"message": "成功触发虚拟借阅记录的生成"}, 200
-        except Exception as e:
-            return {"message": f"生成虚拟借阅记录时发生错误: {str(e)}"}, 500
+        return _submit("generate_borrow_records", "虚拟借阅记录生成")
+
+
+@ops_ns.route("/jobs/<string:job_id>")
+@ops_ns.param("job_id", "任务 ID")
+class JobStatus(Resource):
+    @ops_ns.doc("get_job_status", security="apikey")
+    @ops_ns.response(200, "成功获取任务状态")
+    @ops_ns.response(401, "未经授权")
+    @ops_ns.response(404, "任务不存在")
+    @require_api_key
+    def get(self, job_id):
+        """
+        获取后台任务的状态、进度百分比、已处理行数与吞吐量
+        """
+        job = load_job(job_id)
+        if job is None:
+            ops_ns.abort(404, f"未找到 ID 为 '{job_id}' 的任务")
+        return job_summary(job), 200
+
+
+@ops_ns.route("/db/pool")
+class DatabasePoolStats(Resource):
+    @ops_ns.doc("get_db_pool_stats", security="apikey")
+    @ops_ns.response(200, "成功获取连接池统计")
+    @ops_ns.response(401, "未经授权")
+    @require_api_key
+    def get(self):
+        """
+        获取数据库连接池的使用统计与预备语句计数，用于评估连接池容量与语句复用情况
+        """
+        return {**get_pool().stats(), "prepared_statements": prepared_stats()}, 200
+
+
+@ops_ns.route("/cache/readers")
+class ReaderCacheStats(Resource):
+    @ops_ns.doc("get_reader_cache_stats", security="apikey")
+    @ops_ns.response(200, "成功获取读者缓存统计")
+    @ops_ns.response(401, "未经授权")
+    @require_api_key
+    def get(self):
+        """
+        获取读者查询缓存的容量与命中统计
+        """
+        return reader_cache.stats(), 200
+
+    @ops_ns.doc("clear_reader_cache", security="apikey")
+    @ops_ns.response(200, "成功清空读者缓存")
+    @ops_ns.response(401, "未经授权")
+    @require_api_key
+    def delete(self):
+        """
+        清空全部读者查询缓存，例如批量导入借阅记录之后
+        """
+        reader_cache.clear()
+        return {"message": "读者缓存已清空"}, 200
+
+
+@ops_ns.route("/cache/readers/<string:reader_id>")
+@ops_ns.param("reader_id", "读者标识符")
+class ReaderCacheInvalidate(Resource):
+    @ops_ns.doc("invalidate_reader_cache", security="apikey")
+    @ops_ns.response(200, "成功失效读者缓存")
+    @ops_ns.response(401, "未经授权")
+    @require_api_key
+    def delete(self, reader_id):
+        """
+        失效指定读者的全部缓存，例如写入新的借阅记录之后
+        """
+        removed = invalidate_reader(reader_id)
+        return {"message": f"已失效读者 {reader_id} 的 {removed} 条缓存"}, 200
+
+
+@ops_ns.route("/cache/catalog")
+class CatalogCacheInvalidate(Resource):
+    @ops_ns.doc("invalidate_catalog_cache", security="apikey")
+    @ops_ns.response(200, "成功递增目录版本号")
+    @ops_ns.response(401, "未经授权")
+    @require_api_key
+    def post(self):
+        """
+        递增目录版本号并清空本进程的响应缓存，供直接写入 books 表的外部服务在写入后调用
+
+        版本号保存在共享的版本文件中，其他工作进程的缓存键与 ETag 随之变化
+        """
+        version = bump_catalog_version()
+        response_cache.clear()
+        return {"message": "图书目录缓存已失效", "catalog_version": version}, 200
+
+
+@ops_ns.route("/metrics")
+class Metrics(Resource):
+    @ops_ns.doc("get_metrics", security="apikey")
+    @ops_ns.produces(["text/plain"])
+    @ops_ns.response(200, "成功获取监控指标")
+    @ops_ns.response(401, "未经授权")
+    @require_api_key
+    def get(self):
+        """
+        以 Prometheus 文本格式导出查询耗时、连接池、预备语句与缓存指标
+        """
+        text = render_prometheus(
+            [
+                ("db_pool", {}, get_pool().stats()),
+                ("db_prepared", {}, prepared_stats()),
+                ("cache", {"cache": "reader"}, reader_cache.stats()),
+                ("cache", {"cache": "count"}, count_cache.stats()),
+                ("cache", {"cache": "response"}, response_cache.stats()),
+            ]
+        )
+        response = make_response(text, 200)
+        response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+        return response
+
+
+@ops_ns.route("/metrics/slow-queries")
+class SlowQueries(Resource):
+    @ops_ns.doc("get_slow_queries", security="apikey")
+    @ops_ns.response(200, "成功获取慢查询记录")
+    @ops_ns.response(401, "未经授权")
+    @require_api_key
+    def get(self):
+        """
+        获取最近的慢查询记录，参数已脱敏
+        """
+        return {
+            "threshold": slow_query_log.threshold,
+            "total": slow_query_log.total,
+            "queries": slow_query_log.entries(),
+        }, 200
@@ -1,6 +1,27 @@
 from .models import Reader, Book, BorrowRecord, RecommendationHistory
 from . import db
-from sqlalchemy import or_, func
+from sqlalchemy import or_, and_, func, tuple_, text, cast, literal_column
+from sqlalchemy.dialects.postgresql import REAL, TSQUERY
+from ..query.pagination import (
+    VALID_SORT_FIELDS,
+    build_pagination,
+    decode_cursor,
+    encode_cursor,
+    normalize_filters,
+    resolve_total,
+    validate_page,
+)
+from ..query.config import Config as QueryConfig
+from ..query.search import build_tsquery, get_memory_index, resolve_backend
+from ..query.catalog import get_catalog
+from ..query.library_query import (
+    READER_HISTORY_QUERY,
+    READERS_HISTORY_BATCH_QUERY,
+    READERS_STATISTICS_BATCH_QUERY,
+    nest_borrow_record,
+    parse_reader_history,
+    parse_reader_statistics,
+)
 
 
 def get_reader_info(reader_id: str):
@@ -10,30 +31,147 @@ def get_reader_info(reader_id: str):
     return db.session.get(Reader, reader_id)
 
 
-def get_all_books(
-    page: int = 1, limit: int = 20, sort_by: str = "title", sort_order: str = "asc"
-):
+def _keyset_filter(sort_column, descending: bool, sort_value, book_id):
+    """
+    生成 (排序列, book_id) 越过游标位置的过滤条件，NULL 的排序位置与 PostgreSQL 一致
+    """
+    if not descending:
+        if sort_value is None:
+            return and_(sort_column.is_(None), Book.book_id > book_id)
+        return or_(
+            tuple_(sort_column, Book.book_id) > tuple_(sort_value, book_id),
+            sort_column.is_(None),
+        )
+    if sort_value is None:
+        return or_(
+            and_(sort_column.is_(None), Book.book_id < book_id),
+            sort_column.isnot(None),
+        )
+    return tuple_(sort_column, Book.book_id) < tuple_(sort_value, book_id)
+
+
+def _estimate_books_count():
     """
-    使用 SQLAlchemy ORM 检索所有图书的分页列表
+    使用 pg_class.reltuples 估算 books 表行数
     """
-    sort_column = getattr(Book, sort_by, Book.title)
-    order = sort_column.desc() if sort_order.lower() == "desc" else sort_column.asc()
+    return db.session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'books'::regclass")
+    ).scalar()
 
-    pagination = Book.query.order_by(order).paginate(
-        page=page, per_page=limit, error_out=False
+
+def _paginate(
+    query,
+    sort_by: str,
+    descending: bool,
+    page: int,
+    limit: int,
+    after,
+    filters: tuple,
+    count_mode: str,
+    rank=None,
+):
+    """
+    按页码或 after 游标分页，游标模式使用键集定位而不是 OFFSET
+
+    传入相关度表达式 rank 时按 (相关度降序, 排序列, book_id) 排列，游标同时编码相关度
+    """
+    validate_page(page, limit)
+    sort_column = getattr(Book, sort_by)
+    cursor = None
+    if after:
+        cursor = decode_cursor(after, "rank" if rank is not None else sort_by)
+    total = resolve_total(
+        count_mode,
+        "books",
+        filters,
+        lambda: query.order_by(None).count(),
+        _estimate_books_count,
     )
 
+    ranked = rank is not None
+    if ranked:
+        query = query.add_columns(rank.label("rank")).order_by(
+            rank.desc(), sort_column.asc().nulls_last(), Book.book_id.asc()
+        )
+    # 显式指定 NULL 位置，与键集条件及 PostgreSQL 的默认行为保持一致
+    elif descending:
+        query = query.order_by(sort_column.desc().nulls_first(), Book.book_id.desc())
+    else:
+        query = query.order_by(sort_column.asc().nulls_last(), Book.book_id.asc())
+
+    if cursor and ranked:
+        (rank_value, title), last_id = cursor
+        rank_value = cast(rank_value, REAL)
+        query = query.filter(
+            or_(
+                rank < rank_value,
+                and_(
+                    rank == rank_value,
+                    _keyset_filter(sort_column, False, title, last_id),
+                ),
+            )
+        )
+    elif cursor:
+        query = query.filter(_keyset_filter(sort_column, descending, *cursor))
+
+    # 多取一行用于判断是否还有下一页
+    if cursor:
+        rows = query.limit(limit + 1).all()
+    else:
+        rows = query.limit(limit + 1).offset((page - 1) * limit).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    books = [row[0] for row in rows] if ranked else rows
+
+    next_cursor = None
+    if books and has_more:
+        last = books[-1]
+        if ranked:
+            sort_value = [rows[-1].rank, getattr(last, sort_by)]
+            next_cursor = encode_cursor("rank", sort_value, last.book_id)
+        else:
+            sort_value = getattr(last, sort_by)
+            next_cursor = encode_cursor(sort_by, sort_value, last.book_id)
+
     return {
-        "books": pagination.items,
-        "pagination": {
-            "page": pagination.page,
-            "limit": pagination.per_page,
-            "total": pagination.total,
-            "total_pages": pagination.pages,
-        },
+        "books": books,
+        "pagination": build_pagination(
+            None if after else page, limit, total, has_more, next_cursor, count_mode
+        ),
     }
 
 
+def get_all_books(
+    page: int = 1,
+    limit: int = 20,
+    sort_by: str = "title",
+    sort_order: str = "asc",
+    after: str = None,
+    count_mode: str = "exact",
+):
+    """
+    使用 SQLAlchemy ORM 检索所有图书的分页列表，启用进程内目录时直接由内存提供
+    """
+    if QueryConfig.CATALOG_ENABLED:
+        catalog = get_catalog()
+        if catalog is not None:
+            return catalog.get_all_books(
+                page, limit, sort_by, sort_order, after, count_mode
+            )
+
+    sort_by = sort_by.lower() if sort_by.lower() in VALID_SORT_FIELDS else "title"
+    return _paginate(
+        Book.query,
+        sort_by,
+        sort_order.lower() == "desc",
+        page,
+        limit,
+        after,
+        (),
+        count_mode,
+    )
+
+
 def search_books(
     search: str = "",
     language: str = "",
@@ -42,21 +180,72 @@ def search_books(
     author: str = "",
     page: int = 1,
     limit: int = 20,
+    after: str = None,
+    count_mode: str = "exact",
 ):
     """
-    使用 SQLAlchemy ORM 根据多个条件搜索图书
+    使用 SQLAlchemy ORM 根据多个条件搜索图书，搜索词的匹配方式由 SEARCH_BACKEND 决定，
+    启用进程内目录时直接由内存提供
     """
+    if QueryConfig.CATALOG_ENABLED:
+        catalog = get_catalog()
+        if catalog is not None:
+            return catalog.search_books(
+                search,
+                language,
+                year,
+                publisher,
+                author,
+                page,
+                limit,
+                after,
+                count_mode,
+            )
+
+    backend = resolve_backend(
+        QueryConfig.SEARCH_BACKEND,
+        lambda sql: db.session.execute(text(sql)).scalar(),
+    )
+    if backend == "memory":
+        index = get_memory_index()
+        if index is not None:
+            return index.search_books(
+                search,
+                language,
+                year,
+                publisher,
+                author,
+                page,
+                limit,
+                after,
+                count_mode,
+            )
+        backend = "ilike"
+
     query = Book.query
+    rank = None
 
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Book.title.ilike(search_term),
-                Book.author.ilike(search_term),
-                Book.call_no.ilike(search_term),
+        tsquery = build_tsquery(search) if backend == "fulltext" else None
+        if tsquery is not None:
+            search_tsv = literal_column("books.search_tsv")
+            query = query.filter(search_tsv.op("@@")(cast(tsquery, TSQUERY)))
+            rank = func.ts_rank(search_tsv, cast(tsquery, TSQUERY))
+        else:
+            search_term = f"%{search}%"
+            query = query.filter(
+                or_(
+                    Book.title.ilike(search_term),
+                    Book.author.ilike(search_term),
+                    Book.call_no.ilike(search_term),
+                )
             )
-        )
+            if backend == "trigram":
+                rank = func.greatest(
+                    func.similarity(Book.title, search),
+                    func.similarity(Book.author, search),
+                    func.similarity(Book.call_no, search),
+                )
     if language:
         query = query.filter(Book.language == language)
     if year:
@@ -66,19 +255,17 @@ def search_books(
     if author:
         query = query.filter(Book.author.ilike(f"%{author}%"))
 
-    pagination = query.order_by(Book.title.asc()).paginate(
-        page=page, per_page=limit, error_out=False
+    filters = normalize_filters(
+        search=search,
+        language=language,
+        year=year,
+        publisher=publisher,
+        author=author,
+        backend=backend if search else None,
+    )
+    return _paginate(
+        query, "title", False, page, limit, after, filters, count_mode, rank
     )
-
-    return {
-        "books": pagination.items,
-        "pagination": {
-            "page": pagination.page,
-            "limit": pagination.per_page,
-            "total": pagination.total,
-            "total_pages": pagination.pages,
-        },
-    }
 
 
 def get_reader_borrow_history(reader_id: str, limit: int = 10):
@@ -129,19 +316,63 @@ def get_reader_statistics(reader_id: str):
 def get_reader_full_history(reader_id: str, limit: int = 10):
     """
     检索读者的完整历史记录，包括个人信息、借阅记录和统计数据
+
+    与 LibraryQuery 共用 READER_HISTORY_QUERY，一次往返取回全部数据
     """
-    reader_info = get_reader_info(reader_id)
-    if not reader_info:
+    rows = _execute_driver_sql(
+        READER_HISTORY_QUERY, {"reader_id": reader_id, "limit": limit}
+    )
+    history = parse_reader_history(rows[0] if rows else None)
+    if not history:
         return None
 
-    borrow_records = get_reader_borrow_history(reader_id, limit)
-    statistics = get_reader_statistics(reader_id)
+    history["borrow_records"] = [
+        nest_borrow_record(record) for record in history["borrow_records"]
+    ]
+    return history
 
-    return {
-        "reader_info": reader_info,
-        "borrow_records": borrow_records,
-        "statistics": statistics,
-    }
+
+def get_readers_history_batch(
+    reader_ids: list, limit: int = 10, statistics_only: bool = False
+):
+    """
+    一次查询检索多位读者的完整历史记录，statistics_only 为真时只统计借阅数据
+
+    返回以读者 ID 为键、按传入顺序排列的字典，不存在的读者对应 None
+    """
+    reader_ids = list(dict.fromkeys(reader_ids))
+    if statistics_only:
+        result = {reader_id: None for reader_id in reader_ids}
+        rows = _execute_driver_sql(
+            READERS_STATISTICS_BATCH_QUERY, {"reader_ids": reader_ids}
+        )
+        for row in rows:
+            result[row["reader_id"]] = {
+                "reader_id": row["reader_id"],
+                "statistics": parse_reader_statistics(row),
+            }
+        return result
+
+    result = {reader_id: None for reader_id in reader_ids}
+    rows = _execute_driver_sql(
+        READERS_HISTORY_BATCH_QUERY, {"reader_ids": reader_ids, "limit": limit}
+    )
+    for row in rows:
+        history = parse_reader_history(row)
+        history["reader_id"] = row["reader_id"]
+        history["borrow_records"] = [
+            nest_borrow_record(record) for record in history["borrow_records"]
+        ]
+        result[row["reader_id"]] = history
+    return result
+
+
+def _execute_driver_sql(query: str, params: dict) -> list:
+    """
+    在当前会话的连接上执行 psycopg2 风格参数的 SQL，与 LibraryQuery 共用语句
+    """
+    result = db.session.connection().exec_driver_sql(query, params)
+    return [dict(row) for row in result.mappings()]
 
 
 def get_recommendation_history(reader_id: str, limit: int = 10):
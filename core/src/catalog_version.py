@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+# 图书目录的版本号，清洗流程导出图书数据或导入数据库后递增，API 据此生成 ETag
+VERSION_FILE = os.path.join("data", "catalog_version")
+# 递增版本号时持有的锁文件超过该时间 (秒) 视为失效
+LOCK_TIMEOUT = 10.0
+
+# 按文件的 inode 与修改时间缓存读取结果，版本未变化时每次只需 stat，
+# 版本文件每次递增都被替换为新文件，inode 随之变化
+_cached: Tuple[Optional[tuple], int] = (None, 0)
+_cached_lock = threading.Lock()
+
+
+def catalog_version(version_file: str = None) -> int:
+    """
+    返回当前的目录版本号，版本文件不存在时为 0
+    """
+    global _cached
+    version_file = version_file or VERSION_FILE
+    try:
+        stat = os.stat(version_file)
+    except FileNotFoundError:
+        return 0
+    signature = (version_file, stat.st_ino, stat.st_mtime_ns)
+    with _cached_lock:
+        if _cached[0] == signature:
+            return _cached[1]
+    try:
+        with open(version_file, "r", encoding="utf-8") as f:
+            version = int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+    with _cached_lock:
+        _cached = (signature, version)
+    return version
+
+
+def bump_catalog_version(version_file: str = None) -> int:
+    """
+    递增目录版本号并返回新版本号
+
+    以 O_EXCL 锁文件串行化多个进程的递增，保证每次递增都得到不同的版本号
+    """
+    version_file = version_file or VERSION_FILE
+    os.makedirs(os.path.dirname(version_file) or ".", exist_ok=True)
+    lock_file = f"{version_file}.lock"
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        try:
+            fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() >= deadline:
+                # 持有锁的进程异常退出，清除失效的锁
+                try:
+                    os.remove(lock_file)
+                except FileNotFoundError:
+                    pass
+                deadline = time.monotonic() + LOCK_TIMEOUT
+            time.sleep(0.01)
+    try:
+        try:
+            with open(version_file, "r", encoding="utf-8") as f:
+                version = int(f.read().strip() or 0) + 1
+        except (FileNotFoundError, ValueError):
+            version = 1
+        tmp_file = f"{version_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write(str(version))
+        os.replace(tmp_file, version_file)
+    finally:
+        os.close(fd)
+        os.remove(lock_file)
+    print(f"图书目录版本已更新 -> {version}")
+    return version
@@ -1,55 +1,110 @@
 import pandas as pd
+import pyarrow as pa
 import json
 import os
-from .utils import export_to_parquet, export_to_csv
+from .incremental import (
+    complete_end,
+    count_lines,
+    csv_watermark,
+    load_counters,
+    load_state,
+    open_delta,
+    resume_offset,
+    save_counters,
+    save_state,
+)
+from ..catalog_version import bump_catalog_version
+from ..progress import has_progress_hooks, report_progress
+from .utils import (
+    ChunkedExporter,
+    ValueCounters,
+    as_string,
+    map_chunks,
+    non_blank_mask,
+    read_csv_chunks,
+)
 
 # 文件路径配置
 CSV_FILE = os.path.join("data", "original", "books.csv")
 PARQUET_FILE = os.path.join("data", "cleaned", "parquet", "books.parquet")
 CLEANED_CSV_FILE = os.path.join("data", "cleaned", "csv", "books_cleaned.csv")
 STATS_OUTPUT = os.path.join("data", "cleaned", "stats", "books_stats.json")
+# 增量清洗的状态: 水位线与取值计数
+STATE_FILE = os.path.join("data", "cleaned", "state", "books_state.json")
+COUNTS_FILE = os.path.join("data", "cleaned", "state", "books_counts.json")
 CHUNK_SIZE = 50000
+# 统计取值分布的字段
+STATS_COLUMNS = ["LANGUAGE", "DOCTYPE", "PUBLISHER", "YEAR"]
+# arrow 引擎读取时的列类型，数值字段按字符串读取后在清洗时转换
+COLUMN_TYPES = {
+    "NO": pa.string(),
+    "ID": pa.string(),
+    "TITLE": pa.string(),
+    "AUTHOR": pa.string(),
+    "PUBLISHER": pa.string(),
+    "YEAR": pa.string(),
+    "CALLNO": pa.string(),
+    "LANGUAGE": pa.string(),
+    "DOCTYPE": pa.string(),
+}
+
+
+# 清洗单个分块，只依赖分块自身的数据，可在工作进程中执行
+def clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    # 删除任何字段为空或为空字符串的记录
+    chunk = chunk[non_blank_mask(chunk)]
+
+    # NO 字段: 只保留能转换为整数的记录，arrow 引擎按字符串读取，脏数据不会使整个读取失败
+    if "NO" in chunk.columns:
+        chunk["NO"] = pd.to_numeric(chunk["NO"], errors="coerce")
+        chunk.dropna(subset=["NO"], inplace=True)
+        chunk = chunk[chunk["NO"] == chunk["NO"].astype("int64")]
+        chunk["NO"] = chunk["NO"].astype("int64")
+
+    # YEAR 字段: 只保留能转换为整数的记录
+    if "YEAR" in chunk.columns:
+        chunk["YEAR"] = pd.to_numeric(chunk["YEAR"], errors="coerce")
+        chunk.dropna(subset=["YEAR"], inplace=True)
+        chunk = chunk[chunk["YEAR"] == chunk["YEAR"].astype(int)]
+        chunk["YEAR"] = chunk["YEAR"].astype(int)
+
+    # PUBLISHER 字段: 去除末尾逗号和空格
+    if "PUBLISHER" in chunk.columns:
+        chunk["PUBLISHER"] = as_string(chunk["PUBLISHER"]).str.rstrip(", ")
+
+    # 语言和文献类型字段转为字符串
+    for col in ["LANGUAGE", "DOCTYPE"]:
+        if col in chunk.columns:
+            chunk[col] = as_string(chunk[col])
+
+    return chunk
+
+
+def _clean_counted(chunk: pd.DataFrame):
+    return len(chunk), clean_chunk(chunk)
+
+
+# 逐块清洗 CSV，按文件顺序返回 (原始记录数, 清洗后的分块)
+def iter_cleaned_chunks(workers: int = 1, csv_file=None, engine: str = "pandas"):
+    reader = read_csv_chunks(csv_file or CSV_FILE, CHUNK_SIZE, engine, COLUMN_TYPES)
+    yield from map_chunks(_clean_counted, reader, workers)
+
+
+def _print_summary(total_original: int, total_cleaned: int):
+    print(
+        f"原始记录数: {total_original} 清洗后记录数: {total_cleaned} 删除记录数: {total_original - total_cleaned}",
+    )
 
 
-# 清洗 CSV 并返回 DataFrame
-def clean_csv_to_dataframe():
+# 清洗 CSV 并返回 DataFrame，workers 大于 1 时多进程并行清洗各分块
+def clean_csv_to_dataframe(
+    workers: int = 1, csv_file: str = None, engine: str = "pandas"
+):
     chunks = []
     total_original = 0
-    total_cleaned = 0
-
-    for chunk in pd.read_csv(
-        CSV_FILE,
-        encoding="utf-8",
-        chunksize=CHUNK_SIZE,
-        on_bad_lines="skip",
-    ):
-        total_original += len(chunk)
-
-        # 删除字段为空的记录
-        chunk.dropna(how="any", inplace=True)
-
-        # 删除任何字段为空字符串的记录
-        for col in chunk.columns:
-            chunk = chunk[chunk[col].astype(str).str.strip() != ""]
-
-        # YEAR 字段: 只保留能转换为整数的记录
-        if "YEAR" in chunk.columns:
-            chunk["YEAR"] = pd.to_numeric(chunk["YEAR"], errors="coerce")
-            chunk.dropna(subset=["YEAR"], inplace=True)
-            chunk = chunk[chunk["YEAR"] == chunk["YEAR"].astype(int)]
-            chunk["YEAR"] = chunk["YEAR"].astype(int)
-
-        # PUBLISHER 字段: 去除末尾逗号和空格
-        if "PUBLISHER" in chunk.columns:
-            chunk["PUBLISHER"] = chunk["PUBLISHER"].astype(str).str.rstrip(", ")
-
-        # 语言和文献类型字段转为字符串
-        for col in ["LANGUAGE", "DOCTYPE"]:
-            if col in chunk.columns:
-                chunk[col] = chunk[col].astype(str)
-
-        total_cleaned += len(chunk)
 
+    for original, chunk in iter_cleaned_chunks(workers, csv_file, engine):
+        total_original += original
         if not chunk.empty:
             chunks.append(chunk)
 
@@ -58,64 +113,105 @@ def clean_csv_to_dataframe():
         return None
 
     df = pd.concat(chunks, ignore_index=True)
-    print(
-        f"原始记录数: {total_original} 清洗后记录数: {total_cleaned} 删除记录数: {total_original - total_cleaned}",
-    )
+    _print_summary(total_original, len(df))
     return df
 
 
-# 对 DataFrame 进行统计分析并保存结果
-def analyze_dataframe(df: pd.DataFrame):
-    if df is None or df.empty:
-        print("错误: 数据集为空无法进行统计分析")
-        return
-
-    df_for_analysis = df[["LANGUAGE", "DOCTYPE", "PUBLISHER", "YEAR"]].copy()
-
-    stats = {
-        "total_books": len(df_for_analysis),
-        "language_distribution": df_for_analysis["LANGUAGE"].value_counts().to_dict(),
-        "doctype_distribution": df_for_analysis["DOCTYPE"].value_counts().to_dict(),
-        "top_publishers": df_for_analysis["PUBLISHER"]
-        .value_counts()
-        .head(10)
-        .to_dict(),
-        "year_distribution": df_for_analysis["YEAR"]
-        .value_counts()
-        .sort_index()
-        .to_dict(),
+# 由取值计数生成统计结果
+def build_stats(counters: ValueCounters) -> dict:
+    return {
+        "total_books": counters.total,
+        "language_distribution": counters.most_common("LANGUAGE"),
+        "doctype_distribution": counters.most_common("DOCTYPE"),
+        "top_publishers": counters.most_common("PUBLISHER", 10),
+        "year_distribution": counters.sorted_by_value("YEAR"),
     }
 
+
+# 保存统计结果
+def save_stats(counters: ValueCounters):
     try:
         os.makedirs(os.path.dirname(STATS_OUTPUT), exist_ok=True)
         with open(STATS_OUTPUT, "w", encoding="utf-8") as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
+            json.dump(build_stats(counters), f, ensure_ascii=False, indent=2)
         print(f"统计结果已保存 -> {STATS_OUTPUT}")
     except IOError as e:
         print(f"错误: 统计结果保存失败 -> {e}")
 
 
-def main():
-    if not os.path.exists(CSV_FILE):
-        print(f"错误: 未找到待处理文件 -> {CSV_FILE}")
-        return
-
-    # 清洗数据
-    cleaned_df = clean_csv_to_dataframe()
-
-    if cleaned_df is None or cleaned_df.empty:
-        print("错误: 数据清洗未能生成有效数据，流程终止")
+# 对 DataFrame 进行统计分析并保存结果
+def analyze_dataframe(df: pd.DataFrame):
+    if df is None or df.empty:
+        print("错误: 数据集为空无法进行统计分析")
         return
 
-    # 保存为 Parquet
-    export_to_parquet(cleaned_df, PARQUET_FILE)
+    counters = ValueCounters(STATS_COLUMNS)
+    counters.update(df)
+    save_stats(counters)
 
-    # 导出为清洗后的 CSV
-    export_to_csv(cleaned_df, CLEANED_CSV_FILE)
-
-    # 统计分析
-    analyze_dataframe(cleaned_df)
 
+def main(workers: int = 1, engine: str = "pandas", incremental: bool = False):
+    if not os.path.exists(CSV_FILE):
+        raise RuntimeError(f"未找到待处理文件 -> {CSV_FILE}")
+
+    # 增量清洗: 从上次的水位线继续，只处理原始文件末尾新增的行
+    start, base_counters = None, None
+    if incremental:
+        start = resume_offset(CSV_FILE, load_state(STATE_FILE).get("watermark"))
+        base_counters = load_counters(COUNTS_FILE, STATS_COLUMNS)
+        if start is None or base_counters is None or not os.path.exists(PARQUET_FILE):
+            print("未找到可用的增量清洗记录或原始文件已被改写，执行全量清洗")
+            start, base_counters = None, None
+    if start is None:
+        end = os.path.getsize(CSV_FILE)
+        source = CSV_FILE
+    else:
+        end = complete_end(CSV_FILE)
+        if end <= start:
+            print("原始数据没有新增记录，无需清洗")
+            return
+        source = open_delta(CSV_FILE, start, end)
+
+    # 有进度回调时 (例如后台任务) 按行数估算完成比例
+    estimated = count_lines(CSV_FILE, start, end) if has_progress_hooks() else 0
+
+    # 逐块清洗，同时写出 Parquet 与 CSV 并累加统计，内存中只保留当前分块
+    counters = ValueCounters(STATS_COLUMNS)
+    exporter = ChunkedExporter(PARQUET_FILE, CLEANED_CSV_FILE, append=start is not None)
+    total_original = 0
+    try:
+        for original, chunk in iter_cleaned_chunks(workers, source, engine):
+            total_original += original
+            counters.update(chunk)
+            exporter.write(chunk)
+            if estimated:
+                report_progress(total_original, total_original / estimated)
+    except BaseException:
+        exporter.abort()
+        raise
+    finally:
+        if start is not None:
+            source.close()
+
+    _print_summary(total_original, counters.total)
+    if counters.total == 0:
+        exporter.abort()
+        if start is None:
+            raise RuntimeError("数据清洗未能生成有效数据，流程终止")
+        print("新增记录清洗后无有效数据")
+    else:
+        # 保存 Parquet 与清洗后的 CSV，图书数据变化后递增目录版本，API 的响应缓存随之失效
+        exporter.close()
+        bump_catalog_version()
+
+        # 统计分析，增量清洗时与之前的计数合并
+        if base_counters is not None:
+            base_counters.merge(counters)
+            counters = base_counters
+        save_stats(counters)
+        save_counters(COUNTS_FILE, counters)
+
+    save_state(STATE_FILE, {"watermark": csv_watermark(CSV_FILE, end)})
     print("\033[92m图书数据清洗与分析已完成\033[0m")
 
 
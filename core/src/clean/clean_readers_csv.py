@@ -1,79 +1,145 @@
 import pandas as pd
+import numpy as np
+import pyarrow as pa
 import json
 import os
 import re
-from .utils import export_to_parquet, export_to_csv
+from .incremental import (
+    complete_end,
+    count_lines,
+    csv_watermark,
+    encode_ids,
+    load_counters,
+    load_id_set,
+    load_state,
+    open_delta,
+    resume_offset,
+    save_counters,
+    save_id_set,
+    save_state,
+)
+from ..progress import has_progress_hooks, report_progress
+from .utils import (
+    ChunkedExporter,
+    ValueCounters,
+    as_string,
+    map_chunks,
+    non_blank_mask,
+    read_csv_chunks,
+)
 
 # 文件路径配置
 CSV_FILE = os.path.join("data", "original", "readers.csv")
 PARQUET_FILE = os.path.join("data", "cleaned", "parquet", "readers.parquet")
 CLEANED_CSV_FILE = os.path.join("data", "cleaned", "csv", "readers_cleaned.csv")
 STATS_OUTPUT = os.path.join("data", "cleaned", "stats", "readers_stats.json")
+# 增量清洗的状态: 水位线、取值计数与已清洗读者 ID 的编码集合
+STATE_FILE = os.path.join("data", "cleaned", "state", "readers_state.json")
+COUNTS_FILE = os.path.join("data", "cleaned", "state", "readers_counts.json")
+SEEN_IDS_FILE = os.path.join("data", "cleaned", "state", "readers_ids.npy")
 CHUNK_SIZE = 50000
+# arrow 引擎读取时的列类型，数值字段按字符串读取后在清洗时转换
+COLUMN_TYPES = {
+    "NO": pa.string(),
+    "ID": pa.string(),
+    "GENDER": pa.string(),
+    "ENROLLYEAR": pa.string(),
+    "TYPE": pa.string(),
+    "DEPARTMENT": pa.string(),
+}
+# 统计取值分布的字段
+STATS_COLUMNS = ["GENDER", "ENROLLYEAR", "TYPE", "DEPARTMENT"]
+# 读者 ID 格式: 3-5 位大写字母加 5 位数字
+ID_PATTERN = re.compile(r"[A-Z]{3,5}[0-9]{5}")
 
 
 # 验证 ID 格式
 def validate_id(id_str: str) -> bool:
-    pattern = r"^[A-Z]{3,5}\d{5}$"
-    return bool(re.match(pattern, str(id_str)))
-
-
-# 清洗 CSV 并返回 DataFrame
-def clean_csv_to_dataframe():
-    chunks = []
-    total_original = 0
-    total_cleaned = 0
+    return ID_PATTERN.fullmatch(str(id_str)) is not None
+
+
+# 清洗单个分块，只依赖分块自身的数据，可在工作进程中执行
+def clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    # 删除任何字段为空或为空字符串的记录
+    chunk = chunk[non_blank_mask(chunk)]
+
+    # NO 字段: 只保留能转换为整数的记录，arrow 引擎按字符串读取，脏数据不会使整个读取失败
+    if "NO" in chunk.columns:
+        chunk["NO"] = pd.to_numeric(chunk["NO"], errors="coerce")
+        chunk.dropna(subset=["NO"], inplace=True)
+        chunk = chunk[chunk["NO"] == chunk["NO"].astype("int64")]
+        chunk["NO"] = chunk["NO"].astype("int64")
+
+    # ID 字段: 验证格式
+    if "ID" in chunk.columns:
+        chunk["ID"] = as_string(chunk["ID"]).str.strip()
+        chunk = chunk[chunk["ID"].str.fullmatch(ID_PATTERN, na=False)]
+
+    # GENDER 字段: 只保留 F 或 M 记录
+    if "GENDER" in chunk.columns:
+        chunk["GENDER"] = as_string(chunk["GENDER"]).str.strip().str.upper()
+        chunk = chunk[chunk["GENDER"].isin(["F", "M"])]
+
+    # ENROLLYEAR 字段: 2000-2025 区间的整数
+    if "ENROLLYEAR" in chunk.columns:
+        chunk["ENROLLYEAR"] = pd.to_numeric(chunk["ENROLLYEAR"], errors="coerce")
+        chunk.dropna(subset=["ENROLLYEAR"], inplace=True)
+        chunk = chunk[chunk["ENROLLYEAR"] == chunk["ENROLLYEAR"].astype(int)]
+        chunk["ENROLLYEAR"] = chunk["ENROLLYEAR"].astype(int)
+        chunk = chunk[(chunk["ENROLLYEAR"] >= 2000) & (chunk["ENROLLYEAR"] <= 2025)]
+
+    # 清洗 TYPE 和 DEPARTMENT 字段: 去除前后空格
+    for col in ["TYPE", "DEPARTMENT"]:
+        if col in chunk.columns:
+            chunk[col] = as_string(chunk[col]).str.strip()
+
+    # 移除此块内的重复 ID，跨块的重复由 iter_cleaned_chunks 按分块顺序去除
+    if "ID" in chunk.columns and not chunk.empty:
+        chunk = chunk.drop_duplicates(subset=["ID"], keep="first")
+
+    return chunk
+
+
+def _clean_counted(chunk: pd.DataFrame):
+    return len(chunk), clean_chunk(chunk)
+
+
+# 逐块清洗 CSV，按文件顺序返回 (原始记录数, 清洗后的分块)
+# known_ids 为之前已清洗读者 ID 的有序编码集合，增量清洗时去除这些读者的重复记录
+def iter_cleaned_chunks(
+    workers: int = 1,
+    csv_file=None,
+    engine: str = "pandas",
+    known_ids: np.ndarray = None,
+):
     seen_ids = set()
-
-    for chunk in pd.read_csv(
-        CSV_FILE,
-        encoding="utf-8",
-        chunksize=CHUNK_SIZE,
-        on_bad_lines="skip",
-    ):
-        total_original += len(chunk)
-
-        # 删除任何字段为空的记录
-        chunk.dropna(how="any", inplace=True)
-
-        # 删除任何字段为空字符串的记录
-        for col in chunk.columns:
-            chunk = chunk[chunk[col].astype(str).str.strip() != ""]
-
-        # ID 字段: 验证格式
-        if "ID" in chunk.columns:
-            chunk["ID"] = chunk["ID"].astype(str).str.strip()
-            chunk = chunk[chunk["ID"].apply(validate_id)]
-
-        # GENDER 字段: 只保留 F 或 M 记录
-        if "GENDER" in chunk.columns:
-            chunk["GENDER"] = chunk["GENDER"].astype(str).str.strip().str.upper()
-            chunk = chunk[chunk["GENDER"].isin(["F", "M"])]
-
-        # ENROLLYEAR 字段: 2000-2025 区间的整数
-        if "ENROLLYEAR" in chunk.columns:
-            chunk["ENROLLYEAR"] = pd.to_numeric(chunk["ENROLLYEAR"], errors="coerce")
-            chunk.dropna(subset=["ENROLLYEAR"], inplace=True)
-            chunk = chunk[chunk["ENROLLYEAR"] == chunk["ENROLLYEAR"].astype(int)]
-            chunk["ENROLLYEAR"] = chunk["ENROLLYEAR"].astype(int)
-            chunk = chunk[(chunk["ENROLLYEAR"] >= 2000) & (chunk["ENROLLYEAR"] <= 2025)]
-
-        # 清洗 TYPE 和 DEPARTMENT 字段: 去除前后空格
-        for col in ["TYPE", "DEPARTMENT"]:
-            if col in chunk.columns:
-                chunk[col] = chunk[col].astype(str).str.strip()
-
-        # 基于 ID 去重，保留第一次出现的记录
+    reader = read_csv_chunks(csv_file or CSV_FILE, CHUNK_SIZE, engine, COLUMN_TYPES)
+    for original, chunk in map_chunks(_clean_counted, reader, workers):
+        # 基于 ID 跨块去重，保留第一次出现的记录
         if "ID" in chunk.columns and not chunk.empty:
-            # 移除此块中已见过的 ID
-            chunk = chunk[~chunk["ID"].isin(seen_ids)]
-            # 移除此块内的重复项
-            chunk.drop_duplicates(subset=["ID"], keep="first", inplace=True)
-            # 更新已见 ID 集合
+            ids = chunk["ID"].tolist()
+            chunk = chunk[np.fromiter((i not in seen_ids for i in ids), bool, len(ids))]
+            if known_ids is not None and len(known_ids) and not chunk.empty:
+                chunk = chunk[~np.isin(encode_ids(chunk["ID"]), known_ids)]
             seen_ids.update(chunk["ID"])
+        yield original, chunk
+
+
+def _print_summary(total_original: int, total_cleaned: int):
+    print(
+        f"原始记录数: {total_original}\n清洗后记录数: {total_cleaned}\n删除记录数: {total_original - total_cleaned}"
+    )
 
-        total_cleaned += len(chunk)
 
+# 清洗 CSV 并返回 DataFrame，workers 大于 1 时多进程并行清洗各分块
+def clean_csv_to_dataframe(
+    workers: int = 1, csv_file: str = None, engine: str = "pandas"
+):
+    chunks = []
+    total_original = 0
+
+    for original, chunk in iter_cleaned_chunks(workers, csv_file, engine):
+        total_original += original
         if not chunk.empty:
             chunks.append(chunk)
 
@@ -82,63 +148,107 @@ def clean_csv_to_dataframe():
         return None
 
     df = pd.concat(chunks, ignore_index=True)
-    print(
-        f"原始记录数: {total_original}\n清洗后记录数: {total_cleaned}\n删除记录数: {total_original - total_cleaned}"
-    )
+    _print_summary(total_original, len(df))
     return df
 
 
-# 对 DataFrame 进行统计分析并保存结果
-def analyze_dataframe(df: pd.DataFrame):
-    if df is None or df.empty:
-        print("错误: 数据集为空无法进行统计分析")
-        return
-
-    df_for_analysis = df[["GENDER", "ENROLLYEAR", "TYPE", "DEPARTMENT"]].copy()
-
-    stats = {
-        "total_readers": len(df_for_analysis),
-        "gender_distribution": df_for_analysis["GENDER"].value_counts().to_dict(),
-        "enrollyear_distribution": df_for_analysis["ENROLLYEAR"]
-        .value_counts()
-        .sort_index()
-        .to_dict(),
-        "type_distribution": df_for_analysis["TYPE"].value_counts().to_dict(),
-        "department_distribution": df_for_analysis["DEPARTMENT"]
-        .value_counts()
-        .to_dict(),
+# 由取值计数生成统计结果
+def build_stats(counters: ValueCounters) -> dict:
+    return {
+        "total_readers": counters.total,
+        "gender_distribution": counters.most_common("GENDER"),
+        "enrollyear_distribution": counters.sorted_by_value("ENROLLYEAR"),
+        "type_distribution": counters.most_common("TYPE"),
+        "department_distribution": counters.most_common("DEPARTMENT"),
     }
 
+
+# 保存统计结果
+def save_stats(counters: ValueCounters):
     try:
         os.makedirs(os.path.dirname(STATS_OUTPUT), exist_ok=True)
         with open(STATS_OUTPUT, "w", encoding="utf-8") as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
+            json.dump(build_stats(counters), f, ensure_ascii=False, indent=2)
         print(f"统计结果已保存 -> {STATS_OUTPUT}")
     except IOError as e:
         print(f"错误: 统计结果保存失败 -> {e}")
 
 
-def main():
-    if not os.path.exists(CSV_FILE):
-        print(f"错误: 未找到待处理文件 -> {CSV_FILE}")
-        return
-
-    # 清洗数据
-    cleaned_df = clean_csv_to_dataframe()
-
-    if cleaned_df is None or cleaned_df.empty:
-        print("错误: 数据清洗未能生成有效数据，流程终止")
+# 对 DataFrame 进行统计分析并保存结果
+def analyze_dataframe(df: pd.DataFrame):
+    if df is None or df.empty:
+        print("错误: 数据集为空无法进行统计分析")
         return
 
-    # 保存为 Parquet
-    export_to_parquet(cleaned_df, PARQUET_FILE)
+    counters = ValueCounters(STATS_COLUMNS)
+    counters.update(df)
+    save_stats(counters)
 
-    # 导出为清洗后的 CSV
-    export_to_csv(cleaned_df, CLEANED_CSV_FILE)
-
-    # 统计分析
-    analyze_dataframe(cleaned_df)
 
+def main(workers: int = 1, engine: str = "pandas", incremental: bool = False):
+    if not os.path.exists(CSV_FILE):
+        raise RuntimeError(f"未找到待处理文件 -> {CSV_FILE}")
+
+    # 增量清洗: 从上次的水位线继续，只处理原始文件末尾新增的行
+    start, base_counters = None, None
+    if incremental:
+        start = resume_offset(CSV_FILE, load_state(STATE_FILE).get("watermark"))
+        base_counters = load_counters(COUNTS_FILE, STATS_COLUMNS)
+        if start is None or base_counters is None or not os.path.exists(PARQUET_FILE):
+            print("未找到可用的增量清洗记录或原始文件已被改写，执行全量清洗")
+            start, base_counters = None, None
+    if start is None:
+        end = os.path.getsize(CSV_FILE)
+        source, known_ids = CSV_FILE, None
+    else:
+        end = complete_end(CSV_FILE)
+        if end <= start:
+            print("原始数据没有新增记录，无需清洗")
+            return
+        source, known_ids = open_delta(CSV_FILE, start, end), load_id_set(SEEN_IDS_FILE)
+
+    # 有进度回调时 (例如后台任务) 按行数估算完成比例
+    estimated = count_lines(CSV_FILE, start, end) if has_progress_hooks() else 0
+
+    # 逐块清洗，同时写出 Parquet 与 CSV 并累加统计，内存中只保留当前分块
+    counters = ValueCounters(STATS_COLUMNS)
+    exporter = ChunkedExporter(PARQUET_FILE, CLEANED_CSV_FILE, append=start is not None)
+    codes = [] if known_ids is None else [known_ids]
+    total_original = 0
+    try:
+        for original, chunk in iter_cleaned_chunks(workers, source, engine, known_ids):
+            total_original += original
+            counters.update(chunk)
+            exporter.write(chunk)
+            if estimated:
+                report_progress(total_original, total_original / estimated)
+            codes.append(encode_ids(chunk["ID"]))
+    except BaseException:
+        exporter.abort()
+        raise
+    finally:
+        if start is not None:
+            source.close()
+
+    _print_summary(total_original, counters.total)
+    if counters.total == 0:
+        exporter.abort()
+        if start is None:
+            raise RuntimeError("数据清洗未能生成有效数据，流程终止")
+        print("新增记录清洗后无有效数据")
+    else:
+        # 保存 Parquet 与清洗后的 CSV
+        exporter.close()
+        save_id_set(SEEN_IDS_FILE, np.concatenate(codes))
+
+        # 统计分析，增量清洗时与之前的计数合并
+        if base_counters is not None:
+            base_counters.merge(counters)
+            counters = base_counters
+        save_stats(counters)
+        save_counters(COUNTS_FILE, counters)
+
+    save_state(STATE_FILE, {"watermark": csv_watermark(CSV_FILE, end)})
     print("\033[92m读者数据清洗与分析已完成\033[0m")
 
 
@@ -0,0 +1,117 @@
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# 增量清洗写出的分片目录与清单文件名
+PARTS_SUFFIX = "_parts"
+MANIFEST_NAME = "_manifest.json"
+
+
+def parts_dir(parquet_file: str) -> str:
+    """
+    数据集的增量分片目录，例如 books.parquet 对应 books_parts
+    """
+    return os.path.splitext(parquet_file)[0] + PARTS_SUFFIX
+
+
+def load_manifest(parquet_file: str) -> Dict[str, Any]:
+    """
+    读取数据集清单，parts 按追加顺序记录各分片的文件名、行数与写入时间
+    """
+    manifest_file = os.path.join(parts_dir(parquet_file), MANIFEST_NAME)
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+    manifest.setdefault("parts", [])
+    return manifest
+
+
+def next_part_file(parquet_file: str) -> str:
+    """
+    返回下一个分片的路径
+    """
+    parts = load_manifest(parquet_file)["parts"]
+    sequence = max((part["sequence"] for part in parts), default=0) + 1
+    return os.path.join(parts_dir(parquet_file), f"part-{sequence:05d}.parquet")
+
+
+def add_part(parquet_file: str, part_file: str, rows: int):
+    """
+    将已写完的分片登记到清单，清单先写临时文件再替换，读取方不会看到写了一半的清单
+    """
+    manifest = load_manifest(parquet_file)
+    name = os.path.basename(part_file)
+    manifest["parts"].append(
+        {
+            "file": name,
+            "sequence": int(name[len("part-") : -len(".parquet")]),
+            "rows": rows,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+    )
+    manifest_file = os.path.join(parts_dir(parquet_file), MANIFEST_NAME)
+    with open(f"{manifest_file}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(f"{manifest_file}.tmp", manifest_file)
+
+
+def reset_parts(parquet_file: str):
+    """
+    删除全部增量分片与清单，全量重新清洗后调用
+    """
+    directory = parts_dir(parquet_file)
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith(".parquet") or name.startswith(MANIFEST_NAME):
+            os.remove(os.path.join(directory, name))
+    if not os.listdir(directory):
+        os.rmdir(directory)
+
+
+def dataset_files(parquet_file: str) -> List[str]:
+    """
+    返回组成数据集的文件: 全量清洗输出的文件在前，其后为清单中登记的增量分片
+    """
+    directory = parts_dir(parquet_file)
+    files = [parquet_file] if os.path.exists(parquet_file) else []
+    for part in load_manifest(parquet_file)["parts"]:
+        path = os.path.join(directory, part["file"])
+        if os.path.exists(path):
+            files.append(path)
+    return files
+
+
+def dataset_mtime(parquet_file: str) -> Optional[float]:
+    """
+    数据集的最后修改时间，全量文件或清单任一更新都会变化，全量文件不存在时返回 None
+    """
+    if not os.path.exists(parquet_file):
+        return None
+    manifest_file = os.path.join(parts_dir(parquet_file), MANIFEST_NAME)
+    mtime = os.path.getmtime(parquet_file)
+    if os.path.exists(manifest_file):
+        mtime = max(mtime, os.path.getmtime(manifest_file))
+    return mtime
+
+
+def read_dataset(
+    parquet_file: str, columns: List[str] = None, memory_map: bool = False
+) -> pa.Table:
+    """
+    读取全量文件与全部增量分片并合并为一个表，各文件间的字符串类型差异会被统一
+    """
+    tables = [
+        pq.read_table(path, columns=columns, memory_map=memory_map)
+        for path in dataset_files(parquet_file)
+    ]
+    if not tables:
+        raise FileNotFoundError(parquet_file)
+    if len(tables) == 1:
+        return tables[0]
+    return pa.concat_tables(tables, promote_options="permissive")
@@ -0,0 +1,211 @@
+import hashlib
+import io
+import json
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional
+import numpy as np
+from .utils import ValueCounters
+
+# 校验原始文件未被改写时比对的文件开头字节数
+HEAD_BYTES = 64 << 10
+
+
+def load_state(state_file: str) -> Dict[str, Any]:
+    """
+    读取增量清洗的状态，不存在或无法解析时返回空字典
+    """
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(state_file: str, state: Dict[str, Any]):
+    os.makedirs(os.path.dirname(state_file), exist_ok=True)
+    with open(f"{state_file}.tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(f"{state_file}.tmp", state_file)
+
+
+def _head_digest(csv_file: str, length: int) -> str:
+    with open(csv_file, "rb") as f:
+        return hashlib.sha256(f.read(length)).hexdigest()
+
+
+def _header_end(csv_file: str) -> int:
+    with open(csv_file, "rb") as f:
+        return len(f.readline())
+
+
+def complete_end(csv_file: str) -> int:
+    """
+    返回最后一个完整行的结束位置，正在写入中的末尾半行留到下次处理
+    """
+    size = os.path.getsize(csv_file)
+    with open(csv_file, "rb") as f:
+        position = size
+        while position > 0:
+            start = max(0, position - HEAD_BYTES)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            position = start
+    return 0
+
+
+def count_lines(csv_file: str, start: int = None, end: int = None) -> int:
+    """
+    统计 [start, end) 范围内的行数，start 为 None 时从表头之后开始，用于估算清洗进度
+
+    字段内含换行时结果偏大，只作为估算
+    """
+    start = _header_end(csv_file) if start is None else start
+    end = os.path.getsize(csv_file) if end is None else end
+    lines = 0
+    with open(csv_file, "rb") as f:
+        f.seek(start)
+        while start < end:
+            block = f.read(min(HEAD_BYTES << 4, end - start))
+            if not block:
+                break
+            lines += block.count(b"\n")
+            start += len(block)
+    return lines
+
+
+def csv_watermark(csv_file: str, offset: int) -> Dict[str, Any]:
+    """
+    记录已处理到的字节位置，以及文件开头的哈希用于判断文件是否只是在末尾追加
+    """
+    head = min(offset, HEAD_BYTES)
+    return {
+        "offset": offset,
+        "head_bytes": head,
+        "head_sha256": _head_digest(csv_file, head),
+    }
+
+
+def resume_offset(csv_file: str, watermark: Dict[str, Any]) -> Optional[int]:
+    """
+    返回可以继续处理的字节位置；没有水位线，或文件变短、开头被改写时返回 None，需要全量清洗
+    """
+    if not watermark or not os.path.exists(csv_file):
+        return None
+    offset = watermark.get("offset", 0)
+    if os.path.getsize(csv_file) < offset or offset < _header_end(csv_file):
+        return None
+    if _head_digest(csv_file, watermark["head_bytes"]) != watermark["head_sha256"]:
+        return None
+    return offset
+
+
+class DeltaReader(io.RawIOBase):
+    """
+    只读文件对象，内容为 CSV 表头加上 [start, end) 范围内新增的行，可直接交给 read_csv_chunks
+    """
+
+    def __init__(self, csv_file: str, start: int, end: int):
+        self._file = open(csv_file, "rb")
+        self._header = self._file.readline()
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._header:
+            size = min(len(buffer), len(self._header))
+            buffer[:size] = self._header[:size]
+            self._header = self._header[size:]
+            return size
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._file.read(size)
+        buffer[: len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def open_delta(csv_file: str, start: int, end: int) -> io.BufferedReader:
+    return io.BufferedReader(DeltaReader(csv_file, start, end))
+
+
+def encode_ids(ids: Iterable[str]) -> np.ndarray:
+    """
+    将 3-5 位大写字母加 5 位数字的 ID 编码为 int64，字母部分按 1-26 的 27 进制编码，编码互不重复
+
+    只处理已通过格式校验的 ID
+    """
+    raw = np.asarray(list(ids), dtype="S10")
+    if raw.size == 0:
+        return np.empty(0, dtype=np.int64)
+    chars = raw.view(np.uint8).reshape(len(raw), 10).astype(np.int64)
+    letters = np.char.str_len(raw) - 5
+    prefix = np.zeros(len(raw), dtype=np.int64)
+    for i in range(5):
+        has_letter = letters > i
+        prefix = np.where(has_letter, prefix * 27 + chars[:, i] - 64, prefix)
+    rows = np.arange(len(raw))
+    number = np.zeros(len(raw), dtype=np.int64)
+    for i in range(5):
+        number = number * 10 + chars[rows, letters + i] - 48
+    return prefix * 100000 + number
+
+
+def load_id_set(id_file: str) -> np.ndarray:
+    """
+    读取已清洗读者 ID 的有序编码集合
+    """
+    if not os.path.exists(id_file):
+        return np.empty(0, dtype=np.int64)
+    return np.load(id_file)
+
+
+def save_id_set(id_file: str, codes: np.ndarray):
+    os.makedirs(os.path.dirname(id_file), exist_ok=True)
+    with open(f"{id_file}.tmp", "wb") as f:
+        np.save(f, np.unique(codes))
+    os.replace(f"{id_file}.tmp", id_file)
+
+
+def load_counters(counts_file: str, columns) -> Optional[ValueCounters]:
+    """
+    读取上次清洗保存的取值计数，不存在时返回 None
+    """
+    try:
+        with open(counts_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    counters = ValueCounters(columns)
+    counters.total = data["total"]
+    for col in counters.columns:
+        counters.counters[col] = Counter(dict(map(tuple, data["counts"][col])))
+    return counters
+
+
+def save_counters(counts_file: str, counters: ValueCounters):
+    """
+    保存取值计数，按插入顺序存为 [取值, 次数] 列表，保留取值类型与并列时的顺序
+    """
+    data = {
+        "total": counters.total,
+        "counts": {
+            col: [[value, count] for value, count in counters.counters[col].items()]
+            for col in counters.columns
+        },
+    }
+    os.makedirs(os.path.dirname(counts_file), exist_ok=True)
+    with open(f"{counts_file}.tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=int)
+    os.replace(f"{counts_file}.tmp", counts_file)
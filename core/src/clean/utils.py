@@ -1,5 +1,93 @@
 import os
+import shutil
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from .dataset import add_part, next_part_file, reset_parts
+
+# CSV 读取引擎: pandas 为 pd.read_csv 分块读取，arrow 为 pyarrow 流式读取
+CSV_ENGINES = ["pandas", "arrow"]
+# arrow 引擎每次解析的字节数
+ARROW_BLOCK_SIZE = 4 << 20
+
+
+def _arrow_to_frame(table: pa.Table, offset: int) -> pd.DataFrame:
+    df = table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+    # 与 pd.read_csv 分块读取一致，行索引在各分块间连续
+    df.index = pd.RangeIndex(offset, offset + len(df))
+    return df
+
+
+def read_csv_chunks(
+    csv_file,
+    chunksize: int,
+    engine: str = "pandas",
+    column_types: Dict[str, pa.DataType] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    分块读取 CSV，跳过格式错误的行，csv_file 可以是文件路径或二进制文件对象
+
+    arrow 引擎使用 pyarrow.csv.open_csv 流式多线程解析，列类型由 column_types 指定，
+    字符串列为 string[pyarrow]，比 Python 对象字符串省内存；解析出的批次按 chunksize 重新切分
+    """
+    if engine == "pandas":
+        yield from pd.read_csv(
+            csv_file, encoding="utf-8", chunksize=chunksize, on_bad_lines="skip"
+        )
+        return
+    if engine != "arrow":
+        raise ValueError(f"不支持的 CSV 读取引擎: {engine}")
+
+    reader = pa_csv.open_csv(
+        csv_file,
+        read_options=pa_csv.ReadOptions(use_threads=True, block_size=ARROW_BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(
+            newlines_in_values=True, invalid_row_handler=lambda row: "skip"
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types or {}, strings_can_be_null=True
+        ),
+    )
+    pending, pending_rows, offset = [], 0, 0
+    for batch in reader:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunksize:
+            table = pa.Table.from_batches(pending, schema=reader.schema)
+            yield _arrow_to_frame(table.slice(0, chunksize), offset)
+            offset += chunksize
+            rest = table.slice(chunksize)
+            pending, pending_rows = rest.to_batches(), rest.num_rows
+    if pending_rows:
+        table = pa.Table.from_batches(pending, schema=reader.schema)
+        yield _arrow_to_frame(table, offset)
+
+
+def as_string(series: pd.Series) -> pd.Series:
+    """
+    转换为字符串列，已是 pandas 字符串类型的列保持原样，避免 arrow 引擎读取的列被复制为 Python 对象
+    """
+    if isinstance(series.dtype, pd.StringDtype):
+        return series
+    return series.astype(str)
+
+
+def non_blank_mask(df: pd.DataFrame) -> pd.Series:
+    """
+    返回所有字段均不为空且不为空白字符串的行
+
+    一次构建整个分块的布尔掩码，只对非数值列检查空白字符串，
+    调用方据此过滤一次，避免逐列过滤时每次都复制整个分块
+    """
+    mask = df.notna().all(axis=1)
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            mask &= as_string(df[col]).str.strip() != ""
+    return mask
 
 
 def export_to_parquet(df: pd.DataFrame, file_path: str):
@@ -33,3 +121,158 @@ def export_to_csv(df: pd.DataFrame, file_path: str):
         print(f"清洗后数据已导出 -> {file_path}")
     except IOError as e:
         print(f"错误: CSV 导出失败 -> {e}")
+
+
+class ValueCounters:
+    """
+    可合并的按列取值计数，逐块累加后与对整个数据集做 value_counts 的结果相同
+
+    计数按取值首次出现的顺序插入，取值次数相同时的排列顺序也与 value_counts 一致
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        self.total = 0
+        self.counters: Dict[str, Counter] = {col: Counter() for col in self.columns}
+
+    def update(self, df: pd.DataFrame):
+        """
+        累加一个分块的计数
+        """
+        self.total += len(df)
+        for col in self.columns:
+            self.counters[col].update(df[col].value_counts(sort=False).to_dict())
+
+    def merge(self, other: "ValueCounters"):
+        """
+        合并另一组计数，例如其他分块或其他进程的结果
+        """
+        self.total += other.total
+        for col in self.columns:
+            self.counters[col].update(other.counters[col])
+
+    def most_common(self, col: str, n: int = None) -> Dict[Any, int]:
+        """
+        按次数从多到少返回取值分布
+        """
+        return dict(self.counters[col].most_common(n))
+
+    def sorted_by_value(self, col: str) -> Dict[Any, int]:
+        """
+        按取值从小到大返回取值分布
+        """
+        return dict(sorted(self.counters[col].items()))
+
+
+class ChunkedExporter:
+    """
+    逐块写出清洗结果的 Parquet 与 CSV，内存中只保留当前分块
+
+    先写入临时文件，close 时才替换目标文件，清洗中途失败时保留原有文件。
+    append 为 True 时 Parquet 写为数据集的下一个增量分片并登记到清单，
+    CSV 记录 (不含表头) 追加到原有文件末尾
+    """
+
+    def __init__(self, parquet_file: str, csv_file: str, append: bool = False):
+        self.parquet_file = parquet_file
+        self.csv_file = csv_file
+        self.append = append
+        self.target_file = next_part_file(parquet_file) if append else parquet_file
+        self.rows = 0
+        self._parquet_writer = None
+        self._csv_handle = None
+
+    def _open(self, table: pa.Table):
+        os.makedirs(os.path.dirname(self.target_file), exist_ok=True)
+        os.makedirs(os.path.dirname(self.csv_file), exist_ok=True)
+        self._parquet_writer = pq.ParquetWriter(
+            f"{self.target_file}.tmp", table.schema, compression="zstd"
+        )
+        self._csv_handle = open(
+            f"{self.csv_file}.tmp", "w", encoding="utf-8", newline=""
+        )
+
+    def write(self, df: pd.DataFrame):
+        """
+        写出一个清洗后的分块
+        """
+        if df.empty:
+            return
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._parquet_writer is None:
+            self._open(table)
+        elif not table.schema.equals(self._parquet_writer.schema, check_metadata=False):
+            # 各分块推断出的类型可能不同，例如缺失值使整数列变为浮点
+            table = table.cast(self._parquet_writer.schema)
+        self._parquet_writer.write_table(table)
+        df.to_csv(
+            self._csv_handle, index=False, header=self.rows == 0 and not self.append
+        )
+        self.rows += len(df)
+
+    def _close_files(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        if self._csv_handle is not None:
+            self._csv_handle.close()
+            self._csv_handle = None
+
+    def close(self):
+        """
+        完成写出并替换目标文件，没有写出任何记录时不修改目标文件
+        """
+        if self.rows == 0:
+            self.abort()
+            return
+        self._close_files()
+        os.replace(f"{self.target_file}.tmp", self.target_file)
+        if self.append:
+            add_part(self.parquet_file, self.target_file, self.rows)
+            print(f"增量数据已保存 -> {self.target_file}")
+            with open(f"{self.csv_file}.tmp", "rb") as src, open(
+                self.csv_file, "ab"
+            ) as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(f"{self.csv_file}.tmp")
+            print(f"清洗后数据已追加 -> {self.csv_file}")
+        else:
+            # 全量输出已包含全部记录，之前的增量分片不再需要
+            reset_parts(self.parquet_file)
+            print(f"数据已保存 -> {self.parquet_file}")
+            os.replace(f"{self.csv_file}.tmp", self.csv_file)
+            print(f"清洗后数据已导出 -> {self.csv_file}")
+
+    def abort(self):
+        """
+        放弃写出并删除临时文件
+        """
+        self._close_files()
+        for path in (f"{self.target_file}.tmp", f"{self.csv_file}.tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def map_chunks(
+    func: Callable[[pd.DataFrame], object],
+    chunks: Iterable[pd.DataFrame],
+    workers: int = 1,
+) -> Iterator[object]:
+    """
+    对每个分块调用 func，按分块的输入顺序返回结果
+
+    workers 大于 1 时分块分发到进程池并行处理，func 需为模块级函数；
+    同时处理中的分块不超过 workers * 2 个，读取速度不会远超处理速度
+    """
+    if workers is None or workers <= 1:
+        for chunk in chunks:
+            yield func(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(func, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
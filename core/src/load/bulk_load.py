@@ -0,0 +1,376 @@
+import argparse
+import itertools
+import os
+import time
+from typing import Any, Dict, List, Optional, Union
+import psycopg2
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from src.catalog_version import bump_catalog_version
+from src.clean.dataset import dataset_files
+from src.query.database_connection import DatabaseConnection
+
+# 待导入的数据集，按外键依赖顺序排列
+# file: 清洗或生成流程输出的 Parquet 文件
+# columns: Parquet 列名 -> 数据表列名
+# key: 主键列，用于去重与 upsert
+# shards: 可选，分片模式生成的分区 Parquet 目录，目录中存在分片时代替 file 导入
+LOAD_TABLES = {
+    "books": {
+        "file": os.path.join("data", "cleaned", "parquet", "books.parquet"),
+        "columns": {
+            "NO": "no",
+            "ID": "book_id",
+            "TITLE": "title",
+            "AUTHOR": "author",
+            "PUBLISHER": "publisher",
+            "YEAR": "publication_year",
+            "CALLNO": "call_no",
+            "LANGUAGE": "language",
+            "DOCTYPE": "doc_type",
+        },
+        "key": "book_id",
+    },
+    "readers": {
+        "file": os.path.join("data", "cleaned", "parquet", "readers.parquet"),
+        "columns": {
+            "NO": "no",
+            "ID": "reader_id",
+            "GENDER": "gender",
+            "ENROLLYEAR": "enroll_year",
+            "TYPE": "reader_type",
+            "DEPARTMENT": "department",
+        },
+        "key": "reader_id",
+    },
+    "borrow_records": {
+        "file": os.path.join("data", "virtual", "parquet", "borrow_records.parquet"),
+        "columns": {
+            "BORROW_ID": "borrow_id",
+            "READER_ID": "reader_id",
+            "BOOK_ID": "book_id",
+            "BORROW_DATE": "borrow_date",
+            "DUE_DATE": "due_date",
+            "RETURN_DATE": "return_date",
+            "STATUS": "status",
+        },
+        "key": "borrow_id",
+        "shards": os.path.join("data", "virtual", "parquet", "borrow_records"),
+    },
+}
+
+# 导入方式
+# upsert: 新增或更新，保留数据库中已有而文件中没有的行
+# replace: 使数据表与文件完全一致，删除文件中没有的行
+LOAD_MODES = ["upsert", "replace"]
+
+# 每次从 Parquet 读取并写入 COPY 流的行数
+BATCH_SIZE = 50000
+
+# 自动模式下，导入行数达到现有行数的该比例时才删除并重建二级索引，
+# 少量增量更新时逐行维护索引更快
+INDEX_REBUILD_RATIO = 0.5
+
+# 查询数据表上除主键与唯一约束外的二级索引
+SECONDARY_INDEX_QUERY = """
+    SELECT c.relname AS index_name, pg_get_indexdef(i.indexrelid) AS index_def
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE i.indrelid = %s::regclass AND NOT i.indisprimary AND NOT i.indisunique
+"""
+
+# 查询是否有其他表通过外键引用该表
+INBOUND_FK_QUERY = """
+    SELECT COUNT(*) AS count
+    FROM pg_constraint
+    WHERE contype = 'f' AND confrelid = %s::regclass AND conrelid <> confrelid
+"""
+
+
+class ParquetCSVStream:
+    """
+    将 Parquet 按批转换为 CSV 的只读文件对象，供 COPY FROM STDIN 流式读取
+
+    任意时刻内存中只保留一个批次，整数列中因缺失值变为浮点的数据会被还原为整数；
+    传入多个文件 (例如全量文件与增量分片) 时依次读取。
+    每次 read 至多返回当前批次中剩余的部分，以读取偏移定位，避免每次读取都重建缓冲区
+    """
+
+    def __init__(
+        self, parquet_file: Union[str, List[str]], columns: List[str], batch_size: int
+    ):
+        files = [parquet_file] if isinstance(parquet_file, str) else parquet_file
+        self._batches = itertools.chain.from_iterable(
+            pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns)
+            for path in files
+        )
+        self._buffer = b""
+        self._offset = 0
+        self.rows = 0
+
+    def _next_chunk(self) -> Optional[bytes]:
+        batch = next(self._batches, None)
+        if batch is None:
+            return None
+        arrays = []
+        for array in batch.columns:
+            if pa.types.is_floating(array.type):
+                array = array.cast(pa.int64())
+            arrays.append(array)
+        batch = pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+        self.rows += batch.num_rows
+        sink = pa.BufferOutputStream()
+        pa_csv.write_csv(
+            batch, sink, write_options=pa_csv.WriteOptions(include_header=False)
+        )
+        return sink.getvalue().to_pybytes()
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            parts = [self._buffer[self._offset :]]
+            while (chunk := self._next_chunk()) is not None:
+                parts.append(chunk)
+            self._buffer, self._offset = b"", 0
+            return b"".join(parts)
+
+        # 当前批次读完后取下一个非空批次，返回空字节表示数据结束
+        while self._offset >= len(self._buffer):
+            chunk = self._next_chunk()
+            if chunk is None:
+                return b""
+            self._buffer, self._offset = chunk, 0
+        end = self._offset + size
+        data = self._buffer[self._offset : end]
+        self._offset = end
+        return data
+
+
+def source_files(spec: Dict[str, Any]) -> List[str]:
+    """
+    返回数据表的待导入文件: 分片目录中存在 part-*.parquet 时按文件名顺序返回全部分片，
+    否则返回全量文件与清单中登记的增量分片
+    """
+    shards = spec.get("shards")
+    if shards and os.path.isdir(shards):
+        parts = sorted(
+            name
+            for name in os.listdir(shards)
+            if name.startswith("part-") and name.endswith(".parquet")
+        )
+        if parts:
+            return [os.path.join(shards, name) for name in parts]
+    return dataset_files(spec["file"])
+
+
+def _copy_to_staging(cursor, table: str, spec: Dict[str, Any], batch_size: int):
+    """
+    创建与目标表结构相同的临时表，并通过 COPY 流式写入 Parquet 数据
+    """
+    staging = f"staging_{table}"
+    columns = list(spec["columns"].values())
+    cursor.execute(
+        f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) "
+        "ON COMMIT DROP"
+    )
+    stream = ParquetCSVStream(source_files(spec), list(spec["columns"]), batch_size)
+    cursor.copy_expert(
+        f"COPY {staging} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        stream,
+    )
+    return stream.rows
+
+
+def _drop_secondary_indexes(cursor, table: str) -> List[str]:
+    """
+    删除二级索引并返回重建所需的定义，主键与唯一索引保留以支持 ON CONFLICT
+    """
+    cursor.execute(SECONDARY_INDEX_QUERY, (table,))
+    indexes = cursor.fetchall()
+    for index in indexes:
+        cursor.execute(f'DROP INDEX "{index["index_name"]}"')
+    return [index["index_def"] for index in indexes]
+
+
+def _count_rows(cursor, table: str) -> int:
+    cursor.execute(f"SELECT COUNT(*) AS count FROM {table}")
+    return cursor.fetchone()["count"]
+
+
+def _merge_from_staging(
+    cursor, table: str, spec: Dict[str, Any], truncated: bool
+) -> int:
+    """
+    将临时表中的数据合并到目标表，按主键去重，只更新内容有变化的行
+    """
+    columns = list(spec["columns"].values())
+    key = spec["key"]
+    column_list = ", ".join(columns)
+    query = (
+        f"INSERT INTO {table} ({column_list}) "
+        f"SELECT DISTINCT ON ({key}) {column_list} FROM staging_{table} "
+        f"ORDER BY {key}"
+    )
+    if not truncated:
+        updates = [c for c in columns if c != key]
+        assignments = ", ".join(f"{c} = EXCLUDED.{c}" for c in updates)
+        current = ", ".join(f"{table}.{c}" for c in updates)
+        excluded = ", ".join(f"EXCLUDED.{c}" for c in updates)
+        query += (
+            f" ON CONFLICT ({key}) DO UPDATE SET {assignments} "
+            f"WHERE ({current}) IS DISTINCT FROM ({excluded})"
+        )
+    cursor.execute(query)
+    return cursor.rowcount
+
+
+def _remove_missing_rows(cursor, table: str, spec: Dict[str, Any]) -> bool:
+    """
+    replace 模式下删除文件中不存在的行
+
+    没有被其他表引用的表直接 TRUNCATE 后重新插入，返回 True；否则仅删除缺失的行，
+    若被删除的行仍被引用，外键约束会使整个导入回滚
+    """
+    cursor.execute(INBOUND_FK_QUERY, (table,))
+    if cursor.fetchone()["count"] == 0:
+        cursor.execute(f"TRUNCATE {table}")
+        return True
+    key = spec["key"]
+    cursor.execute(
+        f"DELETE FROM {table} t WHERE NOT EXISTS "
+        f"(SELECT 1 FROM staging_{table} s WHERE s.{key} = t.{key})"
+    )
+    return False
+
+
+def bulk_load(
+    tables: Optional[List[str]] = None,
+    mode: str = "upsert",
+    rebuild_indexes: Optional[bool] = None,
+    batch_size: int = BATCH_SIZE,
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    将 Parquet 数据集通过 COPY 批量导入 PostgreSQL
+
+    所有数据表在同一事务中完成: 先 COPY 到临时表，replace 模式按依赖逆序删除多余的行，
+    再按依赖顺序合并到目标表；rebuild_indexes 为真时合并前删除二级索引、合并后重建，
+    为 None 时仅在表被清空或导入行数达到现有行数的 INDEX_REBUILD_RATIO 时重建。
+    任一步骤失败则整体回滚，数据库保持导入前的状态。导入期间目标表被锁定
+
+    返回每张表的行数、耗时与吞吐量，失败时返回 None
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"无效的导入方式: {mode}，可选 {LOAD_MODES}")
+    tables = [t for t in LOAD_TABLES if t in (tables or LOAD_TABLES)]
+    for table in tables:
+        if not source_files(LOAD_TABLES[table]):
+            print(f"错误: 未找到待导入文件 -> {LOAD_TABLES[table]['file']}")
+            return None
+
+    db = DatabaseConnection(pooled=False)
+    try:
+        db.connect()
+    except psycopg2.Error:
+        return None
+    stats = {table: {} for table in tables}
+    start = time.perf_counter()
+    try:
+        with db.conn.cursor() as cursor:
+            for table in tables:
+                step = time.perf_counter()
+                rows = _copy_to_staging(cursor, table, LOAD_TABLES[table], batch_size)
+                elapsed = time.perf_counter() - step
+                stats[table].update(
+                    rows=rows,
+                    copy_seconds=round(elapsed, 3),
+                    copy_rows_per_second=int(rows / elapsed) if elapsed else rows,
+                )
+                print(
+                    f"COPY {table}: {rows} 行，耗时 {elapsed:.2f}s，"
+                    f"{stats[table]['copy_rows_per_second']} 行/s"
+                )
+
+            truncated = {}
+            if mode == "replace":
+                for table in reversed(tables):
+                    truncated[table] = _remove_missing_rows(
+                        cursor, table, LOAD_TABLES[table]
+                    )
+
+            for table in tables:
+                step = time.perf_counter()
+                index_defs = []
+                rebuild = rebuild_indexes
+                if rebuild is None:
+                    existing = _count_rows(cursor, table)
+                    rebuild = truncated.get(table, False) or (
+                        stats[table]["rows"] >= INDEX_REBUILD_RATIO * existing
+                    )
+                if rebuild:
+                    index_defs = _drop_secondary_indexes(cursor, table)
+                merged = _merge_from_staging(
+                    cursor, table, LOAD_TABLES[table], truncated.get(table, False)
+                )
+                for index_def in index_defs:
+                    cursor.execute(index_def)
+                cursor.execute(f"ANALYZE {table}")
+                elapsed = time.perf_counter() - step
+                stats[table].update(
+                    merged=merged,
+                    indexes_rebuilt=len(index_defs),
+                    merge_seconds=round(elapsed, 3),
+                )
+                print(
+                    f"合并 {table}: 写入 {merged} 行，重建索引 {len(index_defs)} 个，"
+                    f"耗时 {elapsed:.2f}s"
+                )
+        db.conn.commit()
+    except Exception as e:
+        db.conn.rollback()
+        print(f"错误: 批量导入失败，已回滚 -> {e}")
+        return None
+    finally:
+        db.disconnect()
+
+    # 图书数据已写入数据库，递增目录版本使 API 的响应缓存失效
+    if "books" in tables:
+        bump_catalog_version()
+
+    elapsed = time.perf_counter() - start
+    total_rows = sum(s["rows"] for s in stats.values())
+    print(
+        f"导入完成: 共 {total_rows} 行，耗时 {elapsed:.2f}s，"
+        f"{int(total_rows / elapsed) if elapsed else total_rows} 行/s"
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="将清洗与生成的数据批量导入数据库")
+    parser.add_argument(
+        "--tables",
+        nargs="+",
+        choices=list(LOAD_TABLES),
+        help="要导入的数据表，默认全部",
+    )
+    parser.add_argument(
+        "--mode", choices=LOAD_MODES, default="upsert", help="导入方式 upsert/replace"
+    )
+    parser.add_argument(
+        "--rebuild-indexes",
+        choices=["auto", "always", "never"],
+        default="auto",
+        help="导入期间是否删除并重建二级索引，auto 按导入行数占比决定",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=BATCH_SIZE, help="每批读取的行数"
+    )
+    args = parser.parse_args()
+    rebuild_indexes = {"auto": None, "always": True, "never": False}
+    bulk_load(
+        args.tables, args.mode, rebuild_indexes[args.rebuild_indexes], args.batch_size
+    )
+
+
+if __name__ == "__main__":
+    main()
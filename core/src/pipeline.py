@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+# 记录各阶段上次成功执行时的指纹与文件哈希
+MANIFEST_FILE = os.path.join("data", "pipeline_manifest.json")
+
+# 计算文件哈希时每次读取的字节数
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def _load_manifest(manifest_file: str) -> Dict[str, Any]:
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+    manifest.setdefault("files", {})
+    manifest.setdefault("stages", {})
+    return manifest
+
+
+def _save_manifest(manifest: Dict[str, Any], manifest_file: str):
+    os.makedirs(os.path.dirname(manifest_file) or ".", exist_ok=True)
+    tmp_file = f"{manifest_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, manifest_file)
+
+
+def file_hash(path: str, known: Dict[str, Dict[str, Any]] = None) -> Optional[str]:
+    """
+    返回文件内容的 SHA-256，文件不存在时返回 None
+
+    known 为清单中记录的文件信息，大小与修改时间均未变化时直接使用记录的哈希，
+    否则重新计算并更新 known
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    known = known if known is not None else {}
+    entry = known.get(path)
+    if (
+        entry
+        and entry.get("size") == stat.st_size
+        and entry.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        return entry["sha256"]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    known[path] = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest.hexdigest(),
+    }
+    return known[path]["sha256"]
+
+
+def stage_fingerprint(stage: Dict[str, Any], known: Dict[str, Dict[str, Any]]) -> str:
+    """
+    由输入文件、代码文件的内容哈希与参数计算阶段指纹，任一变化都会使指纹变化
+    """
+    payload = {
+        "inputs": {path: file_hash(path, known) for path in stage.get("inputs", [])},
+        "code": {path: file_hash(path, known) for path in stage.get("code", [])},
+        "params": stage.get("params", {}),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _run_stage(func: Callable, args: tuple) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def run_pipeline(
+    stages: Dict[str, Dict[str, Any]],
+    force: bool = False,
+    workers: int = None,
+    manifest_file: str = MANIFEST_FILE,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    按依赖关系执行流水线阶段，返回各阶段的状态与耗时
+
+    stages 为 阶段名 -> 配置 的字典:
+    run: 执行函数，需为模块级函数以便在进程池中执行；args: 执行参数
+    inputs: 输入文件；outputs: 输出文件；code: 实现该阶段的源码文件
+    params: 影响输出的参数；depends: 依赖的阶段名
+
+    指纹与清单记录一致且输出文件齐全的阶段直接跳过，force 为 True 时全部重新执行；
+    依赖均已完成的阶段同时提交到进程池，workers 为 1 时在当前进程中依次执行。
+    执行函数抛出异常或执行后输出文件不齐全的阶段视为失败，依赖它的阶段不再执行
+    """
+    manifest = _load_manifest(manifest_file)
+    known = manifest["files"]
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = dict(stages)
+    running = {}
+
+    def ready(name: str) -> bool:
+        return all(
+            results.get(dep, {}).get("status") in ("done", "skipped")
+            for dep in stages[name].get("depends", [])
+        )
+
+    def blocked(name: str) -> bool:
+        return any(
+            results.get(dep, {}).get("status") in ("failed", "blocked")
+            for dep in stages[name].get("depends", [])
+        )
+
+    def finish(name: str, fingerprint: str, seconds: float = None, error=None):
+        stage = stages[name]
+        complete = all(os.path.exists(path) for path in stage.get("outputs", []))
+        if error is not None or not complete:
+            results[name] = {"status": "failed", "seconds": seconds, "error": error}
+            print(f"\033[91m阶段 {name} 失败: {error or '输出文件不完整'}\033[0m")
+            return
+        # 记录输出文件的哈希，下游阶段计算指纹时可直接使用
+        for path in stage.get("outputs", []):
+            known.pop(path, None)
+            file_hash(path, known)
+        manifest["stages"][name] = {
+            "fingerprint": fingerprint,
+            "seconds": round(seconds, 3),
+            "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        _save_manifest(manifest, manifest_file)
+        results[name] = {"status": "done", "seconds": seconds}
+        print(f"\033[92m阶段 {name} 完成，耗时 {seconds:.2f}s\033[0m")
+
+    def start_ready(executor) -> None:
+        for name in list(pending):
+            if blocked(name):
+                del pending[name]
+                results[name] = {"status": "blocked", "seconds": None}
+                print(f"\033[93m阶段 {name} 因依赖失败未执行\033[0m")
+                continue
+            if not ready(name):
+                continue
+            stage = pending.pop(name)
+            fingerprint = stage_fingerprint(stage, known)
+            recorded = manifest["stages"].get(name, {})
+            outputs_exist = all(
+                os.path.exists(path) for path in stage.get("outputs", [])
+            )
+            if (
+                not force
+                and recorded.get("fingerprint") == fingerprint
+                and outputs_exist
+            ):
+                results[name] = {"status": "skipped", "seconds": 0.0}
+                print(f"阶段 {name} 的输入未变化，跳过")
+                continue
+            print(f"正在执行阶段 {name}...")
+            args = (stage["run"], tuple(stage.get("args", ())))
+            if executor is None:
+                try:
+                    finish(name, fingerprint, _run_stage(*args))
+                except Exception as e:
+                    finish(name, fingerprint, error=str(e))
+            else:
+                running[executor.submit(_run_stage, *args)] = (name, fingerprint)
+
+    if workers is not None and workers <= 1:
+        while pending:
+            before = len(pending)
+            start_ready(None)
+            if len(pending) == before:
+                raise ValueError(f"阶段依赖无法满足: {', '.join(pending)}")
+        return {name: results[name] for name in stages}
+
+    with ProcessPoolExecutor(max_workers=workers or len(stages) or 1) as executor:
+        start_ready(executor)
+        while running or pending:
+            if not running:
+                raise ValueError(f"阶段依赖无法满足: {', '.join(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                try:
+                    finish(name, fingerprint, future.result())
+                except Exception as e:
+                    finish(name, fingerprint, error=str(e))
+            start_ready(executor)
+    return {name: results[name] for name in stages}
+
+
+def print_report(results: Dict[str, Dict[str, Any]]):
+    """
+    输出各阶段的状态与耗时
+    """
+    labels = {"done": "完成", "skipped": "跳过", "failed": "失败", "blocked": "未执行"}
+    print("阶段耗时:")
+    for name, result in results.items():
+        seconds = result.get("seconds")
+        elapsed = f"{seconds:.2f}s" if seconds is not None else "-"
+        print(f"  {name:<16} {labels[result['status']]:<4} {elapsed}")
@@ -0,0 +1,30 @@
+# 长时间运行的清洗与生成流程的进度回调，参数为已处理行数与完成比例 (0-1)
+_progress_hooks = []
+
+
+def register_progress_hook(callback):
+    """
+    注册进度回调，例如后台任务记录任务进度
+    """
+    if callback not in _progress_hooks:
+        _progress_hooks.append(callback)
+
+
+def unregister_progress_hook(callback):
+    if callback in _progress_hooks:
+        _progress_hooks.remove(callback)
+
+
+def has_progress_hooks() -> bool:
+    """
+    是否有进度回调，没有时调用方可跳过只为估算进度而做的额外计算
+    """
+    return bool(_progress_hooks)
+
+
+def report_progress(rows: int, fraction: float):
+    for callback in list(_progress_hooks):
+        try:
+            callback(rows, min(max(fraction, 0.0), 1.0))
+        except Exception as e:
+            print(f"错误: 进度回调执行失败 -> {e}")
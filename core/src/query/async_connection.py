@@ -0,0 +1,168 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Sequence
+import psycopg
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from .config import Config
+from .instrumentation import record_query
+
+# 每个事件循环一个异步连接池，键为事件循环
+_async_pools: Dict[asyncio.AbstractEventLoop, AsyncConnectionPool] = {}
+
+
+def _conninfo(config: Config) -> str:
+    return make_conninfo(
+        host=config.DB_HOST,
+        port=config.DB_PORT,
+        dbname=config.DB_NAME,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+    )
+
+
+async def get_async_pool(config: Config = None) -> AsyncConnectionPool:
+    """
+    获取当前事件循环共享的异步连接池，首次调用时创建并打开
+
+    与同步连接池使用相同的 POOL_* 配置，借出连接前执行健康检查
+    """
+    config = config or Config()
+    loop = asyncio.get_running_loop()
+    pool = _async_pools.get(loop)
+    if pool is None:
+        pool = AsyncConnectionPool(
+            _conninfo(config),
+            min_size=config.POOL_MIN_SIZE,
+            max_size=config.POOL_MAX_SIZE,
+            timeout=config.POOL_TIMEOUT,
+            kwargs={"row_factory": dict_row},
+            check=(
+                AsyncConnectionPool.check_connection
+                if config.POOL_HEALTH_CHECK
+                else None
+            ),
+            open=False,
+        )
+        _async_pools[loop] = pool
+        await pool.open()
+    return pool
+
+
+async def close_async_pool():
+    """
+    关闭当前事件循环的异步连接池，用于应用关闭时释放连接
+    """
+    pool = _async_pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
+
+
+class AsyncDatabaseConnection:
+    """
+    DatabaseConnection 的异步版本，基于 psycopg 3 的异步连接池
+
+    作为异步上下文管理器使用，进入时借出连接，退出时归还
+    """
+
+    def __init__(self, config: Config = None):
+        self.config = config or Config()
+        self.conn: Optional[psycopg.AsyncConnection] = None
+        self._pool: Optional[AsyncConnectionPool] = None
+        # 执行失败的查询数，与 DatabaseConnection.errors 相同
+        self.errors = 0
+        if self.config.DB_TYPE != "postgresql":
+            raise ValueError("仅适用于 PostgreSQL 数据库")
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.disconnect()
+
+    async def connect(self):
+        """
+        从异步连接池借出连接
+        """
+        if self.conn is None:
+            try:
+                self._pool = await get_async_pool(self.config)
+                self.conn = await self._pool.getconn()
+            except (psycopg.Error, PoolTimeout) as e:
+                print(f"数据库连接失败: {e}")
+                raise
+
+    async def disconnect(self):
+        """
+        归还连接，未结束的事务会被回滚
+        """
+        if self.conn is not None:
+            await self._pool.putconn(self.conn)
+            self.conn = None
+            self._pool = None
+
+    async def _execute(self, query: str, params: Sequence = (), fetch: str = None):
+        """
+        用于执行查询的私有辅助方法
+        """
+        if self.conn is None:
+            print("错误: 数据库未连接")
+            return None
+        start = time.perf_counter()
+        try:
+            async with self.conn.cursor() as cursor:
+                await cursor.execute(query, params)
+                if fetch == "one":
+                    result = await cursor.fetchone()
+                    rows = 1 if result else 0
+                elif fetch == "all":
+                    result = await cursor.fetchall()
+                    rows = len(result)
+                else:
+                    result = rows = cursor.rowcount
+            await self.conn.commit()
+        except psycopg.Error as e:
+            print(f"查询执行失败: {e}")
+            self.errors += 1
+            await self.conn.rollback()
+            record_query(query, params, time.perf_counter() - start, None, str(e))
+            return None
+        record_query(query, params, time.perf_counter() - start, rows)
+        return result
+
+    async def execute_query(self, query: str, params: Sequence = ()) -> List[Dict]:
+        """
+        执行查询并以字典列表形式返回所有结果
+        """
+        results = await self._execute(query, params, fetch="all")
+        return results if results else []
+
+    async def execute_single_query(
+        self, query: str, params: Sequence = ()
+    ) -> Optional[Dict]:
+        """
+        执行查询并以单个字典形式返回结果
+        """
+        result = await self._execute(query, params, fetch="one")
+        return result if result else None
+
+    async def execute_batch_insert(self, query: str, params_list: List[Any]) -> bool:
+        """
+        执行批量插入操作
+        """
+        if self.conn is None:
+            print("错误: 数据库未连接")
+            return False
+        try:
+            start = time.perf_counter()
+            async with self.conn.cursor() as cursor:
+                await cursor.executemany(query, params_list)
+            await self.conn.commit()
+            record_query(query, (), time.perf_counter() - start, len(params_list))
+            return True
+        except psycopg.Error as e:
+            print(f"批量插入失败: {e}")
+            await self.conn.rollback()
+            return False
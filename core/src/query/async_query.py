@@ -0,0 +1,244 @@
+from typing import Any, Dict, List, Optional
+from .async_connection import AsyncDatabaseConnection
+from .base_query import (
+    BOOKS_COUNT_QUERY,
+    BOOKS_ESTIMATE_QUERY,
+    READER_INFO_QUERY,
+    books_list_plan,
+    books_page,
+    books_search_plan,
+)
+from .config import Config
+from .library_query import (
+    READER_BORROW_HISTORY_QUERY,
+    READER_HISTORY_QUERY,
+    READER_STATS_QUERY,
+    READER_STATUS_QUERY,
+    READERS_HISTORY_BATCH_QUERY,
+    READERS_STATISTICS_BATCH_QUERY,
+    parse_reader_history,
+    parse_reader_statistics,
+)
+from .pagination import resolve_total_async
+from .search import get_memory_index, resolve_backend_async
+
+RECOMMENDATION_INSERT_QUERY = """
+    INSERT INTO recommendation_history
+        (reader_id, model_used, recommended_book_title, recommended_book_author, recommendation_reason)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+
+class AsyncLibraryQuery:
+    """
+    LibraryQuery 的异步版本，与同步查询共用 SQL 语句与分页逻辑
+
+    作为异步上下文管理器使用，等待数据库期间不占用事件循环
+    """
+
+    def __init__(self, config: Config = None, search_backend: str = None):
+        self.db = AsyncDatabaseConnection(config)
+        self.search_backend = search_backend or self.db.config.SEARCH_BACKEND
+
+    async def __aenter__(self):
+        await self.db.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.db.disconnect()
+
+    async def get_reader_info(self, reader_id: str) -> Optional[Dict[str, Any]]:
+        """
+        根据读者 ID 获取读者信息
+        """
+        return await self.db.execute_single_query(READER_INFO_QUERY, (reader_id,))
+
+    async def get_all_books(
+        self,
+        page: int = 1,
+        limit: int = 20,
+        sort_by: str = "title",
+        sort_order: str = "ASC",
+        after: str = None,
+        count_mode: str = "exact",
+    ) -> Dict[str, Any]:
+        """
+        检索所有图书的分页列表，参数与 BaseQuery.get_all_books 相同
+        """
+        plan = books_list_plan(page, limit, sort_by, sort_order, after)
+        return await self._run_plan(plan, page, limit, after, count_mode)
+
+    async def search_books(
+        self,
+        search: str = "",
+        language: str = "",
+        year: int = None,
+        publisher: str = "",
+        author: str = "",
+        page: int = 1,
+        limit: int = 20,
+        after: str = None,
+        count_mode: str = "exact",
+    ) -> Dict[str, Any]:
+        """
+        根据多个条件搜索图书，参数与 BaseQuery.search_books 相同
+        """
+        backend = await resolve_backend_async(self.search_backend, self._fetch_scalar)
+        if backend == "memory":
+            index = get_memory_index()
+            if index is not None:
+                return index.search_books(
+                    search,
+                    language,
+                    year,
+                    publisher,
+                    author,
+                    page,
+                    limit,
+                    after,
+                    count_mode,
+                )
+            backend = "ilike"
+
+        plan = books_search_plan(
+            backend, search, language, year, publisher, author, page, limit, after
+        )
+        return await self._run_plan(plan, page, limit, after, count_mode)
+
+    async def _run_plan(
+        self,
+        plan: Dict[str, Any],
+        page: int,
+        limit: int,
+        after: str,
+        count_mode: str,
+    ) -> Dict[str, Any]:
+        """
+        执行计数与分页查询
+        """
+
+        async def count_exact() -> int:
+            query = BOOKS_COUNT_QUERY.format(where_clause=plan["count_where"])
+            result = await self.db.execute_single_query(
+                query, tuple(plan["count_params"])
+            )
+            return result["count"] if result else 0
+
+        async def count_estimate() -> Optional[int]:
+            result = await self.db.execute_single_query(BOOKS_ESTIMATE_QUERY)
+            return result["count"] if result else None
+
+        total = await resolve_total_async(
+            count_mode, "books", plan["filters"], count_exact, count_estimate
+        )
+        books = await self.db.execute_query(plan["query"], plan["params"])
+        return books_page(books, page, limit, total, plan["sort_by"], after, count_mode)
+
+    async def _fetch_scalar(self, query: str) -> Any:
+        """
+        执行查询并返回第一行第一列的值
+        """
+        result = await self.db.execute_single_query(query)
+        return next(iter(result.values())) if result else None
+
+    async def get_reader_borrow_history(
+        self, reader_id: str, limit: int = 10
+    ) -> List[Dict]:
+        """
+        获取读者的借阅历史，包含书籍和读者的详细信息
+        """
+        return await self.db.execute_query(
+            READER_BORROW_HISTORY_QUERY, (reader_id, limit)
+        )
+
+    async def get_reader_statistics(self, reader_id: str) -> Dict[str, Any]:
+        """
+        获取指定读者的借阅统计信息
+        """
+        stats = await self.db.execute_single_query(READER_STATS_QUERY, (reader_id,))
+        status_result = await self.db.execute_query(READER_STATUS_QUERY, (reader_id,))
+        stats = dict(stats or {})
+        stats["status_count"] = {row["status"]: row["count"] for row in status_result}
+        return parse_reader_statistics(stats)
+
+    async def get_reader_full_history(
+        self, reader_id: str, limit: int = 10
+    ) -> Optional[Dict[str, Any]]:
+        """
+        通过一次查询获取读者信息、最近借阅记录和统计数据，读者不存在时返回 None
+        """
+        row = await self.db.execute_single_query(
+            READER_HISTORY_QUERY, {"reader_id": reader_id, "limit": limit}
+        )
+        return parse_reader_history(row)
+
+    async def get_reader_history_data(
+        self, reader_id: str, limit: int = 10
+    ) -> Dict[str, Any]:
+        """
+        获取完整的读者历史记录，返回结构与 LibraryQuery.get_reader_history_data 相同
+        """
+        history = await self.get_reader_full_history(reader_id, limit)
+        if not history:
+            return {
+                "success": False,
+                "message": f"未找到读者 {reader_id}。",
+                "data": None,
+            }
+        return {"success": True, "message": "查询成功", "data": history}
+
+    async def get_readers_history_batch(
+        self, reader_ids: List[str], limit: int = 10
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        通过一次查询获取多位读者的完整历史，不存在的读者对应 None
+        """
+        reader_ids = list(dict.fromkeys(reader_ids))
+        result = {reader_id: None for reader_id in reader_ids}
+        if not reader_ids:
+            return result
+        rows = await self.db.execute_query(
+            READERS_HISTORY_BATCH_QUERY, {"reader_ids": reader_ids, "limit": limit}
+        )
+        for row in rows:
+            result[row["reader_id"]] = parse_reader_history(row)
+        return result
+
+    async def get_readers_statistics_batch(
+        self, reader_ids: List[str]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        通过一次查询获取多位读者的借阅统计，没有借阅记录的读者统计为 0，不存在的读者对应 None
+        """
+        reader_ids = list(dict.fromkeys(reader_ids))
+        result = {reader_id: None for reader_id in reader_ids}
+        if not reader_ids:
+            return result
+        rows = await self.db.execute_query(
+            READERS_STATISTICS_BATCH_QUERY, {"reader_ids": reader_ids}
+        )
+        for row in rows:
+            result[row["reader_id"]] = parse_reader_statistics(row)
+        return result
+
+    async def save_recommendations(
+        self, reader_id: str, model: str, recommendations: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        将推荐结果写入 recommendation_history
+        """
+        if not recommendations:
+            return True
+        return await self.db.execute_batch_insert(
+            RECOMMENDATION_INSERT_QUERY,
+            [
+                (
+                    reader_id,
+                    model,
+                    rec.get("title"),
+                    rec.get("author"),
+                    rec.get("reason"),
+                )
+                for rec in recommendations
+            ],
+        )
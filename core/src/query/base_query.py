@@ -1,5 +1,194 @@
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List
+from .config import Config
 from .database_connection import DatabaseConnection
+from .pagination import (
+    VALID_SORT_FIELDS,
+    build_pagination,
+    decode_cursor,
+    encode_cursor,
+    keyset_condition,
+    normalize_filters,
+    resolve_total,
+    validate_page,
+)
+from .search import (
+    get_memory_index,
+    rank_keyset_condition,
+    resolve_backend,
+    search_predicate,
+)
+
+READER_INFO_QUERY = "SELECT reader_id, department, reader_type, enroll_year, gender FROM readers WHERE reader_id = %s"
+
+BOOKS_COUNT_QUERY = "SELECT COUNT(*) as count FROM books WHERE {where_clause}"
+
+BOOKS_ESTIMATE_QUERY = (
+    "SELECT reltuples::bigint as count FROM pg_class WHERE oid = 'books'::regclass"
+)
+
+
+def books_list_plan(
+    page: int, limit: int, sort_by: str, sort_order: str, after: str = None
+) -> Dict[str, Any]:
+    """
+    生成图书列表的分页查询，同步与异步查询共用
+
+    返回 sort_by、计数条件 count_where/count_params、筛选键 filters、
+    分页查询 query 及其完整参数 params
+    """
+    sort_by = sort_by.lower() if sort_by.lower() in VALID_SORT_FIELDS else "title"
+    sort_order = sort_order.upper() if sort_order.upper() in ["ASC", "DESC"] else "ASC"
+
+    where_clause = "1=1"
+    params = []
+    if after:
+        sort_value, last_id = decode_cursor(after, sort_by)
+        where_clause, params = keyset_condition(
+            sort_by, sort_order, sort_value, last_id
+        )
+
+    query = f"""
+        SELECT book_id, title, author, publisher, publication_year, call_no, language, doc_type
+        FROM books
+        WHERE {where_clause}
+        ORDER BY {sort_by} {sort_order}, book_id {sort_order}
+        LIMIT %s {"" if after else "OFFSET %s"}
+    """
+    return {
+        "sort_by": sort_by,
+        "count_where": "1=1",
+        "count_params": [],
+        "filters": (),
+        "query": query,
+        "params": _page_params(params, page, limit, after),
+    }
+
+
+def books_search_plan(
+    backend: str,
+    search: str = "",
+    language: str = "",
+    year: int = None,
+    publisher: str = "",
+    author: str = "",
+    page: int = 1,
+    limit: int = 20,
+    after: str = None,
+) -> Dict[str, Any]:
+    """
+    生成图书搜索的分页查询，返回结构与 books_list_plan 相同
+    """
+    where_conditions = []
+    params = []
+    rank_expr, rank_params = None, []
+
+    if search:
+        search_clause, search_params, rank_expr, rank_params = search_predicate(
+            backend, search
+        )
+        where_conditions.append(search_clause)
+        params.extend(search_params)
+    if language:
+        where_conditions.append("language = %s")
+        params.append(language)
+    if year:
+        where_conditions.append("publication_year = %s")
+        params.append(year)
+    if publisher:
+        where_conditions.append("publisher ILIKE %s")
+        params.append(f"%{publisher}%")
+    if author:
+        where_conditions.append("author ILIKE %s")
+        params.append(f"%{author}%")
+
+    ranked = rank_expr is not None
+    sort_by = "rank" if ranked else "title"
+    cursor = decode_cursor(after, sort_by) if after else None
+    where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
+    count_where, count_params = where_clause, list(params)
+
+    if cursor:
+        if ranked:
+            keyset_clause, keyset_params = rank_keyset_condition(
+                rank_expr, rank_params, *cursor
+            )
+        else:
+            keyset_clause, keyset_params = keyset_condition("title", "ASC", *cursor)
+        where_clause = f"{where_clause} AND {keyset_clause}"
+        params.extend(keyset_params)
+
+    select_rank = ""
+    order_clause = "title ASC, book_id ASC"
+    if ranked:
+        # 参数按占位符在 SQL 中出现的顺序排列
+        select_rank = f", {rank_expr} AS rank"
+        order_clause = f"{rank_expr} DESC, {order_clause}"
+        params = rank_params + params + rank_params
+
+    query = f"""
+        SELECT book_id, title, author, publisher, publication_year, call_no, language, doc_type{select_rank}
+        FROM books
+        WHERE {where_clause}
+        ORDER BY {order_clause}
+        LIMIT %s {"" if after else "OFFSET %s"}
+    """
+    return {
+        "sort_by": sort_by,
+        "count_where": count_where,
+        "count_params": count_params,
+        "filters": normalize_filters(
+            search=search,
+            language=language,
+            year=year,
+            publisher=publisher,
+            author=author,
+            backend=backend if search else None,
+        ),
+        "query": query,
+        "params": _page_params(params, page, limit, after),
+    }
+
+
+def _page_params(params: list, page: int, limit: int, after: str) -> tuple:
+    """
+    追加 LIMIT/OFFSET 参数，多取一行用于判断是否还有下一页
+    """
+    validate_page(page, limit)
+    if after:
+        return tuple(params + [limit + 1])
+    return tuple(params + [limit + 1, (page - 1) * limit])
+
+
+def books_page(
+    books: List[Dict[str, Any]],
+    page: int,
+    limit: int,
+    total: Optional[int],
+    sort_by: str,
+    after: str,
+    count_mode: str,
+) -> Dict[str, Any]:
+    """
+    构造分页信息并为结果的最后一行生成下一页游标，返回 books 与 pagination
+    """
+    has_more = len(books) > limit
+    del books[limit:]
+    next_cursor = None
+    if books and has_more:
+        last = books[-1]
+        if sort_by == "rank":
+            sort_value = [last["rank"], last["title"]]
+        else:
+            sort_value = last[sort_by]
+        next_cursor = encode_cursor(sort_by, sort_value, last["book_id"])
+    for book in books:
+        book.pop("rank", None)
+    return {
+        "books": books,
+        "pagination": build_pagination(
+            None if after else page, limit, total, has_more, next_cursor, count_mode
+        ),
+    }
 
 
 class BaseQuery:
@@ -7,10 +196,12 @@ class BaseQuery:
     查询基类
     """
 
-    def __init__(self):
-        self.db = DatabaseConnection()
+    def __init__(self, pooled: bool = None, search_backend: str = None):
+        self.db = DatabaseConnection(pooled=pooled)
+        self.search_backend = search_backend or Config.SEARCH_BACKEND
 
     def __enter__(self):
+        # 连接池模式下借出连接，退出时归还
         self.db.connect()
         return self
 
@@ -21,8 +212,7 @@ class BaseQuery:
         """
         根据读者 ID 获取读者信息
         """
-        query = "SELECT reader_id, department, reader_type, enroll_year, gender FROM readers WHERE reader_id = %s"
-        return self.db.execute_single_query(query, (reader_id,))
+        return self.db.execute_single_query(READER_INFO_QUERY, (reader_id,))
 
     def get_all_books(
         self,
@@ -30,44 +220,17 @@ class BaseQuery:
         limit: int = 20,
         sort_by: str = "title",
         sort_order: str = "ASC",
+        after: str = None,
+        count_mode: str = "exact",
     ) -> Dict[str, Any]:
         """
         检索所有图书的分页列表
-        """
-        offset = (page - 1) * limit
-        valid_sort_fields = [
-            "title",
-            "author",
-            "publication_year",
-            "publisher",
-            "call_no",
-        ]
-        sort_by = sort_by.lower() if sort_by.lower() in valid_sort_fields else "title"
-        sort_order = (
-            sort_order.upper() if sort_order.upper() in ["ASC", "DESC"] else "ASC"
-        )
-
-        count_query = "SELECT COUNT(*) as count FROM books"
-        total_result = self.db.execute_single_query(count_query)
-        total = total_result["count"] if total_result else 0
 
-        query = f"""
-            SELECT book_id, title, author, publisher, publication_year, call_no, language, doc_type
-            FROM books
-            ORDER BY {sort_by} {sort_order}
-            LIMIT %s OFFSET %s
+        传入 after 游标时使用键集分页，按 (排序键, book_id) 定位而不是 OFFSET，
+        深翻页的代价与第一页相同；count_mode 决定总数的计算方式，见 COUNT_MODES
         """
-        books = self.db.execute_query(query, (limit, offset))
-
-        return {
-            "books": books,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": total,
-                "total_pages": (total + limit - 1) // limit,
-            },
-        }
+        plan = books_list_plan(page, limit, sort_by, sort_order, after)
+        return self._run_plan(plan, page, limit, after, count_mode)
 
     def search_books(
         self,
@@ -78,54 +241,75 @@ class BaseQuery:
         author: str = "",
         page: int = 1,
         limit: int = 20,
+        after: str = None,
+        count_mode: str = "exact",
     ) -> Dict[str, Any]:
         """
-        根据多个条件搜索图书
+        根据多个条件搜索图书，传入 after 游标时使用键集分页
+
+        搜索词的匹配方式由 search_backend 决定，非 ilike 后端按相关度排序，
+        此时游标编码 (相关度, 书名, book_id)
         """
-        offset = (page - 1) * limit
-        where_conditions = []
-        params = []
+        backend = resolve_backend(self.search_backend, self._fetch_scalar)
+        if backend == "memory":
+            index = get_memory_index()
+            if index is not None:
+                return index.search_books(
+                    search,
+                    language,
+                    year,
+                    publisher,
+                    author,
+                    page,
+                    limit,
+                    after,
+                    count_mode,
+                )
+            backend = "ilike"
 
-        if search:
-            where_conditions.append(
-                "(title ILIKE %s OR author ILIKE %s OR call_no ILIKE %s)"
-            )
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param, search_param])
-        if language:
-            where_conditions.append("language = %s")
-            params.append(language)
-        if year:
-            where_conditions.append("publication_year = %s")
-            params.append(year)
-        if publisher:
-            where_conditions.append("publisher ILIKE %s")
-            params.append(f"%{publisher}%")
-        if author:
-            where_conditions.append("author ILIKE %s")
-            params.append(f"%{author}%")
-
-        where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-
-        count_query = f"SELECT COUNT(*) as count FROM books WHERE {where_clause}"
-        total_result = self.db.execute_single_query(count_query, tuple(params))
-        total = total_result["count"] if total_result else 0
-
-        query = f"""
-            SELECT book_id, title, author, publisher, publication_year, call_no, language, doc_type
-            FROM books
-            WHERE {where_clause}
-            ORDER BY title ASC
-            LIMIT %s OFFSET %s
+        plan = books_search_plan(
+            backend, search, language, year, publisher, author, page, limit, after
+        )
+        return self._run_plan(plan, page, limit, after, count_mode)
+
+    def _run_plan(
+        self,
+        plan: Dict[str, Any],
+        page: int,
+        limit: int,
+        after: str,
+        count_mode: str,
+    ) -> Dict[str, Any]:
+        """
+        执行计数与分页查询，游标在生成查询时已校验，无效游标不会触发计数
+        """
+        total = self._count_books(
+            plan["count_where"], plan["count_params"], plan["filters"], count_mode
+        )
+        books = self.db.execute_query(plan["query"], plan["params"])
+        return books_page(books, page, limit, total, plan["sort_by"], after, count_mode)
+
+    def _fetch_scalar(self, query: str) -> Any:
+        """
+        执行查询并返回第一行第一列的值
         """
-        books = self.db.execute_query(query, tuple(params + [limit, offset]))
-
-        return {
-            "books": books,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": total,
-                "total_pages": (total + limit - 1) // limit,
-            },
-        }
+        result = self.db.execute_single_query(query)
+        return next(iter(result.values())) if result else None
+
+    def _count_books(
+        self, where_clause: str, params: list, filters: tuple, count_mode: str
+    ) -> Optional[int]:
+        """
+        按 count_mode 获取满足条件的图书总数
+        """
+
+        def count_exact() -> int:
+            query = BOOKS_COUNT_QUERY.format(where_clause=where_clause)
+            result = self.db.execute_single_query(query, tuple(params))
+            return result["count"] if result else 0
+
+        def count_estimate() -> Optional[int]:
+            result = self.db.execute_single_query(BOOKS_ESTIMATE_QUERY)
+            return result["count"] if result else None
+
+        return resolve_total(count_mode, "books", filters, count_exact, count_estimate)
@@ -0,0 +1,253 @@
+import bisect
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pyarrow.compute as pc
+from ..clean.dataset import dataset_mtime, read_dataset
+from .config import Config
+from .pagination import (
+    COUNT_MODES,
+    VALID_SORT_FIELDS,
+    build_pagination,
+    decode_cursor,
+    encode_cursor,
+    validate_page,
+)
+from .search import PARQUET_COLUMNS, InMemoryBookIndex
+
+# 建立前缀索引的字段
+PREFIX_FIELDS = ["title", "author", "call_no"]
+
+
+class CatalogIndex(InMemoryBookIndex):
+    """
+    只读的进程内图书目录，以内存映射方式读取清洗后的 books.parquet
+
+    在二元组倒排索引之上，为每个可排序字段建立有序索引，为书名、作者、索书号建立前缀索引，
+    在内存中完成 get_all_books 与 search_books
+    """
+
+    def __init__(self, parquet_file: str = None):
+        super().__init__(parquet_file or Config.CATALOG_PARQUET_FILE)
+        self._sorted: Dict[str, np.ndarray] = {}
+        self._prefix: Dict[str, Tuple[List[str], np.ndarray]] = {}
+
+    def load(self, table=None):
+        """
+        内存映射读取 Parquet 及其增量分片并构建全部索引
+        """
+        if table is None:
+            table = read_dataset(
+                self.parquet_file, columns=list(PARQUET_COLUMNS), memory_map=True
+            )
+        table = table.select(list(PARQUET_COLUMNS))
+        super().load(table)
+        table = table.rename_columns(list(PARQUET_COLUMNS.values()))
+
+        # 与 PostgreSQL 一致: 升序时 NULL 在最后 (sort_indices 的默认行为)，降序即为升序的逆序
+        self._sorted = {
+            field: pc.sort_indices(
+                table,
+                sort_keys=[(field, "ascending"), ("book_id", "ascending")],
+            ).to_numpy()
+            for field in VALID_SORT_FIELDS
+        }
+
+        self._prefix = {}
+        for field in PREFIX_FIELDS:
+            lowered = self._lowered[field]
+            order = np.array(sorted(range(self.size), key=lowered.__getitem__))
+            self._prefix[field] = ([lowered[row] for row in order], order)
+        return self
+
+    def _key(self, field: str, row: int) -> tuple:
+        value = self.columns[field][row]
+        is_null = value is None or (isinstance(value, float) and np.isnan(value))
+        return (is_null, 0 if is_null else value, self.columns["book_id"][row])
+
+    def prefix_rows(self, field: str, prefix: str) -> np.ndarray:
+        """
+        返回字段值以 prefix 开头 (大小写不敏感) 的全部行号
+        """
+        values, order = self._prefix[field]
+        prefix = prefix.lower()
+        start = bisect.bisect_left(values, prefix)
+        end = bisect.bisect_left(values, prefix + "\U0010ffff", lo=start)
+        return order[start:end]
+
+    def match(
+        self,
+        search: str = "",
+        language: str = "",
+        year: int = None,
+        publisher: str = "",
+        author: str = "",
+    ) -> Tuple[List[int], Dict[int, int]]:
+        """
+        在倒排索引匹配的基础上，用前缀索引一次性找出前缀命中的行并提升其相关度
+        """
+        matched, scores = super().match(search, language, year, publisher, author)
+        if search and matched:
+            for field, weight in (("title", 4), ("author", 2), ("call_no", 1)):
+                for row in self.prefix_rows(field, search).tolist():
+                    if row in scores:
+                        scores[row] += weight
+        return matched, scores
+
+    def _score(self, row: int, needle: str) -> int:
+        score = 0
+        for field, weight in (("title", 4), ("author", 2), ("call_no", 1)):
+            if needle in self._lowered[field][row]:
+                score += weight
+        return score
+
+    def get_all_books(
+        self,
+        page: int = 1,
+        limit: int = 20,
+        sort_by: str = "title",
+        sort_order: str = "ASC",
+        after: str = None,
+        count_mode: str = "exact",
+    ) -> Dict[str, Any]:
+        """
+        与 BaseQuery.get_all_books 相同的签名与返回结构，基于有序索引分页
+        """
+        if count_mode not in COUNT_MODES:
+            raise ValueError(f"无效的总数计算方式: {count_mode}，可选 {COUNT_MODES}")
+        validate_page(page, limit)
+        sort_by = sort_by.lower() if sort_by.lower() in VALID_SORT_FIELDS else "title"
+        descending = sort_order.upper() == "DESC"
+        order = self._sorted[sort_by]
+
+        if after:
+            sort_value, last_id = decode_cursor(after, sort_by)
+            target = (
+                sort_value is None,
+                0 if sort_value is None else sort_value,
+                last_id,
+            )
+
+            def key(row: int) -> tuple:
+                return self._key(sort_by, row)
+
+            if descending:
+                end = bisect.bisect_left(order, target, key=key)
+                rows = order[max(end - limit - 1, 0) : end][::-1]
+            else:
+                start = bisect.bisect_right(order, target, key=key)
+                rows = order[start : start + limit + 1]
+        else:
+            offset = (page - 1) * limit
+            if descending:
+                end = self.size - offset
+                rows = order[max(end - limit - 1, 0) : max(end, 0)][::-1]
+            else:
+                rows = order[offset : offset + limit + 1]
+
+        has_more = len(rows) > limit
+        books = [self._row(row) for row in rows[:limit].tolist()]
+        next_cursor = None
+        if books and has_more:
+            last = books[-1]
+            next_cursor = encode_cursor(sort_by, last[sort_by], last["book_id"])
+
+        return {
+            "books": books,
+            "pagination": build_pagination(
+                None if after else page,
+                limit,
+                None if count_mode == "none" else self.size,
+                has_more,
+                next_cursor,
+                count_mode,
+            ),
+        }
+
+    def search_books(
+        self,
+        search: str = "",
+        language: str = "",
+        year: int = None,
+        publisher: str = "",
+        author: str = "",
+        page: int = 1,
+        limit: int = 20,
+        after: str = None,
+        count_mode: str = "exact",
+    ) -> Dict[str, Any]:
+        """
+        没有任何条件时结果即按书名排序的全部图书，直接切片书名有序索引，无需扫描与排序
+        """
+        if not (search or language or year or publisher or author):
+            return self.get_all_books(page, limit, "title", "ASC", after, count_mode)
+        return super().search_books(
+            search,
+            language,
+            year,
+            publisher,
+            author,
+            page,
+            limit,
+            after,
+            count_mode,
+        )
+
+
+_catalog: Optional[CatalogIndex] = None
+_catalog_lock = threading.Lock()
+_reloading = threading.Event()
+_last_checked = 0.0
+
+
+def load_catalog(parquet_file: str = None) -> Optional[CatalogIndex]:
+    """
+    加载 (或重新加载) 进程共享的目录，新索引构建完成后再替换，期间仍由旧索引提供服务
+    """
+    global _catalog
+    parquet_file = parquet_file or Config.CATALOG_PARQUET_FILE
+    if not os.path.exists(parquet_file):
+        print(f"错误: 未找到目录数据文件 -> {parquet_file}")
+        return None
+    start = time.time()
+    catalog = CatalogIndex(parquet_file).load()
+    with _catalog_lock:
+        _catalog = catalog
+    print(
+        f"图书目录已加载 -> {parquet_file} 共 {catalog.size} 条，耗时 {time.time() - start:.2f}s"
+    )
+    return catalog
+
+
+def _reload_in_background():
+    try:
+        load_catalog()
+    except Exception as e:
+        print(f"错误: 图书目录重新加载失败 -> {e}")
+    finally:
+        _reloading.clear()
+
+
+def get_catalog() -> Optional[CatalogIndex]:
+    """
+    获取进程共享的目录，未加载时同步加载；数据文件被其他进程更新时在后台重新加载
+    """
+    global _last_checked
+    with _catalog_lock:
+        catalog = _catalog
+    if catalog is None:
+        return load_catalog()
+
+    now = time.monotonic()
+    if now - _last_checked >= Config.CATALOG_CHECK_INTERVAL:
+        _last_checked = now
+        try:
+            changed = dataset_mtime(catalog.parquet_file) != catalog.loaded_mtime
+        except OSError:
+            changed = False
+        if changed and not _reloading.is_set():
+            _reloading.set()
+            threading.Thread(target=_reload_in_background, daemon=True).start()
+    return catalog
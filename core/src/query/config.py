@@ -1,3 +1,6 @@
+import os
+
+
 class Config:
     DB_TYPE = "postgresql"
     DB_HOST = "isiou.top"
@@ -5,3 +8,66 @@ class Config:
     DB_NAME = "************************"
     DB_USER = "************************"
     DB_PASSWORD = "************************"
+
+    # 连接池配置
+    POOL_ENABLED = True
+    POOL_MIN_SIZE = 1
+    POOL_MAX_SIZE = 10
+    # 借出连接的最长等待秒数
+    POOL_TIMEOUT = 30
+    # 单个连接被借出多少次后回收重建
+    POOL_MAX_USES = 1000
+    # 借出前是否执行 SELECT 1 健康检查
+    POOL_HEALTH_CHECK = True
+
+    # 预备语句配置，热点查询只在每个连接上解析与规划一次
+    PREPARED_STATEMENTS = True
+    # 每个连接最多保留的预备语句数
+    PREPARED_CACHE_SIZE = 64
+
+    # 查询耗时统计与慢查询日志
+    INSTRUMENTATION_ENABLED = True
+    # 超过该秒数的查询记入慢查询日志
+    SLOW_QUERY_THRESHOLD = 0.5
+    # 慢查询是否附带 EXPLAIN (ANALYZE, BUFFERS) 输出，会再次执行该查询
+    SLOW_QUERY_EXPLAIN = False
+    SLOW_QUERY_LOG_SIZE = 100
+    # 分别统计的归一化语句数上限
+    QUERY_METRICS_MAX_STATEMENTS = 500
+
+    # 分页接口每页允许的最多项数
+    PAGE_MAX_LIMIT = 1000
+
+    # 分页总数缓存配置
+    COUNT_CACHE_TTL = 60
+    COUNT_CACHE_SIZE = 1024
+
+    # 图书搜索后端 ilike/trigram/fulltext/memory，不可用时自动回退
+    SEARCH_BACKEND = "ilike"
+    # memory 后端使用的清洗后图书数据
+    SEARCH_PARQUET_FILE = os.path.join("data", "cleaned", "parquet", "books.parquet")
+
+    # 进程内图书目录，启用后 /books 与 /books/search 直接由内存提供
+    CATALOG_ENABLED = False
+    CATALOG_PARQUET_FILE = SEARCH_PARQUET_FILE
+    # 检查目录数据文件是否被其他进程更新的间隔秒数
+    CATALOG_CHECK_INTERVAL = 5
+
+    # /books 与 /books/search 的响应缓存，按目录版本号与归一化的查询参数缓存序列化后的结果
+    # 目录版本号只在清洗与导入时自动递增，Node 后端等直接写入 books 表的服务
+    # 需在写入后调用 POST /api/v1/operations/cache/catalog 递增版本号，否则最长返回
+    # RESPONSE_CACHE_TTL 秒的旧结果；外部写入方接入之前默认关闭
+    RESPONSE_CACHE_ENABLED = False
+    RESPONSE_CACHE_SIZE = 2048
+    # TTL 兜底未调用上述接口的修改
+    RESPONSE_CACHE_TTL = 600
+    RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    # 浏览器与上游服务可直接复用响应的秒数，之后携带 If-None-Match 重新验证
+    RESPONSE_CACHE_MAX_AGE = 60
+
+    # 读者查询缓存配置，跨请求共享
+    READER_CACHE_SIZE = 1024
+    READER_CACHE_TTL = 300
+    READER_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    # 批量查询接口单次允许的最多读者数
+    READER_BATCH_MAX_SIZE = 1000
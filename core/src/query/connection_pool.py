@@ -0,0 +1,283 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from .config import Config
+from .prepared import PreparedConnection
+
+
+class PoolTimeoutError(Exception):
+    """
+    在等待时间内未能从连接池借出连接
+    """
+
+
+class ConnectionPool:
+    """
+    线程安全的 PostgreSQL 连接池，支持借出超时、健康检查与按使用次数回收
+    """
+
+    def __init__(
+        self,
+        config: Config = None,
+        min_size: int = None,
+        max_size: int = None,
+        timeout: float = None,
+        max_uses: int = None,
+        health_check: bool = None,
+    ):
+        self.config = config or Config()
+        self.min_size = self.config.POOL_MIN_SIZE if min_size is None else min_size
+        self.max_size = self.config.POOL_MAX_SIZE if max_size is None else max_size
+        self.timeout = self.config.POOL_TIMEOUT if timeout is None else timeout
+        self.max_uses = self.config.POOL_MAX_USES if max_uses is None else max_uses
+        self.health_check = (
+            self.config.POOL_HEALTH_CHECK if health_check is None else health_check
+        )
+        if self.max_size < 1 or self.min_size > self.max_size:
+            raise ValueError("连接池大小配置无效")
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._uses: Dict[int, int] = {}
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._counters = {
+            "created": 0,
+            "checkouts": 0,
+            "timeouts": 0,
+            "recycled": 0,
+            "discarded": 0,
+        }
+        self._wait_time_total = 0.0
+
+        try:
+            self._fill_min()
+        except psycopg2.Error as e:
+            print(f"连接池预热失败: {e}")
+
+    def _create(self):
+        conn = psycopg2.connect(
+            host=self.config.DB_HOST,
+            port=self.config.DB_PORT,
+            database=self.config.DB_NAME,
+            user=self.config.DB_USER,
+            password=self.config.DB_PASSWORD,
+            connection_factory=PreparedConnection,
+            cursor_factory=psycopg2.extras.RealDictCursor,
+        )
+        conn.prepared_cache_size = self.config.PREPARED_CACHE_SIZE
+        with self._cond:
+            self._uses[id(conn)] = 0
+            self._counters["created"] += 1
+        return conn
+
+    def _fill_min(self):
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._create()
+            except psycopg2.Error:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def _close(self, conn):
+        with self._cond:
+            self._uses.pop(id(conn), None)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if not self.health_check:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout: float = None):
+        """
+        从连接池借出一个连接，池满时最多等待 timeout 秒
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        conn = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("连接池已关闭")
+                if self._idle:
+                    # 后进先出，优先复用最近归还的热连接
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"等待 {timeout} 秒后仍无可用连接 (max_size={self.max_size})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        if conn is not None and not self._is_healthy(conn):
+            with self._cond:
+                self._counters["discarded"] += 1
+            self._close(conn)
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._create()
+            except psycopg2.Error:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        with self._cond:
+            self._in_use += 1
+            self._counters["checkouts"] += 1
+            self._wait_time_total += time.monotonic() - start
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """
+        归还连接，已关闭、被标记丢弃或达到最大使用次数的连接将被关闭
+        """
+        with self._cond:
+            self._in_use -= 1
+            uses = self._uses.get(id(conn), 0) + 1
+            self._uses[id(conn)] = uses
+            closing = self._closed
+
+        recycle = discard or closing or conn.closed or uses >= self.max_uses
+        if not recycle:
+            # 归还前回滚未结束的事务，保证下一位借用者拿到干净的会话
+            try:
+                status = conn.get_transaction_status()
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                recycle = True
+
+        if recycle:
+            self._close(conn)
+            with self._cond:
+                self._size -= 1
+                self._counters["recycled"] += 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def closeall(self):
+        """
+        关闭池中全部空闲连接，借出中的连接将在归还时关闭
+        """
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        返回连接池当前状态与累计计数，用于容量评估
+        """
+        with self._cond:
+            checkouts = self._counters["checkouts"]
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                **self._counters,
+                "avg_wait_ms": (
+                    round(self._wait_time_total * 1000 / checkouts, 3)
+                    if checkouts
+                    else 0.0
+                ),
+            }
+
+
+_pools: Dict[tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_pools_pid: Optional[int] = None
+# fork 前由父进程创建的连接池，子进程只保留引用不使用: 连接对象被回收时会向服务器发送
+# Terminate，而对应的套接字仍由父进程使用
+_inherited_pools: List[ConnectionPool] = []
+
+
+def _pool_key(config: Config) -> tuple:
+    return (
+        config.DB_HOST,
+        config.DB_PORT,
+        config.DB_NAME,
+        config.DB_USER,
+    )
+
+
+def get_pool(config: Config = None) -> ConnectionPool:
+    """
+    获取当前进程共享的连接池，同一数据库只创建一个
+    """
+    global _pools_pid
+    config = config or Config()
+    key = _pool_key(config)
+    with _pools_lock:
+        # fork 出的子进程不能复用父进程的连接，也不能关闭它们
+        if _pools_pid != os.getpid():
+            _inherited_pools.extend(_pools.values())
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(config)
+            _pools[key] = pool
+        return pool
+
+
+def close_pools():
+    """
+    关闭当前进程的全部连接池，从父进程继承的连接池不关闭
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.closeall()
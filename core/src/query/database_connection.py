@@ -1,7 +1,31 @@
+import time
+import uuid
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any, Iterator
 from .config import Config
+from .connection_pool import get_pool
+from .instrumentation import record_query
+from .prepared import PreparedConnection, prepared_stats
+
+# iter_query 支持的行格式
+ROW_FORMATS = ["dict", "tuple", "arrow"]
+
+# PostgreSQL 类型 OID -> Arrow 类型名，保证各批次的 schema 一致，
+# 不在表中的类型由 pyarrow 按值推断
+ARROW_TYPES = {
+    16: "bool_",
+    20: "int64",
+    21: "int16",
+    23: "int32",
+    700: "float32",
+    701: "float64",
+    25: "string",
+    1042: "string",
+    1043: "string",
+    1082: "date32",
+}
 
 
 class DatabaseConnection:
@@ -9,9 +33,13 @@ class DatabaseConnection:
     统一数据库连接类
     """
 
-    def __init__(self, config: Config = None):
+    def __init__(self, config: Config = None, pooled: bool = None):
         self.config = config or Config()
         self.conn = None
+        self.pooled = self.config.POOL_ENABLED if pooled is None else pooled
+        self._pool = None
+        # 执行失败的查询数，查询方法出错时只返回空结果，调用方据此区分出错与确实为空
+        self.errors = 0
         if self.config.DB_TYPE != "postgresql":
             raise ValueError("仅适用于 PostgreSQL 数据库")
 
@@ -24,65 +52,208 @@ class DatabaseConnection:
 
     def connect(self):
         """
-        建立数据库连接
+        建立数据库连接，连接池模式下从进程共享的连接池借出
         """
         if self.conn is None:
             try:
+                if self.pooled:
+                    self._pool = get_pool(self.config)
+                    self.conn = self._pool.getconn()
+                    return
                 self.conn = psycopg2.connect(
                     host=self.config.DB_HOST,
                     port=self.config.DB_PORT,
                     database=self.config.DB_NAME,
                     user=self.config.DB_USER,
                     password=self.config.DB_PASSWORD,
+                    connection_factory=PreparedConnection,
                     cursor_factory=psycopg2.extras.RealDictCursor,
                 )
+                self.conn.prepared_cache_size = self.config.PREPARED_CACHE_SIZE
             except psycopg2.Error as e:
                 print(f"数据库连接失败: {e}")
                 raise
 
     def disconnect(self):
         """
-        关闭数据库连接
+        关闭数据库连接，连接池模式下归还给连接池
         """
         if self.conn:
-            self.conn.close()
+            if self._pool is not None:
+                self._pool.putconn(self.conn)
+                self._pool = None
+            else:
+                self.conn.close()
             self.conn = None
 
-    def _execute(self, query: str, params: tuple = (), fetch: str = None):
+    def pool_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        获取连接池统计信息，非连接池模式返回 None
+        """
+        if not self.pooled:
+            return None
+        return get_pool(self.config).stats()
+
+    def prepared_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        获取预备语句的累计计数及当前连接缓存的语句数，未连接时返回 None
+        """
+        if not isinstance(self.conn, PreparedConnection):
+            return None
+        return {**prepared_stats(), "cached": self.conn.prepared_count}
+
+    def _execute(
+        self, query: str, params: tuple = (), fetch: str = None, prepare: bool = None
+    ):
         """
         用于执行查询的私有辅助方法
+
+        prepare 为真时通过连接上缓存的预备语句执行，默认取 PREPARED_STATEMENTS 配置
         """
         if self.conn is None:
             print("错误: 数据库未连接")
             return None
+        prepare = self.config.PREPARED_STATEMENTS if prepare is None else prepare
+        start = time.perf_counter()
         try:
             with self.conn.cursor() as cursor:
-                cursor.execute(query, params)
+                if prepare and isinstance(self.conn, PreparedConnection):
+                    self.conn.execute_prepared(cursor, query, params)
+                else:
+                    cursor.execute(query, params)
                 if fetch == "one":
-                    return cursor.fetchone()
-                if fetch == "all":
-                    return cursor.fetchall()
-                self.conn.commit()
-                return cursor.rowcount
+                    result = cursor.fetchone()
+                    rows = 1 if result else 0
+                elif fetch == "all":
+                    result = cursor.fetchall()
+                    rows = len(result)
+                else:
+                    self.conn.commit()
+                    result = rows = cursor.rowcount
         except psycopg2.Error as e:
             print(f"查询执行失败: {e}")
+            self.errors += 1
+            self.conn.rollback()
+            record_query(query, params, time.perf_counter() - start, None, str(e))
+            return None
+        record_query(
+            query,
+            params,
+            time.perf_counter() - start,
+            rows,
+            explain=lambda: self._explain(query, params),
+        )
+        return result
+
+    def _explain(self, query: str, params: tuple = ()) -> Optional[str]:
+        """
+        获取查询的 EXPLAIN (ANALYZE, BUFFERS) 输出
+
+        在保存点中执行并在结束后回滚到保存点，不留下任何副作用
+        """
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute("SAVEPOINT explain_query")
+                try:
+                    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query}", params)
+                    return "\n".join(
+                        next(iter(row.values())) if isinstance(row, dict) else row[0]
+                        for row in cursor.fetchall()
+                    )
+                finally:
+                    cursor.execute("ROLLBACK TO SAVEPOINT explain_query")
+        except psycopg2.Error as e:
+            print(f"获取执行计划失败: {e}")
             self.conn.rollback()
             return None
 
-    def execute_query(self, query: str, params: tuple = ()) -> Optional[List[Dict]]:
+    def execute_query(
+        self, query: str, params: tuple = (), prepare: bool = None
+    ) -> Optional[List[Dict]]:
         """
         执行查询并以字典列表形式返回所有结果
         """
-        results = self._execute(query, params, fetch="all")
+        results = self._execute(query, params, fetch="all", prepare=prepare)
         return results if results else []
 
-    def execute_single_query(self, query: str, params: tuple = ()) -> Optional[Dict]:
+    def execute_single_query(
+        self, query: str, params: tuple = (), prepare: bool = None
+    ) -> Optional[Dict]:
         """
         执行查询并以单个字典形式返回结果
         """
-        result = self._execute(query, params, fetch="one")
+        result = self._execute(query, params, fetch="one", prepare=prepare)
         return result if result else None
 
+    def iter_query(
+        self,
+        query: str,
+        params: tuple = (),
+        batch_size: int = 2000,
+        row_format: str = "dict",
+    ) -> Iterator[Any]:
+        """
+        通过命名的服务端游标流式读取查询结果，内存占用与结果集大小无关
+
+        row_format 为 dict 或 tuple 时逐行返回，每次从服务端取 batch_size 行；
+        为 arrow 时每次返回一个包含 batch_size 行的 pyarrow.RecordBatch。
+        游标在同一事务中执行，遍历结束或提前中止时关闭游标并结束事务；
+        查询出错时同样先清理再抛出，调用方不会把出错误认为结果为空
+        """
+        if row_format not in ROW_FORMATS:
+            raise ValueError(f"无效的行格式: {row_format}，可选 {ROW_FORMATS}")
+        if self.conn is None:
+            print("错误: 数据库未连接")
+            return
+        cursor_factory = (
+            psycopg2.extras.RealDictCursor
+            if row_format == "dict"
+            else psycopg2.extensions.cursor
+        )
+        cursor = self.conn.cursor(
+            name=f"stream_{uuid.uuid4().hex}", cursor_factory=cursor_factory
+        )
+        cursor.itersize = batch_size
+        try:
+            cursor.execute(query, params)
+            if row_format != "arrow":
+                yield from cursor
+                return
+
+            import pyarrow as pa
+
+            # 命名游标在第一次取数后才有 description
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            names = [column.name for column in cursor.description]
+            types = [
+                (
+                    getattr(pa, ARROW_TYPES[column.type_code])()
+                    if column.type_code in ARROW_TYPES
+                    else None
+                )
+                for column in cursor.description
+            ]
+            while rows:
+                yield pa.RecordBatch.from_arrays(
+                    [
+                        pa.array(values, type=type_)
+                        for values, type_ in zip(zip(*rows), types)
+                    ],
+                    names=names,
+                )
+                rows = cursor.fetchmany(batch_size)
+        except psycopg2.Error as e:
+            print(f"查询执行失败: {e}")
+            raise
+        finally:
+            try:
+                cursor.close()
+            except psycopg2.Error:
+                pass
+            self.conn.rollback()
+
     def execute_insert(self, query: str, params: tuple = ()) -> bool:
         """
         执行插入操作若成功则返回 True
@@ -97,10 +268,12 @@ class DatabaseConnection:
             print("错误: 数据库未连接")
             return False
         try:
+            start = time.perf_counter()
             with self.conn.cursor() as cursor:
                 psycopg2.extras.execute_batch(cursor, query, params_list)
                 self.conn.commit()
-                return True
+            record_query(query, (), time.perf_counter() - start, len(params_list))
+            return True
         except psycopg2.Error as e:
             print(f"批量插入失败: {e}")
             self.conn.rollback()
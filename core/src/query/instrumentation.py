@@ -0,0 +1,321 @@
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from .config import Config
+
+# 查询耗时直方图的桶上限 (秒)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 只对只读语句执行 EXPLAIN ANALYZE
+EXPLAINABLE_PATTERN = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"(?:%s\s*,\s*)+%s")
+_WHITESPACE = re.compile(r"\s+")
+
+# 超过语句数上限后新出现的语句统一计入该键，避免指标基数无限增长
+OTHER_STATEMENT = "<other>"
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(query: str) -> str:
+    """
+    归一化 SQL 文本作为指标的键: 合并空白，字面量替换为 ?，不定长的占位符列表合并为一个
+    """
+    query = _STRING_LITERAL.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    query = _PLACEHOLDER_LIST.sub("%s, ...", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def statement_id(normalized: str) -> str:
+    """
+    归一化语句的短哈希，用作指标标签
+    """
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+def redact_params(params: Any) -> Any:
+    """
+    将参数值替换为类型描述，慢查询日志中不出现读者 ID、搜索词等实际数据
+    """
+    if isinstance(params, dict):
+        return {key: _redact_value(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_redact_value(value) for value in params]
+    return _redact_value(params)
+
+
+def _redact_value(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, (list, tuple)):
+        return f"<{type(value).__name__}[{len(value)}]>"
+    return f"<{type(value).__name__}>"
+
+
+class QueryMetrics:
+    """
+    按归一化语句统计执行次数、耗时直方图、返回行数与错误数
+    """
+
+    def __init__(
+        self, buckets: Tuple[float, ...] = LATENCY_BUCKETS, max_statements: int = None
+    ):
+        self.buckets = buckets
+        self.max_statements = (
+            Config.QUERY_METRICS_MAX_STATEMENTS
+            if max_statements is None
+            else max_statements
+        )
+        self._lock = threading.Lock()
+        self._statements: Dict[str, Dict[str, Any]] = {}
+
+    def __call__(self, event: Dict[str, Any]):
+        self.record(event)
+
+    def record(self, event: Dict[str, Any]):
+        """
+        记录一次查询，event 的结构见 record_query
+        """
+        key = event["normalized"]
+        duration = event["duration"]
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                if len(self._statements) >= self.max_statements:
+                    key = OTHER_STATEMENT
+                    stats = self._statements.get(key)
+                if stats is None:
+                    stats = {
+                        "id": statement_id(key),
+                        "buckets": [0] * len(self.buckets),
+                        "count": 0,
+                        "sum": 0.0,
+                        "max": 0.0,
+                        "rows": 0,
+                        "errors": 0,
+                    }
+                    self._statements[key] = stats
+            for i, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    stats["buckets"][i] += 1
+                    break
+            stats["count"] += 1
+            stats["sum"] += duration
+            stats["max"] = max(stats["max"], duration)
+            stats["rows"] += event["rows"] or 0
+            if event["error"]:
+                stats["errors"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        返回各语句统计的副本
+        """
+        with self._lock:
+            return {
+                key: {**stats, "buckets": list(stats["buckets"])}
+                for key, stats in self._statements.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+
+
+class SlowQueryLog:
+    """
+    记录耗时超过阈值的查询，参数已脱敏；启用 explain 时附带 EXPLAIN (ANALYZE, BUFFERS) 输出
+    """
+
+    def __init__(
+        self, threshold: float = None, explain: bool = None, max_entries: int = None
+    ):
+        self.threshold = Config.SLOW_QUERY_THRESHOLD if threshold is None else threshold
+        self.explain = Config.SLOW_QUERY_EXPLAIN if explain is None else explain
+        self._entries = deque(
+            maxlen=Config.SLOW_QUERY_LOG_SIZE if max_entries is None else max_entries
+        )
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def __call__(self, event: Dict[str, Any]):
+        if event["duration"] < self.threshold:
+            return
+        entry = {
+            "time": time.time(),
+            "statement_id": statement_id(event["normalized"]),
+            "statement": event["normalized"],
+            "params": redact_params(event["params"]),
+            "duration_ms": round(event["duration"] * 1000, 3),
+            "rows": event["rows"],
+            "error": event["error"],
+            "plan": None,
+        }
+        explain = event.get("explain")
+        if (
+            self.explain
+            and explain is not None
+            and not event["error"]
+            and EXPLAINABLE_PATTERN.match(event["query"])
+        ):
+            entry["plan"] = explain()
+        with self._lock:
+            self._entries.append(entry)
+            self.total += 1
+        print(
+            f"慢查询 {entry['duration_ms']}ms [{entry['statement_id']}]: "
+            f"{entry['statement']} 参数: {entry['params']}"
+        )
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        返回最近的慢查询记录，最新的在前
+        """
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 进程内共享的默认指标与慢查询日志
+query_metrics = QueryMetrics()
+slow_query_log = SlowQueryLog()
+
+_observers: List[Callable[[Dict[str, Any]], None]] = [query_metrics, slow_query_log]
+_observers_lock = threading.Lock()
+
+
+def register_observer(observer: Callable[[Dict[str, Any]], None]):
+    """
+    注册查询观察者，每次查询结束后以事件字典调用，例如接入外部监控
+    """
+    with _observers_lock:
+        if observer not in _observers:
+            _observers.append(observer)
+
+
+def unregister_observer(observer: Callable[[Dict[str, Any]], None]):
+    """
+    移除查询观察者
+    """
+    with _observers_lock:
+        if observer in _observers:
+            _observers.remove(observer)
+
+
+def record_query(
+    query: str,
+    params: Any,
+    duration: float,
+    rows: Optional[int],
+    error: Optional[str] = None,
+    explain: Callable[[], Optional[str]] = None,
+):
+    """
+    通知所有观察者一次查询已结束
+
+    事件包含原始语句 query、归一化语句 normalized、参数 params、耗时 duration (秒)、
+    返回或影响的行数 rows、错误信息 error，以及按需获取执行计划的 explain 回调
+    """
+    if not Config.INSTRUMENTATION_ENABLED:
+        return
+    event = {
+        "query": query,
+        "normalized": normalize_sql(query),
+        "params": params,
+        "duration": duration,
+        "rows": rows,
+        "error": error,
+        "explain": explain,
+    }
+    with _observers_lock:
+        observers = list(_observers)
+    for observer in observers:
+        try:
+            observer(event)
+        except Exception as e:
+            print(f"查询观察者执行失败: {e}")
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def render_prometheus(
+    extra: Iterable[Tuple[str, Dict[str, Any], Dict[str, Any]]] = (),
+    metrics: QueryMetrics = None,
+) -> str:
+    """
+    以 Prometheus 文本格式输出查询指标
+
+    extra 为 (指标前缀, 标签, 统计字典) 的序列，统计字典中的数值输出为 前缀_键 的 gauge，
+    用于附加连接池、预备语句与缓存等统计
+    """
+    metrics = metrics or query_metrics
+    snapshot = metrics.snapshot()
+    lines = [
+        "# HELP db_query_duration_seconds 查询耗时",
+        "# TYPE db_query_duration_seconds histogram",
+    ]
+    for stats in snapshot.values():
+        cumulative = 0
+        for bound, count in zip(metrics.buckets, stats["buckets"]):
+            cumulative += count
+            labels = _labels({"statement": stats["id"], "le": bound})
+            lines.append(f"db_query_duration_seconds_bucket{labels} {cumulative}")
+        labels = _labels({"statement": stats["id"], "le": "+Inf"})
+        lines.append(f"db_query_duration_seconds_bucket{labels} {stats['count']}")
+        labels = _labels({"statement": stats["id"]})
+        lines.append(f"db_query_duration_seconds_sum{labels} {stats['sum']:.6f}")
+        lines.append(f"db_query_duration_seconds_count{labels} {stats['count']}")
+
+    for name, key, help_text in (
+        ("db_query_rows_total", "rows", "查询返回或影响的行数"),
+        ("db_query_errors_total", "errors", "查询失败次数"),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for stats in snapshot.values():
+            labels = _labels({"statement": stats["id"]})
+            lines.append(f"{name}{labels} {stats[key]}")
+
+    lines += [
+        "# HELP db_query_info 语句标签对应的归一化 SQL",
+        "# TYPE db_query_info gauge",
+    ]
+    for normalized, stats in snapshot.items():
+        labels = _labels({"statement": stats["id"], "sql": normalized[:200]})
+        lines.append(f"db_query_info{labels} 1")
+
+    lines += [
+        "# HELP db_slow_queries_total 超过慢查询阈值的查询次数",
+        "# TYPE db_slow_queries_total counter",
+        f"db_slow_queries_total {slow_query_log.total}",
+    ]
+
+    # 同名指标的样本需要连续输出
+    families: Dict[str, List[str]] = {}
+    for prefix, labels, stats in extra:
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{prefix}_{key}"
+            families.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+    for name, samples in families.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines += samples
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,302 @@
 import json
-from typing import Dict, Any, List
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from .base_query import BaseQuery
+from .cache import LRUCache
+from .config import Config
+
+# 进程内共享的读者查询缓存
+reader_cache = LRUCache(
+    max_entries=Config.READER_CACHE_SIZE,
+    ttl=Config.READER_CACHE_TTL,
+    max_bytes=Config.READER_CACHE_MAX_BYTES,
+)
+
+_MISSING = object()
+
+
+def reader_cache_key(method: str, reader_id: str, *args) -> tuple:
+    """
+    读者查询在 reader_cache 中的键，例如 ("borrow_history", reader_id, limit)
+    """
+    return (method, reader_id) + args
+
+
+def get_or_set_reader(
+    method: str,
+    reader_id: str,
+    args: tuple,
+    loader: Callable[[], Any],
+    store: Callable[[Any], bool] = bool,
+    cache: LRUCache = None,
+) -> Any:
+    """
+    读取读者查询的缓存，未命中时调用 loader 查询，store 判断为真的结果以读者 ID 为标签写入缓存
+    """
+    cache = cache if cache is not None else reader_cache
+    key = reader_cache_key(method, reader_id, *args)
+    result = cache.get(key, _MISSING)
+    if result is not _MISSING:
+        return result
+    result = loader()
+    if store(result):
+        cache.set(key, result, tags=(reader_id,))
+    return result
+
+
+async def get_or_set_reader_async(
+    method: str,
+    reader_id: str,
+    args: tuple,
+    loader: Callable[[], Awaitable[Any]],
+    store: Callable[[Any], bool] = bool,
+    cache: LRUCache = None,
+) -> Any:
+    """
+    get_or_set_reader 的异步版本，loader 为协程函数，与同步查询共用缓存键
+    """
+    cache = cache if cache is not None else reader_cache
+    key = reader_cache_key(method, reader_id, *args)
+    result = cache.get(key, _MISSING)
+    if result is not _MISSING:
+        return result
+    result = await loader()
+    if store(result):
+        cache.set(key, result, tags=(reader_id,))
+    return result
+
+
+# 读者最近的借阅记录，包含书籍和读者的详细信息，参数为 reader_id 与 limit
+READER_BORROW_HISTORY_QUERY = """
+    SELECT
+        br.borrow_id, br.reader_id, br.book_id, br.borrow_date, br.due_date,
+        br.return_date, br.status,
+        b.title as book_title, b.call_no, b.author, b.publisher, b.publication_year as publish_year,
+        b.language, b.doc_type,
+        r.department as reader_department, r.reader_type as reader_type, r.enroll_year
+    FROM borrow_records br
+    JOIN books b ON br.book_id = b.book_id
+    JOIN readers r ON br.reader_id = r.reader_id
+    WHERE br.reader_id = %s
+    ORDER BY br.borrow_date DESC, br.borrow_id DESC
+    LIMIT %s
+"""
+
+# 读者的借阅总数与不同书籍数
+READER_STATS_QUERY = """
+    SELECT
+        COUNT(*) as total_records,
+        COUNT(DISTINCT book_id) as unique_books
+    FROM borrow_records
+    WHERE reader_id = %s
+"""
+
+# 读者按状态统计的借阅数
+READER_STATUS_QUERY = """
+    SELECT status, COUNT(*) as count
+    FROM borrow_records
+    WHERE reader_id = %s
+    GROUP BY status
+"""
+
+# 一条语句取回读者信息、最近 N 条借阅记录与完整统计，参数为 reader_id 与 limit
+# 读者不存在时不返回任何行
+READER_HISTORY_QUERY = """
+    WITH reader AS (
+        SELECT reader_id, department, reader_type, enroll_year, gender
+        FROM readers
+        WHERE reader_id = %(reader_id)s
+    ),
+    recent AS (
+        SELECT
+            br.borrow_id, br.reader_id, br.book_id, br.borrow_date, br.due_date,
+            br.return_date, br.status,
+            b.title AS book_title, b.call_no, b.author, b.publisher,
+            b.publication_year AS publish_year, b.language, b.doc_type,
+            r.department AS reader_department, r.reader_type, r.enroll_year
+        FROM borrow_records br
+        JOIN books b ON br.book_id = b.book_id
+        JOIN reader r ON br.reader_id = r.reader_id
+        WHERE br.reader_id = %(reader_id)s
+        ORDER BY br.borrow_date DESC, br.borrow_id DESC
+        LIMIT %(limit)s
+    ),
+    status_counts AS (
+        SELECT
+            status, GROUPING(status) = 1 AS is_total,
+            COUNT(*) AS count, COUNT(DISTINCT book_id) AS unique_books
+        FROM borrow_records
+        WHERE reader_id = %(reader_id)s
+        GROUP BY ROLLUP (status)
+    )
+    SELECT
+        row_to_json(reader) AS reader_info,
+        COALESCE(
+            (
+                SELECT json_agg(recent ORDER BY borrow_date DESC, borrow_id DESC)
+                FROM recent
+            ),
+            '[]'::json
+        ) AS borrow_records,
+        COALESCE(
+            (SELECT count FROM status_counts WHERE is_total), 0
+        ) AS total_records,
+        COALESCE(
+            (SELECT unique_books FROM status_counts WHERE is_total), 0
+        ) AS unique_books,
+        COALESCE(
+            (
+                SELECT json_object_agg(COALESCE(status, ''), count)
+                FROM status_counts
+                WHERE NOT is_total
+            ),
+            '{}'::json
+        ) AS status_count
+    FROM reader
+"""
+
+# 按读者汇总借阅统计，参数 reader_ids 为读者 ID 列表
+_READERS_STATISTICS_CTE = """
+    status_counts AS (
+        SELECT
+            reader_id, status, GROUPING(status) = 1 AS is_total,
+            COUNT(*) AS count, COUNT(DISTINCT book_id) AS unique_books
+        FROM borrow_records
+        WHERE reader_id = ANY(%(reader_ids)s)
+        GROUP BY reader_id, ROLLUP (status)
+    ),
+    statistics AS (
+        SELECT
+            reader_id,
+            MAX(count) FILTER (WHERE is_total) AS total_records,
+            MAX(unique_books) FILTER (WHERE is_total) AS unique_books,
+            json_object_agg(COALESCE(status, ''), count)
+                FILTER (WHERE NOT is_total) AS status_count
+        FROM status_counts
+        GROUP BY reader_id
+    )
+"""
+
+# 批量获取读者的借阅统计，每位读者一行，没有借阅记录的读者统计为 0，不存在的读者不返回行
+READERS_STATISTICS_BATCH_QUERY = (
+    """
+    WITH reader AS (
+        SELECT reader_id FROM readers WHERE reader_id = ANY(%(reader_ids)s)
+    ),"""
+    + _READERS_STATISTICS_CTE
+    + """
+    SELECT
+        reader.reader_id,
+        COALESCE(statistics.total_records, 0) AS total_records,
+        COALESCE(statistics.unique_books, 0) AS unique_books,
+        COALESCE(statistics.status_count, '{}'::json) AS status_count
+    FROM reader
+    LEFT JOIN statistics ON statistics.reader_id = reader.reader_id
+"""
+)
+
+# 批量获取读者信息、每位读者最近 N 条借阅记录与完整统计，参数为 reader_ids 与 limit
+# 每位读者一行，不存在的读者不返回行
+READERS_HISTORY_BATCH_QUERY = (
+    """
+    WITH reader AS (
+        SELECT reader_id, department, reader_type, enroll_year, gender
+        FROM readers
+        WHERE reader_id = ANY(%(reader_ids)s)
+    ),
+    ranked AS (
+        SELECT
+            br.borrow_id, br.reader_id, br.book_id, br.borrow_date, br.due_date,
+            br.return_date, br.status,
+            b.title AS book_title, b.call_no, b.author, b.publisher,
+            b.publication_year AS publish_year, b.language, b.doc_type,
+            r.department AS reader_department, r.reader_type, r.enroll_year,
+            ROW_NUMBER() OVER (
+                PARTITION BY br.reader_id
+                ORDER BY br.borrow_date DESC, br.borrow_id DESC
+            ) AS rn
+        FROM borrow_records br
+        JOIN books b ON br.book_id = b.book_id
+        JOIN reader r ON br.reader_id = r.reader_id
+        WHERE br.reader_id = ANY(%(reader_ids)s)
+    ),
+    recent AS (
+        SELECT reader_id, json_agg(to_jsonb(ranked) - 'rn' ORDER BY rn) AS records
+        FROM ranked
+        WHERE rn <= %(limit)s
+        GROUP BY reader_id
+    ),"""
+    + _READERS_STATISTICS_CTE
+    + """
+    SELECT
+        reader.reader_id,
+        row_to_json(reader) AS reader_info,
+        COALESCE(recent.records, '[]'::json) AS borrow_records,
+        COALESCE(statistics.total_records, 0) AS total_records,
+        COALESCE(statistics.unique_books, 0) AS unique_books,
+        COALESCE(statistics.status_count, '{}'::json) AS status_count
+    FROM reader
+    LEFT JOIN recent ON recent.reader_id = reader.reader_id
+    LEFT JOIN statistics ON statistics.reader_id = reader.reader_id
+"""
+)
+
+# json_agg 会把日期序列化为字符串，取回后需要还原
+_DATE_FIELDS = ("borrow_date", "due_date", "return_date")
+
+
+def parse_reader_history(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    将 READER_HISTORY_QUERY 的结果行整理为 reader_info、borrow_records、statistics 结构
+    """
+    if not row:
+        return None
+    records = []
+    for record in row["borrow_records"] or []:
+        for field in _DATE_FIELDS:
+            if record.get(field):
+                record[field] = date.fromisoformat(record[field])
+        records.append(record)
+    return {
+        "reader_info": row["reader_info"],
+        "borrow_records": records,
+        "statistics": parse_reader_statistics(row),
+    }
+
+
+def parse_reader_statistics(row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    从包含 total_records、unique_books、status_count 的结果行提取统计，行为空时统计为 0
+    """
+    row = row or {}
+    return {
+        "total_records": int(row.get("total_records") or 0),
+        "unique_books": int(row.get("unique_books") or 0),
+        "status_count": row.get("status_count") or {},
+    }
+
+
+def nest_borrow_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将扁平的借阅记录整理为 API 使用的嵌套书籍结构
+    """
+    return {
+        "borrow_id": record["borrow_id"],
+        "borrow_date": record["borrow_date"],
+        "due_date": record["due_date"],
+        "return_date": record["return_date"],
+        "status": record["status"],
+        "book": {
+            "book_id": record["book_id"],
+            "title": record["book_title"],
+            "author": record["author"],
+            "publisher": record["publisher"],
+            "publication_year": record["publish_year"],
+            "call_no": record["call_no"],
+            "language": record["language"],
+            "doc_type": record["doc_type"],
+        },
+    }
 
 
 class LibraryQuery(BaseQuery):
@@ -12,41 +308,15 @@ class LibraryQuery(BaseQuery):
         """
         获取读者的借阅历史，包含书籍和读者的详细信息
         """
-        query = """
-            SELECT 
-                br.borrow_id, br.reader_id, br.book_id, br.borrow_date, br.due_date,
-                br.return_date, br.status,
-                b.title as book_title, b.call_no, b.author, b.publisher, b.publication_year as publish_year,
-                r.department as reader_department, r.reader_type as reader_type, r.enroll_year
-            FROM borrow_records br
-            JOIN books b ON br.book_id = b.book_id
-            JOIN readers r ON br.reader_id = r.reader_id
-            WHERE br.reader_id = %s
-            ORDER BY br.borrow_date DESC
-            LIMIT %s
-        """
-        return self.db.execute_query(query, (reader_id, limit))
+        return self.db.execute_query(READER_BORROW_HISTORY_QUERY, (reader_id, limit))
 
     def get_reader_statistics(self, reader_id: str) -> Dict[str, Any]:
         """
         获取指定读者的借阅统计信息
         """
-        stats_query = """
-            SELECT 
-                COUNT(*) as total_records, 
-                COUNT(DISTINCT book_id) as unique_books
-            FROM borrow_records 
-            WHERE reader_id = %s
-        """
-        stats = self.db.execute_single_query(stats_query, (reader_id,)) or {}
+        stats = self.db.execute_single_query(READER_STATS_QUERY, (reader_id,)) or {}
 
-        status_query = """
-            SELECT status, COUNT(*) as count
-            FROM borrow_records 
-            WHERE reader_id = %s 
-            GROUP BY status
-        """
-        status_result = self.db.execute_query(status_query, (reader_id,))
+        status_result = self.db.execute_query(READER_STATUS_QUERY, (reader_id,))
         status_count = {row["status"]: row["count"] for row in status_result}
 
         return {
@@ -61,27 +331,67 @@ class LibraryQuery(BaseQuery):
         """
         获取完整的读者历史记录，包括个人信息、借阅记录和统计数据，并以字典形式返回
         """
-        reader_info = self.get_reader_info(reader_id)
-        if not reader_info:
+        history = self.get_reader_full_history(reader_id, limit)
+        if not history:
             return {
                 "success": False,
                 "message": f"未找到读者 {reader_id}。",
                 "data": None,
             }
 
-        records = self.get_reader_borrow_history(reader_id, limit)
-        statistics = self.get_reader_statistics(reader_id)
-
         return {
             "success": True,
             "message": "查询成功",
-            "data": {
-                "reader_info": reader_info,
-                "borrow_records": records,
-                "statistics": statistics,
-            },
+            "data": history,
         }
 
+    def get_reader_full_history(
+        self, reader_id: str, limit: int = 10
+    ) -> Optional[Dict[str, Any]]:
+        """
+        通过一次查询获取读者信息、最近借阅记录和统计数据，读者不存在时返回 None
+        """
+        row = self.db.execute_single_query(
+            READER_HISTORY_QUERY, {"reader_id": reader_id, "limit": limit}
+        )
+        return parse_reader_history(row)
+
+    def get_readers_history_batch(
+        self, reader_ids: List[str], limit: int = 10
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        通过一次查询获取多位读者的个人信息、最近 limit 条借阅记录和统计数据
+
+        返回以读者 ID 为键、按传入顺序排列的字典，不存在的读者对应 None
+        """
+        reader_ids = list(dict.fromkeys(reader_ids))
+        result = {reader_id: None for reader_id in reader_ids}
+        if not reader_ids:
+            return result
+        rows = self.db.execute_query(
+            READERS_HISTORY_BATCH_QUERY, {"reader_ids": reader_ids, "limit": limit}
+        )
+        for row in rows:
+            result[row["reader_id"]] = parse_reader_history(row)
+        return result
+
+    def get_readers_statistics_batch(
+        self, reader_ids: List[str]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        通过一次查询获取多位读者的借阅统计，没有借阅记录的读者统计为 0，不存在的读者对应 None
+        """
+        reader_ids = list(dict.fromkeys(reader_ids))
+        result = {reader_id: None for reader_id in reader_ids}
+        if not reader_ids:
+            return result
+        rows = self.db.execute_query(
+            READERS_STATISTICS_BATCH_QUERY, {"reader_ids": reader_ids}
+        )
+        for row in rows:
+            result[row["reader_id"]] = parse_reader_statistics(row)
+        return result
+
     def get_reader_history_json(self, reader_id: str, limit: int = 10) -> str:
         """
         获取完整的读者历史记录，并以 JSON 字符串形式返回
@@ -93,39 +403,102 @@ class LibraryQuery(BaseQuery):
 class CachedLibraryQuery(LibraryQuery):
     """
     LibraryQuery 的缓存版本，用于加速重复查询
+
+    默认使用进程内共享的 reader_cache，缓存可跨 with 块和请求复用；
+    读者数据变更后调用 invalidate_reader 失效该读者的全部缓存
     """
 
-    def __init__(self, cache_size: int = 100):
+    def __init__(self, cache_size: int = None, cache: LRUCache = None):
         super().__init__()
-        self.cache_size = cache_size
-        self._cache: Dict[str, Any] = {}
-        self._access_order: list = []
+        if cache is None and cache_size is not None:
+            cache = LRUCache(
+                max_entries=cache_size,
+                ttl=Config.READER_CACHE_TTL,
+                max_bytes=Config.READER_CACHE_MAX_BYTES,
+            )
+        self._cache = cache if cache is not None else reader_cache
+        self.cache_size = self._cache.max_entries
+
+    def _cached(self, method: str, reader_id: str, args: tuple, loader, store=bool):
+        """
+        查询期间有语句执行失败时 (例如连接断开或语句超时)，返回的空结果不写入缓存
+        """
+        errors = self.db.errors
+        return get_or_set_reader(
+            method,
+            reader_id,
+            args,
+            loader,
+            lambda result: self.db.errors == errors and store(result),
+            self._cache,
+        )
+
+    def _reader_exists(self, reader_id: str) -> bool:
+        return self.get_reader_info(reader_id) is not None
 
-    def _get_cache_key(self, reader_id: str, limit: int) -> str:
-        return f"{reader_id}:{limit}"
+    def get_reader_info(self, reader_id: str) -> Optional[Dict[str, Any]]:
+        """
+        重写基类方法，未找到的读者不缓存
+        """
+        return self._cached(
+            "reader_info",
+            reader_id,
+            (),
+            lambda: super(CachedLibraryQuery, self).get_reader_info(reader_id),
+        )
 
-    def _clean_cache(self):
-        while len(self._cache) > self.cache_size:
-            oldest_key = self._access_order.pop(0)
-            if oldest_key in self._cache:
-                del self._cache[oldest_key]
+    def get_reader_borrow_history(self, reader_id: str, limit: int = 10) -> List[Dict]:
+        """
+        重写基类方法，按 (读者, limit) 缓存借阅历史，不存在的读者不缓存
+        """
+        return self._cached(
+            "borrow_history",
+            reader_id,
+            (limit,),
+            lambda: super(CachedLibraryQuery, self).get_reader_borrow_history(
+                reader_id, limit
+            ),
+            store=lambda result: bool(result) or self._reader_exists(reader_id),
+        )
+
+    def get_reader_statistics(self, reader_id: str) -> Dict[str, Any]:
+        """
+        重写基类方法，缓存读者的借阅统计，不存在的读者不缓存
+        """
+        return self._cached(
+            "statistics",
+            reader_id,
+            (),
+            lambda: super(CachedLibraryQuery, self).get_reader_statistics(reader_id),
+            store=lambda result: result["total_records"] > 0
+            or self._reader_exists(reader_id),
+        )
 
     def get_reader_history_data(
         self, reader_id: str, limit: int = 10
     ) -> Dict[str, Any]:
         """
-        重写基类方法，在查询数据库前先检查缓存
+        重写基类方法，在查询数据库前先检查缓存，只缓存查询成功的结果
         """
-        cache_key = self._get_cache_key(reader_id, limit)
-        if cache_key in self._cache:
-            self._access_order.remove(cache_key)
-            self._access_order.append(cache_key)
-            return self._cache[cache_key]
+        return self._cached(
+            "history_data",
+            reader_id,
+            (limit,),
+            lambda: super(CachedLibraryQuery, self).get_reader_history_data(
+                reader_id, limit
+            ),
+            store=lambda result: bool(result.get("success")),
+        )
 
-        # 如果缓存未命中则调用父类方法
-        result = super().get_reader_history_data(reader_id, limit)
-        if result.get("success"):
-            self._cache[cache_key] = result
-            self._access_order.append(cache_key)
-            self._clean_cache()
-        return result
+    def invalidate_reader(self, reader_id: str) -> int:
+        """
+        失效指定读者的全部缓存，返回删除的条目数
+        """
+        return invalidate_reader(reader_id, self._cache)
+
+
+def invalidate_reader(reader_id: str, cache: LRUCache = None) -> int:
+    """
+    失效指定读者的全部缓存，例如写入新的借阅记录之后调用
+    """
+    return (cache or reader_cache).invalidate_tag(reader_id)
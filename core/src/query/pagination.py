@@ -0,0 +1,188 @@
+import base64
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from .cache import TTLCache
+from .config import Config
+
+# 图书列表允许的排序字段
+VALID_SORT_FIELDS = [
+    "title",
+    "author",
+    "publication_year",
+    "publisher",
+    "call_no",
+]
+
+# 分页总数的计算方式
+# exact: 每次执行 COUNT(*)
+# cached: 按规范化的筛选条件缓存 COUNT(*) 结果
+# estimate: 无筛选时使用 pg_class.reltuples 估算，有筛选时退化为 cached
+# none: 不计算总数，仅通过多取一行判断是否还有下一页
+COUNT_MODES = ["exact", "cached", "estimate", "none"]
+
+# 进程内共享的总数缓存
+count_cache = TTLCache(ttl=Config.COUNT_CACHE_TTL, max_entries=Config.COUNT_CACHE_SIZE)
+
+
+def encode_cursor(sort_by: str, sort_value: Any, book_id: str) -> str:
+    """
+    将最后一行的 (排序键, book_id) 编码为不透明的游标
+    """
+    payload = json.dumps(
+        {"k": sort_by, "v": sort_value, "id": book_id},
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort_by: str) -> Tuple[Any, str]:
+    """
+    解析游标并返回 (排序键, book_id)，游标无效或与排序字段不符时抛出 ValueError
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        cursor_sort_by, sort_value, book_id = payload["k"], payload["v"], payload["id"]
+    except (ValueError, TypeError, KeyError, UnicodeError) as e:
+        raise ValueError(f"无效的分页游标: {token}") from e
+    if cursor_sort_by != sort_by:
+        raise ValueError(
+            f"分页游标的排序字段 {cursor_sort_by} 与当前排序 {sort_by} 不一致"
+        )
+    return sort_value, book_id
+
+
+def keyset_condition(
+    sort_by: str, sort_order: str, sort_value: Any, book_id: str
+) -> Tuple[str, List[Any]]:
+    """
+    生成 (sort_by, book_id) 越过游标位置的 WHERE 条件
+
+    PostgreSQL 升序时 NULL 排在最后、降序时排在最前，条件需与之保持一致
+    """
+    if sort_order == "ASC":
+        if sort_value is None:
+            return f"({sort_by} IS NULL AND book_id > %s)", [book_id]
+        return (
+            f"(({sort_by}, book_id) > (%s, %s) OR {sort_by} IS NULL)",
+            [sort_value, book_id],
+        )
+    if sort_value is None:
+        return (
+            f"(({sort_by} IS NULL AND book_id < %s) OR {sort_by} IS NOT NULL)",
+            [book_id],
+        )
+    return f"(({sort_by}, book_id) < (%s, %s))", [sort_value, book_id]
+
+
+def validate_page(page: int, limit: int):
+    """
+    校验页码与每页项数，page 小于 1、limit 小于 1 或超过 PAGE_MAX_LIMIT 时抛出 ValueError
+    """
+    if page is None or page < 1:
+        raise ValueError(f"无效的页码: {page}，页码从 1 开始")
+    if limit is None or limit < 1 or limit > Config.PAGE_MAX_LIMIT:
+        raise ValueError(
+            f"无效的每页项数: {limit}，取值范围为 1-{Config.PAGE_MAX_LIMIT}"
+        )
+
+
+def normalize_filters(**filters) -> Tuple[Tuple[str, Any], ...]:
+    """
+    规范化筛选条件，去掉空值；ILIKE 类条件大小写不敏感，统一转为小写
+
+    不去除首尾空白: 查询语句使用原值，" python " 与 "python" 的匹配结果不同，不能共用缓存的总数
+    """
+    case_insensitive = {"search", "publisher", "author"}
+    normalized = []
+    for name, value in sorted(filters.items()):
+        if value is None or value == "":
+            continue
+        if isinstance(value, str) and name in case_insensitive:
+            value = value.lower()
+        normalized.append((name, value))
+    return tuple(normalized)
+
+
+def resolve_total(
+    count_mode: str,
+    table: str,
+    filters: Tuple[Tuple[str, Any], ...],
+    count_exact: Callable[[], int],
+    count_estimate: Callable[[], Optional[int]],
+) -> Optional[int]:
+    """
+    按计算方式获取总数，count_mode 为 none 时返回 None
+    """
+    if count_mode not in COUNT_MODES:
+        raise ValueError(f"无效的总数计算方式: {count_mode}，可选 {COUNT_MODES}")
+    if count_mode == "none":
+        return None
+    if count_mode == "estimate" and not filters:
+        estimate = count_estimate()
+        # 从未 ANALYZE 过的表 reltuples 为 -1
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    if count_mode in ("cached", "estimate"):
+        key = (table, filters)
+        total = count_cache.get(key)
+        if total is None:
+            total = count_exact()
+            count_cache.set(key, total)
+        return total
+    return count_exact()
+
+
+async def resolve_total_async(
+    count_mode: str,
+    table: str,
+    filters: Tuple[Tuple[str, Any], ...],
+    count_exact: Callable[[], Awaitable[int]],
+    count_estimate: Callable[[], Awaitable[Optional[int]]],
+) -> Optional[int]:
+    """
+    resolve_total 的异步版本，count_exact 与 count_estimate 为协程函数，共用总数缓存
+    """
+    if count_mode not in COUNT_MODES:
+        raise ValueError(f"无效的总数计算方式: {count_mode}，可选 {COUNT_MODES}")
+    if count_mode == "none":
+        return None
+    if count_mode == "estimate" and not filters:
+        estimate = await count_estimate()
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    if count_mode in ("cached", "estimate"):
+        key = (table, filters)
+        total = count_cache.get(key)
+        if total is None:
+            total = await count_exact()
+            count_cache.set(key, total)
+        return total
+    return await count_exact()
+
+
+def build_pagination(
+    page: Optional[int],
+    limit: int,
+    total: Optional[int],
+    has_more: bool,
+    next_cursor: Optional[str] = None,
+    count_mode: str = "exact",
+) -> Dict[str, Any]:
+    """
+    构造分页信息，游标模式下 page 为 None，不计算总数时 total 为 None
+    """
+    total_pages = None
+    if total is not None:
+        total_pages = (total + limit - 1) // limit if limit else 0
+    return {
+        "page": page,
+        "limit": limit,
+        "total": total,
+        "total_pages": total_pages,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+        "count_mode": count_mode,
+    }
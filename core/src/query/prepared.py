@@ -0,0 +1,193 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+
+# psycopg2 风格的占位符 %s、%(name)s 以及转义的 %%
+PLACEHOLDER_PATTERN = re.compile(r"%\((\w+)\)s|%s|%%")
+
+# PostgreSQL 只允许预备以下语句
+PREPARABLE_PATTERN = re.compile(
+    r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|VALUES)\b", re.IGNORECASE
+)
+
+# 进程内所有连接累计的计数
+_stats_lock = threading.Lock()
+_stats = {
+    "prepares": 0,
+    "executes": 0,
+    "evictions": 0,
+    "reprepares": 0,
+    "unpreparable": 0,
+}
+
+
+def _count(name: str, value: int = 1):
+    with _stats_lock:
+        _stats[name] += value
+
+
+def convert_placeholders(query: str, params: Any) -> Tuple[str, List[Any]]:
+    """
+    将 psycopg2 风格的占位符转换为 $1、$2 ...，并按编号顺序返回参数列表
+
+    同名的 %(name)s 对应同一个编号；没有参数时与 psycopg2 一致，不处理 % 字符
+    """
+    if not params:
+        return query, []
+    values = []
+    names: Dict[str, int] = {}
+    positional = iter(params) if not isinstance(params, dict) else None
+
+    def replace(match: re.Match) -> str:
+        token, name = match.group(0), match.group(1)
+        if token == "%%":
+            return "%"
+        if name is not None:
+            if positional is not None:
+                raise ValueError("命名占位符需要以字典传入参数")
+            if name not in names:
+                values.append(params[name])
+                names[name] = len(values)
+            return f"${names[name]}"
+        if positional is None:
+            raise ValueError("位置占位符需要以序列传入参数")
+        try:
+            values.append(next(positional))
+        except StopIteration:
+            raise ValueError("参数数量少于占位符数量")
+        return f"${len(values)}"
+
+    return PLACEHOLDER_PATTERN.sub(replace, query), values
+
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """
+    支持命名预备语句的连接，用作 psycopg2.connect 的 connection_factory
+
+    预备语句属于数据库会话，因此缓存保存在连接上: 按 SQL 文本以 LRU 方式缓存语句名，
+    超过 prepared_cache_size 时 DEALLOCATE 最久未使用的语句。重新连接得到的新连接缓存为空，
+    语句会在首次执行时重新预备；会话中的语句被外部清除 (例如 DISCARD ALL) 时自动重新预备
+    """
+
+    prepared_cache_size = 64
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # SQL 文本 -> 语句名，无法预备的语句对应 None
+        self._prepared: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._statement_seq = 0
+
+    def _prepare(self, cursor, query: str, params: Any) -> Optional[str]:
+        """
+        预备语句并返回语句名，语句类型不支持或参数类型无法推断时返回 None
+        """
+        if not PREPARABLE_PATTERN.match(query):
+            return None
+        try:
+            sql, _ = convert_placeholders(query, params)
+        except (ValueError, KeyError):
+            return None
+        self._statement_seq += 1
+        name = f"stmt_{self._statement_seq}"
+        # 事务中预备失败只回滚到保存点，不影响事务中已有的操作
+        in_transaction = (
+            self.get_transaction_status()
+            == psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        )
+        try:
+            if in_transaction:
+                cursor.execute("SAVEPOINT prepare_statement")
+            cursor.execute(f"PREPARE {name} AS {sql}")
+            if in_transaction:
+                cursor.execute("RELEASE SAVEPOINT prepare_statement")
+        except psycopg2.Error as e:
+            if in_transaction:
+                cursor.execute("ROLLBACK TO SAVEPOINT prepare_statement")
+            else:
+                self.rollback()
+            print(f"预备语句失败，改为直接执行: {e}")
+            return None
+        _count("prepares")
+        return name
+
+    def _lookup(self, cursor, query: str, params: Any) -> Optional[str]:
+        if query in self._prepared:
+            self._prepared.move_to_end(query)
+            return self._prepared[query]
+        name = self._prepare(cursor, query, params)
+        if name is None:
+            _count("unpreparable")
+        self._prepared[query] = name
+        while len(self._prepared) > self.prepared_cache_size:
+            _, evicted = self._prepared.popitem(last=False)
+            _count("evictions")
+            if evicted is not None:
+                cursor.execute(f"DEALLOCATE {evicted}")
+        return name
+
+    def clear_prepared(self):
+        """
+        清空语句缓存，会话中的语句已失效时调用
+        """
+        self._prepared.clear()
+
+    def execute_prepared(
+        self, cursor, query: str, params: Any = (), retry: bool = True
+    ):
+        """
+        通过预备语句执行 psycopg2 风格的查询，结果从 cursor 读取
+
+        语句在会话中不存在时清空缓存并重新预备一次；仅当执行前没有进行中的事务时重试，
+        否则无法在不丢失事务内容的情况下恢复，异常交给调用方处理
+        """
+        idle = (
+            self.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        )
+        name = self._lookup(cursor, query, params)
+        if name is None:
+            cursor.execute(query, params)
+            return
+        _, values = convert_placeholders(query, params)
+        statement = f"EXECUTE {name}"
+        if values:
+            statement += f" ({', '.join(['%s'] * len(values))})"
+        try:
+            cursor.execute(statement, values)
+        except psycopg2.errors.InvalidSqlStatementName:
+            self.clear_prepared()
+            if not (idle and retry):
+                raise
+            self.rollback()
+            _count("reprepares")
+            self.execute_prepared(cursor, query, params, retry=False)
+            return
+        _count("executes")
+
+    @property
+    def prepared_count(self) -> int:
+        return sum(1 for name in self._prepared.values() if name is not None)
+
+
+def prepared_stats() -> Dict[str, Any]:
+    """
+    返回进程内预备语句的累计计数，prepare_ratio 为预备次数与执行次数之比，越低说明复用越充分
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["prepare_ratio"] = (
+        round(stats["prepares"] / stats["executes"], 4) if stats["executes"] else 0.0
+    )
+    return stats
+
+
+def reset_prepared_stats():
+    """
+    清零累计计数
+    """
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
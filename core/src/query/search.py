@@ -0,0 +1,483 @@
+import os
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from ..clean.dataset import dataset_mtime, read_dataset
+from .config import Config
+from .pagination import (
+    COUNT_MODES,
+    build_pagination,
+    decode_cursor,
+    encode_cursor,
+    keyset_condition,
+    validate_page,
+)
+
+# 搜索后端
+# ilike: 原有的 ILIKE 模糊匹配
+# trigram: ILIKE 匹配由 pg_trgm GIN 索引加速，并按相似度排序
+# fulltext: 基于中文二元分词的 tsvector 列与 GIN 索引，按 ts_rank 排序
+# memory: 不依赖数据库扩展，基于清洗后 Parquet 构建的进程内倒排索引
+SEARCH_BACKENDS = ["ilike", "trigram", "fulltext", "memory"]
+
+# 中日韩统一表意文字及兼容区
+CJK_RANGE = "\u3400-\u9fff\uf900-\ufaff"
+TOKEN_PATTERN = re.compile(f"[{CJK_RANGE}]+|[a-z0-9]+")
+
+# Parquet 列名与 books 表字段的对应关系
+PARQUET_COLUMNS = {
+    "ID": "book_id",
+    "TITLE": "title",
+    "AUTHOR": "author",
+    "PUBLISHER": "publisher",
+    "YEAR": "publication_year",
+    "CALLNO": "call_no",
+    "LANGUAGE": "language",
+    "DOCTYPE": "doc_type",
+}
+
+# 参与全文检索的字段及其权重
+FULLTEXT_FIELDS = [("title", "A"), ("author", "B"), ("call_no", "C")]
+
+SEARCH_INDEX_DDL = {
+    "trigram": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_books_title_trgm ON books USING gin (title gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_books_author_trgm ON books USING gin (author gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_books_call_no_trgm ON books USING gin (call_no gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_books_publisher_trgm ON books USING gin (publisher gin_trgm_ops)",
+    ],
+    "fulltext": [
+        f"""
+        CREATE OR REPLACE FUNCTION cjk_tokens(input text) RETURNS text[]
+        LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $$
+        DECLARE
+            token text;
+            tokens text[] := '{{}}';
+        BEGIN
+            FOR token IN
+                SELECT m[1] FROM regexp_matches(
+                    lower(coalesce(input, '')), '([{CJK_RANGE}]+|[a-z0-9]+)', 'g'
+                ) AS m
+            LOOP
+                IF token ~ '^[a-z0-9]+$' OR char_length(token) = 1 THEN
+                    tokens := tokens || token;
+                ELSE
+                    FOR i IN 1 .. char_length(token) - 1 LOOP
+                        tokens := tokens || substr(token, i, 2);
+                    END LOOP;
+                END IF;
+            END LOOP;
+            RETURN tokens;
+        END
+        $$
+        """,
+        "ALTER TABLE books ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS ("
+        + " || ".join(
+            f"setweight(array_to_tsvector(cjk_tokens({field})), '{weight}')"
+            for field, weight in FULLTEXT_FIELDS
+        )
+        + ") STORED",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_books_search_tsv ON books USING gin (search_tsv)",
+    ],
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    中文感知的分词: 连续的中文切分为二元组，英文与数字按词切分，与数据库中的 cjk_tokens 一致
+    """
+    tokens = []
+    for run in TOKEN_PATTERN.findall(str(text).lower()):
+        if run.isascii() or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def build_tsquery(search: str) -> Optional[str]:
+    """
+    将搜索词转为 tsquery 文本，英文和数字按前缀匹配，无有效词元时返回 None
+
+    单个汉字无法用全文索引匹配: 索引中的汉字按二元组存储，前缀匹配找不到作为二元组第二个字
+    出现的汉字，此时同样返回 None，由调用方回退到 ILIKE
+    """
+    terms = []
+    for token in dict.fromkeys(tokenize(search)):
+        if token.isascii():
+            terms.append(f"'{token}':*")
+        elif len(token) == 1:
+            return None
+        else:
+            terms.append(f"'{token}'")
+    return " & ".join(terms) if terms else None
+
+
+def ilike_predicate(search: str) -> Tuple[str, List[Any]]:
+    """
+    书名、作者、索书号的 ILIKE 匹配条件
+    """
+    search_param = f"%{search}%"
+    return (
+        "(title ILIKE %s OR author ILIKE %s OR call_no ILIKE %s)",
+        [search_param, search_param, search_param],
+    )
+
+
+def search_predicate(
+    backend: str, search: str
+) -> Tuple[str, List[Any], Optional[str], List[Any]]:
+    """
+    生成搜索条件与相关度表达式，返回 (条件, 条件参数, 相关度表达式, 相关度参数)
+    """
+    if backend == "trigram":
+        clause, params = ilike_predicate(search)
+        rank = "GREATEST(similarity(title, %s), similarity(author, %s), similarity(call_no, %s))"
+        return clause, params, rank, [search, search, search]
+    if backend == "fulltext":
+        tsquery = build_tsquery(search)
+        if tsquery is not None:
+            return (
+                "search_tsv @@ %s::tsquery",
+                [tsquery],
+                "ts_rank(search_tsv, %s::tsquery)",
+                [tsquery],
+            )
+    clause, params = ilike_predicate(search)
+    return clause, params, None, []
+
+
+def rank_keyset_condition(
+    rank_expr: str, rank_params: List[Any], cursor_value: List[Any], book_id: str
+) -> Tuple[str, List[Any]]:
+    """
+    生成按 (相关度降序, 书名, book_id) 越过游标位置的条件
+
+    相关度为 real 类型，游标中的值需转回 real 比较才能保证相等判断准确
+    """
+    rank_value, title = cursor_value
+    title_clause, title_params = keyset_condition("title", "ASC", title, book_id)
+    clause = f"({rank_expr} < %s::real OR ({rank_expr} = %s::real AND {title_clause}))"
+    params = rank_params + [rank_value] + rank_params + [rank_value] + title_params
+    return clause, params
+
+
+# 检测搜索后端是否可用的查询，结果非零即可用
+BACKEND_PROBES = {
+    "trigram": "SELECT COUNT(*) FROM pg_extension WHERE extname = 'pg_trgm'",
+    "fulltext": (
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_name = 'books' AND column_name = 'search_tsv'"
+    ),
+}
+
+_backend_lock = threading.Lock()
+_resolved_backends: Dict[str, str] = {}
+
+
+def resolve_backend(
+    backend: str, fetch_scalar: Callable[[str], Any], parquet_file: str = None
+) -> str:
+    """
+    检查所选后端在当前数据库是否可用，不可用时回退到进程内索引或 ILIKE，结果按进程缓存
+    """
+    if backend not in SEARCH_BACKENDS:
+        raise ValueError(f"无效的搜索后端: {backend}，可选 {SEARCH_BACKENDS}")
+    if backend == "ilike":
+        return backend
+
+    resolved = _cached_backend(backend)
+    if resolved is not None:
+        return resolved
+    probe = BACKEND_PROBES.get(backend)
+    available = bool(fetch_scalar(probe)) if probe else True
+    return _store_backend(backend, available, parquet_file)
+
+
+async def resolve_backend_async(
+    backend: str,
+    fetch_scalar: Callable[[str], Awaitable[Any]],
+    parquet_file: str = None,
+) -> str:
+    """
+    resolve_backend 的异步版本，fetch_scalar 为协程函数，共用检测结果缓存
+    """
+    if backend not in SEARCH_BACKENDS:
+        raise ValueError(f"无效的搜索后端: {backend}，可选 {SEARCH_BACKENDS}")
+    if backend == "ilike":
+        return backend
+    resolved = _cached_backend(backend)
+    if resolved is not None:
+        return resolved
+    probe = BACKEND_PROBES.get(backend)
+    available = bool(await fetch_scalar(probe)) if probe else True
+    return _store_backend(backend, available, parquet_file)
+
+
+def _cached_backend(backend: str) -> Optional[str]:
+    with _backend_lock:
+        return _resolved_backends.get(backend)
+
+
+def _store_backend(backend: str, available: bool, parquet_file: str = None) -> str:
+    """
+    根据检测结果确定实际使用的后端并缓存
+    """
+    parquet_file = parquet_file or Config.SEARCH_PARQUET_FILE
+    resolved = backend
+    if not available or (backend == "memory" and not os.path.exists(parquet_file)):
+        resolved = "memory" if os.path.exists(parquet_file) else "ilike"
+        if resolved == backend:
+            resolved = "ilike"
+        print(f"搜索后端 {backend} 不可用，已回退到 {resolved}")
+
+    with _backend_lock:
+        _resolved_backends[backend] = resolved
+    return resolved
+
+
+def reset_backend_cache():
+    """
+    清除后端可用性的缓存，用于创建索引后重新检测
+    """
+    with _backend_lock:
+        _resolved_backends.clear()
+
+
+def ensure_search_indexes(db, backend: str):
+    """
+    创建搜索后端所需的扩展、列与索引，索引使用 CONCURRENTLY 创建不阻塞写入
+
+    db 为 DatabaseConnection，需在非连接池模式下使用独立连接
+    """
+    statements = SEARCH_INDEX_DDL.get(backend)
+    if statements is None:
+        print(f"搜索后端 {backend} 无需创建索引")
+        return
+    db.connect()
+    previous = db.conn.autocommit
+    db.conn.autocommit = True
+    try:
+        with db.conn.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+        print(f"搜索后端 {backend} 的索引已就绪")
+    finally:
+        db.conn.autocommit = previous
+    reset_backend_cache()
+
+
+class InMemoryBookIndex:
+    """
+    基于清洗后 Parquet 构建的进程内二元组倒排索引
+
+    搜索词的所有二元组的倒排表求交得到候选集，再做子串校验，结果与 ILIKE 语义一致
+    """
+
+    def __init__(self, parquet_file: str = None):
+        self.parquet_file = parquet_file or Config.SEARCH_PARQUET_FILE
+        self.loaded_mtime = None
+        self.columns: Dict[str, np.ndarray] = {}
+        self._lowered: Dict[str, List[str]] = {}
+        self._postings: Dict[str, np.ndarray] = {}
+        self.size = 0
+
+    def load(self, table=None):
+        """
+        读取 Parquet 及其增量分片并重建索引，可直接传入已读取的 pyarrow Table
+        """
+        if table is None:
+            df = read_dataset(self.parquet_file, columns=list(PARQUET_COLUMNS))
+            df = df.to_pandas()
+        else:
+            df = table.select(list(PARQUET_COLUMNS)).to_pandas()
+        df = df.rename(columns=PARQUET_COLUMNS)
+
+        columns = {}
+        for name in PARQUET_COLUMNS.values():
+            if name == "publication_year":
+                columns[name] = df[name].to_numpy()
+            else:
+                columns[name] = df[name].astype(object).where(df[name].notna(), None)
+                columns[name] = columns[name].to_numpy(dtype=object)
+
+        lowered = {
+            name: [str(v).lower() if v is not None else "" for v in columns[name]]
+            for name in ("title", "author", "call_no", "publisher")
+        }
+
+        postings: Dict[str, list] = {}
+        for name in ("title", "author", "call_no"):
+            for row, value in enumerate(lowered[name]):
+                for gram in {value[i : i + 2] for i in range(len(value) - 1)}:
+                    postings.setdefault(gram, []).append(row)
+
+        self.columns = columns
+        self._lowered = lowered
+        self._postings = {
+            gram: np.unique(np.asarray(rows, dtype=np.int64))
+            for gram, rows in postings.items()
+        }
+        self.size = len(df)
+        self.loaded_mtime = dataset_mtime(self.parquet_file)
+        return self
+
+    def _candidates(self, search: str) -> np.ndarray:
+        needle = search.lower()
+        grams = {needle[i : i + 2] for i in range(len(needle) - 1)}
+        if not grams:
+            return np.arange(self.size)
+        postings = sorted(
+            (self._postings.get(gram, np.empty(0, dtype=np.int64)) for gram in grams),
+            key=len,
+        )
+        rows = postings[0]
+        for other in postings[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def _score(self, row: int, needle: str) -> int:
+        score = 0
+        for name, weight in (("title", 4), ("author", 2), ("call_no", 1)):
+            value = self._lowered[name][row]
+            if needle in value:
+                score += weight * (2 if value.startswith(needle) else 1)
+        return score
+
+    def _row(self, row: int) -> Dict[str, Any]:
+        book = {name: values[row] for name, values in self.columns.items()}
+        year = book["publication_year"]
+        book["publication_year"] = None if pd.isna(year) else int(year)
+        return book
+
+    def _sort_key(self, row: int) -> Tuple[bool, str, str]:
+        title = self.columns["title"][row]
+        return (title is None, title or "", self.columns["book_id"][row])
+
+    def match(
+        self,
+        search: str = "",
+        language: str = "",
+        year: int = None,
+        publisher: str = "",
+        author: str = "",
+    ) -> Tuple[List[int], Dict[int, int]]:
+        """
+        返回满足条件的行号 (按书名、ID 排序) 以及搜索词的相关度得分
+        """
+        rows = self._candidates(search) if search else np.arange(self.size)
+        needle = search.lower() if search else ""
+        publisher = publisher.lower() if publisher else ""
+        author = author.lower() if author else ""
+
+        matched = []
+        scores = {}
+        for row in rows.tolist():
+            if needle:
+                score = self._score(row, needle)
+                if not score:
+                    continue
+                scores[row] = score
+            if language and self.columns["language"][row] != language:
+                continue
+            if year and self.columns["publication_year"][row] != year:
+                continue
+            if publisher and publisher not in self._lowered["publisher"][row]:
+                continue
+            if author and author not in self._lowered["author"][row]:
+                continue
+            matched.append(row)
+        matched.sort(key=self._sort_key)
+        return matched, scores
+
+    def search_books(
+        self,
+        search: str = "",
+        language: str = "",
+        year: int = None,
+        publisher: str = "",
+        author: str = "",
+        page: int = 1,
+        limit: int = 20,
+        after: str = None,
+        count_mode: str = "exact",
+    ) -> Dict[str, Any]:
+        """
+        与 BaseQuery.search_books 相同的签名与返回结构，有搜索词时按相关度排序
+        """
+        if count_mode not in COUNT_MODES:
+            raise ValueError(f"无效的总数计算方式: {count_mode}，可选 {COUNT_MODES}")
+        validate_page(page, limit)
+        sort_by = "rank" if search else "title"
+        cursor = decode_cursor(after, sort_by) if after else None
+        matched, scores = self.match(search, language, year, publisher, author)
+        total = len(matched)
+
+        def sort_key(row: int) -> tuple:
+            key = self._sort_key(row)
+            return (-scores[row],) + key if search else key
+
+        if search:
+            matched.sort(key=lambda row: -scores[row])
+        if cursor:
+            sort_value, last_id = cursor
+            if search:
+                score, title = sort_value
+                position = (-score, title is None, title or "", last_id)
+            else:
+                position = (sort_value is None, sort_value or "", last_id)
+            page_rows = [row for row in matched if sort_key(row) > position]
+            page_rows = page_rows[: limit + 1]
+        else:
+            offset = (page - 1) * limit
+            page_rows = matched[offset : offset + limit + 1]
+
+        has_more = len(page_rows) > limit
+        page_rows = page_rows[:limit]
+        books = [self._row(row) for row in page_rows]
+        next_cursor = None
+        if books and has_more:
+            last_row = page_rows[-1]
+            last = books[-1]
+            sort_value = [scores[last_row], last["title"]] if search else last["title"]
+            next_cursor = encode_cursor(sort_by, sort_value, last["book_id"])
+
+        return {
+            "books": books,
+            "pagination": build_pagination(
+                None if after else page,
+                limit,
+                None if count_mode == "none" else total,
+                has_more,
+                next_cursor,
+                count_mode,
+            ),
+        }
+
+
+def get_memory_index() -> Optional[InMemoryBookIndex]:
+    """
+    获取进程共享的内存索引，与图书目录共用同一份数据
+
+    数据文件不存在 (例如检测后端后被删除) 时返回 None，调用方回退到 ILIKE
+    """
+    from .catalog import get_catalog
+
+    return get_catalog()
+
+
+if __name__ == "__main__":
+    import argparse
+    from .database_connection import DatabaseConnection
+
+    parser = argparse.ArgumentParser(description="创建图书搜索后端所需的索引")
+    parser.add_argument("backend", choices=["trigram", "fulltext"])
+    args = parser.parse_args()
+
+    with DatabaseConnection(pooled=False) as db:
+        ensure_search_indexes(db, args.backend)
@@ -1,9 +1,16 @@
+import argparse
+import time
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import random
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from datetime import datetime
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Optional
+from ..progress import report_progress
 
 # 文件路径配置
 READERS_FILE = os.path.join("data", "cleaned", "csv", "readers_cleaned.csv")
@@ -12,6 +19,9 @@ BORROW_RECORDS_FILE = os.path.join("data", "virtual", "csv", "borrow_records.csv
 BORROW_PARQUET_FILE = os.path.join(
     "data", "virtual", "parquet", "borrow_records.parquet"
 )
+# 分片模式输出的分区 Parquet 目录，每个分片一个文件；
+# 该目录中存在分片时 bulk_load 导入分片而不是 BORROW_PARQUET_FILE
+BORROW_PARQUET_DIR = os.path.join("data", "virtual", "parquet", "borrow_records")
 
 # 参数配置
 # 生成人数
@@ -24,6 +34,28 @@ BORROW_PERIOD_DAYS = 60
 # 逾期和未还概率
 OVERDUE_PROBABILITY = 0.05
 UNRETURNED_PROBABILITY = 0.02
+# 每批向量化生成的读者数
+READER_CHUNK_SIZE = 10000
+# 分片模式下每个分片的读者数，决定输出文件数与随机种子的划分
+SHARD_SIZE = 50000
+# Parquet 每个行组的行数，写入器累积到该行数后才写出一个行组
+ROW_GROUP_SIZE = 131072
+# Parquet 中使用字典编码的低基数列
+DICTIONARY_COLUMNS = ["READER_ID", "STATUS"]
+# 借阅状态: 按期归还、逾期归还、借阅中
+STATUS_VALUES = ["已归还", "逾期归还", "借阅中"]
+# 借阅记录的列类型，日期列为 date32
+BORROW_SCHEMA = pa.schema(
+    [
+        ("BORROW_ID", pa.string()),
+        ("READER_ID", pa.string()),
+        ("BOOK_ID", pa.string()),
+        ("BORROW_DATE", pa.date32()),
+        ("DUE_DATE", pa.date32()),
+        ("RETURN_DATE", pa.date32()),
+        ("STATUS", pa.string()),
+    ]
+)
 # 借阅日期范围
 START_DATE = datetime(2000, 9, 1)
 END_DATE = datetime(2025, 6, 30)
@@ -86,170 +118,558 @@ def get_callno_prefix(callno: str) -> str:
     return prefix
 
 
-# 根据院系偏好计算每本书的权重
-def calculate_book_weights(books_df: pd.DataFrame, department: str) -> np.ndarray:
-    preferred_prefixes = DEPARTMENT_BOOK_PREFERENCE.get(department, [])
+# 索书号分类前缀: 前三个字符可为字母或数字，之后只取连续的字母，与 get_callno_prefix 一致
+CALLNO_PREFIX_PATTERN = r"^([^\W_]{0,3}[^\W\d_]*)"
 
-    # 预计算所有图书的分类前缀
-    book_callno_prefixes = books_df["CALLNO"].apply(get_callno_prefix)
 
-    # 计算院系偏好权重
-    dept_weights = np.ones(len(books_df))
-    for pref in preferred_prefixes:
-        dept_weights[book_callno_prefixes.str.startswith(pref)] = PREFERRED_BOOK_WEIGHT
+# 向量化提取所有索书号的前缀
+def extract_callno_prefixes(callnos: pd.Series) -> pd.Series:
+    return (
+        callnos.astype("string")
+        .str.strip()
+        .str.extract(CALLNO_PREFIX_PATTERN, expand=False)
+        .fillna("")
+        .astype(object)
+    )
 
-    return dept_weights
 
+# 一次计算所有院系对每本书的偏好权重
+def calculate_department_weights(books_df: pd.DataFrame, departments) -> dict:
+    """
+    索书号前缀只提取一次，并按不同前缀编码；院系偏好只需与各个不同前缀比较，
+    再按编码映射回每本书，避免对每个院系重复处理全部索书号
+    """
+    codes, unique_prefixes = pd.factorize(extract_callno_prefixes(books_df["CALLNO"]))
+    unique_prefixes = pd.Series(unique_prefixes, dtype=object)
 
-# 生成借阅日期
-def generate_borrow_date(enroll_year: int) -> Optional[datetime]:
-    try:
-        reader_start = datetime(enroll_year, 9, 1)
-    except ValueError:
-        return None
+    weights = {}
+    for department in departments:
+        preferred_prefixes = DEPARTMENT_BOOK_PREFERENCE.get(department, [])
+        preferred = np.zeros(len(unique_prefixes), dtype=bool)
+        for pref in preferred_prefixes:
+            preferred |= unique_prefixes.str.startswith(pref).to_numpy(dtype=bool)
+        weights[department] = np.where(preferred[codes], PREFERRED_BOOK_WEIGHT, 1.0)
+    return weights
 
-    actual_start = max(reader_start, START_DATE)
 
-    if actual_start > END_DATE:
-        return None
+# 根据院系偏好计算每本书的权重
+def calculate_book_weights(books_df: pd.DataFrame, department: str) -> np.ndarray:
+    return calculate_department_weights(books_df, [department])[department]
 
-    days_diff = (END_DATE - actual_start).days
-    random_days = random.randint(0, days_diff)
-    return actual_start + timedelta(days=random_days)
 
+# 计算每个院系的综合选书概率
+def calculate_department_probabilities(
+    books_df: pd.DataFrame, departments, book_popularity: np.ndarray
+) -> dict:
+    probabilities = {}
+    department_weights = calculate_department_weights(books_df, departments)
+    for department, dept_weights in department_weights.items():
+        # 综合权重 = 全局热度 * 权重 + 院系偏好 * 权重
+        combined_weights = (
+            book_popularity * POPULARITY_WEIGHT
+            + (dept_weights / PREFERRED_BOOK_WEIGHT) * DEPARTMENT_PREFERENCE_WEIGHT
+        )
+        # 标准化权重
+        probabilities[department] = combined_weights / combined_weights.sum()
+    return probabilities
+
+
+# 计算读者可借阅的起始日期，入学年份无效或晚于 END_DATE 的读者返回 NaT
+def reader_start_dates(enroll_years: pd.Series) -> np.ndarray:
+    years = pd.to_numeric(enroll_years, errors="coerce").to_numpy(dtype=float)
+    valid = np.isfinite(years) & (years >= 1) & (years <= 9999)
+    years = np.where(valid, years, 1970).astype(np.int64)
+    # 入学年份的 9 月 1 日
+    reader_start = (
+        (years - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+        + np.timedelta64(8, "M")
+    ).astype("datetime64[D]")
+    actual_start = np.maximum(reader_start, np.datetime64(START_DATE.date(), "D"))
+    valid &= actual_start <= np.datetime64(END_DATE.date(), "D")
+    return np.where(valid, actual_start, np.datetime64("NaT", "D"))
+
+
+# 抽取每位读者的借阅次数，入学年份无效的读者为 0
+def draw_borrow_counts(
+    readers_df: pd.DataFrame,
+    rng: np.random.Generator,
+    min_borrows: int = MIN_BORROWS_PER_READER,
+    max_borrows: int = MAX_BORROWS_PER_READER,
+    start_dates: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    if start_dates is None:
+        start_dates = reader_start_dates(readers_df["ENROLLYEAR"])
+    num_borrows = rng.integers(min_borrows, max_borrows + 1, size=len(readers_df))
+    num_borrows[np.isnat(start_dates)] = 0
+    return num_borrows
+
+
+# 向量化生成一批读者的借阅记录
+def generate_reader_records(
+    readers_df: pd.DataFrame,
+    book_ids: np.ndarray,
+    department_probabilities: dict,
+    rng: np.random.Generator,
+    start_id: int = 1,
+    num_borrows: Optional[np.ndarray] = None,
+) -> pa.Table:
+    """
+    为一批读者生成借阅记录，一次性以数组形式抽取借阅次数、书籍、日期与状态
+
+    各院系的读者一起按该院系的选书概率抽样，department_probabilities 需包含批次中的全部院系；
+    记录按读者顺序排列，借阅 ID 从 start_id 开始连续编号；入学年份无效的读者不生成记录。
+    num_borrows 为每位读者的借阅次数，未传入时由 draw_borrow_counts 抽取
+    """
+    num_readers = len(readers_df)
+    start_dates = reader_start_dates(readers_df["ENROLLYEAR"])
+    if num_borrows is None:
+        num_borrows = draw_borrow_counts(readers_df, rng, start_dates=start_dates)
+
+    reader_index = np.repeat(np.arange(num_readers), num_borrows)
+    num_records = len(reader_index)
+
+    # 按院系分组抽取书籍，保持记录在读者内的位置不变
+    codes, departments = pd.factorize(readers_df["DEPARTMENT"])
+    record_codes = codes[reader_index]
+    book_index = np.zeros(num_records, dtype=np.int64)
+    for code, department in enumerate(departments):
+        mask = record_codes == code
+        count = int(mask.sum())
+        if count:
+            book_index[mask] = rng.choice(
+                len(book_ids),
+                size=count,
+                replace=True,
+                p=department_probabilities[department],
+            )
+
+    # 借阅日期在 [起始日期, END_DATE] 中均匀分布
+    record_start = start_dates[reader_index]
+    days_diff = (np.datetime64(END_DATE.date(), "D") - record_start).astype(np.int64)
+    borrow_date = record_start + rng.integers(0, days_diff + 1)
+    due_date = borrow_date + np.timedelta64(BORROW_PERIOD_DAYS, "D")
+
+    # 未还、逾期归还与按期归还
+    unreturned = rng.random(num_records) < UNRETURNED_PROBABILITY
+    overdue = ~unreturned & (rng.random(num_records) < OVERDUE_PROBABILITY)
+    overdue_days = rng.integers(1, 61, size=num_records)
+    days_before_due = rng.integers(0, BORROW_PERIOD_DAYS + 1, size=num_records)
+    return_date = np.where(
+        overdue,
+        due_date + overdue_days.astype("timedelta64[D]"),
+        borrow_date + days_before_due.astype("timedelta64[D]"),
+    )
+    return_date[unreturned] = np.datetime64("NaT", "D")
+    # 状态编号对应 STATUS_VALUES
+    status = np.where(unreturned, 2, np.where(overdue, 1, 0))
+
+    # 字符串格式化在 Arrow 中完成，比逐行格式化快一个数量级
+    borrow_ids = pa.array(np.arange(start_id, start_id + num_records)).cast(pa.string())
+    return pa.table(
+        {
+            "BORROW_ID": pc.binary_join_element_wise(
+                "BR", pc.utf8_lpad(borrow_ids, 8, "0"), ""
+            ),
+            "READER_ID": pa.array(readers_df["ID"].to_numpy(), pa.string()).take(
+                reader_index
+            ),
+            "BOOK_ID": pa.array(book_ids, pa.string()).take(book_index),
+            "BORROW_DATE": pa.array(borrow_date, pa.date32()),
+            "DUE_DATE": pa.array(due_date, pa.date32()),
+            "RETURN_DATE": pa.array(return_date, pa.date32()),
+            "STATUS": pa.array(STATUS_VALUES).take(status),
+        },
+        schema=BORROW_SCHEMA,
+    )
 
-# 生成借阅记录
-def generate_borrow_records():
+
+class BorrowRecordWriter:
+    """
+    借阅记录的流式写入器，逐批写入 Parquet 与可选的 CSV，内存中最多保留一个行组的数据
+
+    Parquet 按 row_group_size 行切分行组，批次较小时先累积再写出；READER_ID 与 STATUS
+    使用字典编码。文件在写入第一条记录时才创建，没有记录时不生成文件
+    """
+
+    def __init__(
+        self,
+        parquet_path: str,
+        csv_path: Optional[str] = None,
+        row_group_size: int = ROW_GROUP_SIZE,
+    ):
+        self.parquet_path = parquet_path
+        self.csv_path = csv_path
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._parquet_writer = None
+        self._csv_writer = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.parquet_path) or ".", exist_ok=True)
+        self._parquet_writer = pq.ParquetWriter(
+            self.parquet_path,
+            BORROW_SCHEMA,
+            compression="zstd",
+            use_dictionary=DICTIONARY_COLUMNS,
+        )
+        if self.csv_path:
+            os.makedirs(os.path.dirname(self.csv_path) or ".", exist_ok=True)
+            self._csv_writer = pa_csv.CSVWriter(
+                self.csv_path,
+                BORROW_SCHEMA,
+                write_options=pa_csv.WriteOptions(quoting_style="none"),
+            )
+
+    def write(self, table: pa.Table):
+        """
+        写入一批记录，CSV 立即写出，Parquet 凑满一个行组后写出
+        """
+        if table.num_rows == 0:
+            return
+        if self._parquet_writer is None:
+            self._open()
+        if self._csv_writer is not None:
+            self._csv_writer.write_table(table)
+        self.rows += table.num_rows
+        self._pending.append(table)
+        self._pending_rows += table.num_rows
+        if self._pending_rows >= self.row_group_size:
+            self._flush(final=False)
+
+    def _flush(self, final: bool):
+        if not self._pending:
+            return
+        pending = pa.concat_tables(self._pending)
+        full = (
+            pending.num_rows
+            if final
+            else (pending.num_rows // self.row_group_size * self.row_group_size)
+        )
+        if full:
+            self._parquet_writer.write_table(
+                pending.slice(0, full), row_group_size=self.row_group_size
+            )
+        rest = pending.slice(full)
+        self._pending = [rest] if rest.num_rows else []
+        self._pending_rows = rest.num_rows
+
+    def close(self):
+        """
+        写出剩余记录并关闭文件
+        """
+        if self._parquet_writer is not None:
+            self._flush(final=True)
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        if self._csv_writer is not None:
+            self._csv_writer.close()
+            self._csv_writer = None
+
+
+# 读取清洗后的读者与图书数据，返回待生成的读者与图书，数据缺失时抛出 RuntimeError
+def load_generation_inputs():
     try:
         readers_df = pd.read_csv(READERS_FILE, encoding="utf-8")
         books_df = pd.read_csv(BOOKS_FILE, encoding="utf-8")
     except FileNotFoundError as e:
-        print(f"错误: 缺少输入文件 -> {e}")
-        return
+        raise RuntimeError(f"缺少输入文件 -> {e}") from e
 
     print(f"读者总数: {len(readers_df)}\n图书总数: {len(books_df)}")
 
     if readers_df.empty or books_df.empty:
-        print("错误: 读者或图书数据为空无法生成借阅记录")
-        return
+        raise RuntimeError("读者或图书数据为空无法生成借阅记录")
 
     # 选择生成读者记录数量
     actual_num_readers = max(NUM_READERS_TO_GENERATE, len(readers_df))
-    selected_readers = readers_df.head(actual_num_readers)
+    selected_readers = readers_df.head(actual_num_readers).copy()
+    # 缺失的院系按无偏好处理
+    selected_readers["DEPARTMENT"] = selected_readers["DEPARTMENT"].fillna("")
     print(f"将为 {actual_num_readers} 位读者生成借阅记录")
+    return selected_readers, books_df
 
-    # 预计算书籍全局热度权重
-    num_books = len(books_df)
+
+# 按幂律分布生成归一化的书籍全局热度
+def draw_book_popularity(num_books: int, rng: np.random.Generator) -> np.ndarray:
     book_popularity = (
-        np.random.zipf(POPULARITY_ALPHA, num_books)
-        if num_books > 1
-        else np.array([1.0])
+        rng.zipf(POPULARITY_ALPHA, num_books) if num_books > 1 else np.array([1.0])
     )
+    return book_popularity / book_popularity.sum()
 
-    # 归一化全局热度权重
-    book_popularity = book_popularity / book_popularity.sum()
-
-    borrow_records = []
-    record_id = 1
-    department_weights_cache = {}
 
-    # 为每位读者生成记录
-    for idx, reader in selected_readers.iterrows():
-        department = reader["DEPARTMENT"]
+# 生成借阅记录
+def generate_borrow_records(
+    rng: Optional[np.random.Generator] = None, row_group_size: int = ROW_GROUP_SIZE
+):
+    rng = rng if rng is not None else np.random.default_rng()
+    selected_readers, books_df = load_generation_inputs()
+    actual_num_readers = len(selected_readers)
 
-        # 计算院系偏好权重
-        if department not in department_weights_cache:
-            department_weights_cache[department] = calculate_book_weights(
-                books_df, department
-            )
-        dept_weights = department_weights_cache[department]
+    # 预计算书籍全局热度权重
+    book_popularity = draw_book_popularity(len(books_df), rng)
 
-        # 计算综合权重
-        # 综合权重 = 全局热度 * 权重 + 院系偏好 * 权重
-        combined_weights = (
-            book_popularity * POPULARITY_WEIGHT
-            + (dept_weights / PREFERRED_BOOK_WEIGHT) * DEPARTMENT_PREFERENCE_WEIGHT
-        )
-        # 标准化权重
-        combined_weights /= combined_weights.sum()
+    department_probabilities = calculate_department_probabilities(
+        books_df, selected_readers["DEPARTMENT"].unique(), book_popularity
+    )
+    book_ids = books_df["ID"].to_numpy()
 
-        num_borrows = random.randint(MIN_BORROWS_PER_READER, MAX_BORROWS_PER_READER)
+    # 清除分片模式留下的分片，否则 bulk_load 仍会导入旧分片
+    remove_shards(BORROW_PARQUET_DIR)
 
-        try:
-            borrowed_book_indices = np.random.choice(
-                num_books, size=num_borrows, replace=True, p=combined_weights
+    # 按批生成并直接写入文件，内存中只保留当前批次与未写出的行组
+    record_id = 1
+    with BorrowRecordWriter(
+        BORROW_PARQUET_FILE, BORROW_RECORDS_FILE, row_group_size
+    ) as writer:
+        for offset in range(0, len(selected_readers), READER_CHUNK_SIZE):
+            chunk = generate_reader_records(
+                selected_readers.iloc[offset : offset + READER_CHUNK_SIZE],
+                book_ids,
+                department_probabilities,
+                rng,
+                record_id,
+            )
+            writer.write(chunk)
+            record_id += chunk.num_rows
+            done = min(offset + READER_CHUNK_SIZE, len(selected_readers))
+            report_progress(writer.rows, done / actual_num_readers)
+            print(
+                f"\r\033[93m已处理 {done}/{actual_num_readers} 位读者...\033[0m",
+                end="",
+                flush=True,
             )
-        except ValueError as e:
-            print(f"错误: 无法为读者 {reader['ID']} 生成记录，权重计算错误 -> {e})")
-            continue
-
-        for book_idx in borrowed_book_indices:
-            borrow_date = generate_borrow_date(reader["ENROLLYEAR"])
-            if borrow_date is None:
-                continue
-
-            due_date = borrow_date + timedelta(days=BORROW_PERIOD_DAYS)
-            rand = random.random()
-
-            if rand < UNRETURNED_PROBABILITY:
-                return_date, status = None, "借阅中"
-            else:
-                if random.random() < OVERDUE_PROBABILITY:
-                    overdue_days = random.randint(1, 60)
-                    return_date = due_date + timedelta(days=overdue_days)
-                    status = "逾期归还"
-                else:
-                    days_before_due = random.randint(0, BORROW_PERIOD_DAYS)
-                    return_date = borrow_date + timedelta(days=days_before_due)
-                    status = "已归还"
-
-            record = {
-                "BORROW_ID": f"BR{record_id:08d}",
-                "READER_ID": reader["ID"],
-                "BOOK_ID": books_df.iloc[book_idx]["ID"],
-                "BORROW_DATE": borrow_date.strftime("%Y-%m-%d"),
-                "DUE_DATE": due_date.strftime("%Y-%m-%d"),
-                "RETURN_DATE": (
-                    return_date.strftime("%Y-%m-%d") if return_date else None
-                ),
-                "STATUS": status,
-            }
-            borrow_records.append(record)
-            record_id += 1
 
-        print(
-            f"\r\033[93m已处理 {idx}/{actual_num_readers} 位读者...\033[0m",
-            end="",
-            flush=True,
-        )
+    print(f"\n生成借阅记录总数: {writer.rows}")
+    if writer.rows == 0:
+        raise RuntimeError("未生成任何借阅记录")
+    print(f"借阅记录已保存 -> {BORROW_RECORDS_FILE}")
+    print(f"借阅记录已保存 -> {BORROW_PARQUET_FILE}")
 
-    print(f"\n生成借阅记录总数: {len(borrow_records)}")
-    if not borrow_records:
-        return
 
-    borrow_df = pd.DataFrame(borrow_records)
+# 多进程生成时各工作进程共享的图书数据与选书概率
+_worker_state = {}
 
-    # 保存为 CSV
-    os.makedirs(os.path.dirname(BORROW_RECORDS_FILE), exist_ok=True)
-    borrow_df.to_csv(BORROW_RECORDS_FILE, encoding="utf-8", index=False)
-    print(f"借阅记录已保存 -> {BORROW_RECORDS_FILE}")
 
-    # 保存为 Parquet
-    os.makedirs(os.path.dirname(BORROW_PARQUET_FILE), exist_ok=True)
-    borrow_df.to_parquet(
-        BORROW_PARQUET_FILE, engine="pyarrow", compression="zstd", index=False
-    )
-    print(f"借阅记录已保存 -> {BORROW_PARQUET_FILE}")
+def _init_worker(book_ids: np.ndarray, department_probabilities: dict):
+    _worker_state["book_ids"] = book_ids
+    _worker_state["department_probabilities"] = department_probabilities
 
 
-def main():
-    if not all(os.path.exists(f) for f in [READERS_FILE, BOOKS_FILE]):
-        print(f"错误: {READERS_FILE} 或 {BOOKS_FILE} 文件不存在")
+def remove_shards(output_dir: str):
+    """
+    删除目录中分片模式生成的 part-*.parquet 文件
+    """
+    if not os.path.isdir(output_dir):
         return
+    for name in os.listdir(output_dir):
+        if name.startswith("part-") and name.endswith(".parquet"):
+            os.remove(os.path.join(output_dir, name))
+
+
+def plan_shards(
+    readers_df: pd.DataFrame,
+    seed: int,
+    shard_size: int = SHARD_SIZE,
+    min_borrows: int = MIN_BORROWS_PER_READER,
+    max_borrows: int = MAX_BORROWS_PER_READER,
+):
+    """
+    将读者按固定大小切分为分片，并为每个分片确定随机种子与借阅 ID 的起始编号
+
+    主种子通过 SeedSequence.spawn 派生: 第 0 个子种子用于书籍热度，第 i + 1 个用于分片 i，
+    分片再派生借阅次数与记录两个种子。借阅次数在此预先抽取以确定各分片的起始编号，
+    因此输出只取决于主种子与分片大小，与工作进程数无关
+
+    返回书籍热度的随机数生成器与分片任务列表
+    """
+    num_shards = max(1, -(-len(readers_df) // shard_size))
+    children = np.random.SeedSequence(seed).spawn(num_shards + 1)
+    tasks = []
+    start_id = 1
+    for shard in range(num_shards):
+        readers = readers_df.iloc[shard * shard_size : (shard + 1) * shard_size]
+        count_seed, record_seed = children[shard + 1].spawn(2)
+        num_borrows = draw_borrow_counts(
+            readers, np.random.default_rng(count_seed), min_borrows, max_borrows
+        )
+        tasks.append(
+            {
+                "shard": shard,
+                "readers": readers[["ID", "ENROLLYEAR", "DEPARTMENT"]],
+                "num_borrows": num_borrows,
+                "seed": record_seed,
+                "start_id": start_id,
+            }
+        )
+        start_id += int(num_borrows.sum())
+    return np.random.default_rng(children[0]), tasks
+
+
+def generate_shard(
+    task: dict, output_dir: str, row_group_size: int = ROW_GROUP_SIZE
+) -> dict:
+    """
+    生成一个分片的借阅记录，按 READER_CHUNK_SIZE 分批流式写入该分片的 Parquet 文件
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(task["seed"])
+    readers, num_borrows = task["readers"], task["num_borrows"]
+    path = os.path.join(output_dir, f"part-{task['shard']:05d}.parquet")
+    record_id = task["start_id"]
+    with BorrowRecordWriter(path, row_group_size=row_group_size) as writer:
+        for offset in range(0, len(readers), READER_CHUNK_SIZE):
+            chunk = generate_reader_records(
+                readers.iloc[offset : offset + READER_CHUNK_SIZE],
+                _worker_state["book_ids"],
+                _worker_state["department_probabilities"],
+                rng,
+                record_id,
+                num_borrows[offset : offset + READER_CHUNK_SIZE],
+            )
+            writer.write(chunk)
+            record_id += chunk.num_rows
+    return {
+        "shard": task["shard"],
+        "path": path if writer.rows else None,
+        "rows": record_id - task["start_id"],
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def generate_borrow_records_sharded(
+    seed: int = 0,
+    workers: int = None,
+    shard_size: int = SHARD_SIZE,
+    output_dir: str = BORROW_PARQUET_DIR,
+    min_borrows: int = MIN_BORROWS_PER_READER,
+    max_borrows: int = MAX_BORROWS_PER_READER,
+    row_group_size: int = ROW_GROUP_SIZE,
+):
+    """
+    多进程生成借阅记录，读者按分片分配给进程池，每个分片写入 output_dir 下的一个 Parquet 文件
+
+    相同的 seed 与 shard_size 生成完全相同的数据，与 workers 无关；
+    主进程只保存分片的统计信息，内存占用与记录总数无关
+    """
+    selected_readers, books_df = load_generation_inputs()
+
+    popularity_rng, tasks = plan_shards(
+        selected_readers, seed, shard_size, min_borrows, max_borrows
+    )
+    book_popularity = draw_book_popularity(len(books_df), popularity_rng)
+    department_probabilities = calculate_department_probabilities(
+        books_df, selected_readers["DEPARTMENT"].unique(), book_popularity
+    )
+    book_ids = books_df["ID"].to_numpy()
+
+    # 清除上次生成的分片，避免分片数减少时残留旧文件
+    remove_shards(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    results = []
+    if workers == 1:
+        _init_worker(book_ids, department_probabilities)
+        for task in tasks:
+            results.append(generate_shard(task, output_dir, row_group_size))
+            report_progress(
+                sum(result["rows"] for result in results), len(results) / len(tasks)
+            )
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(tasks)),
+            initializer=_init_worker,
+            initargs=(book_ids, department_probabilities),
+        ) as executor:
+            futures = [
+                executor.submit(generate_shard, task, output_dir, row_group_size)
+                for task in tasks
+            ]
+            for future in as_completed(futures):
+                results.append(future.result())
+                report_progress(
+                    sum(result["rows"] for result in results), len(results) / len(tasks)
+                )
+                print(
+                    f"\r\033[93m已完成 {len(results)}/{len(tasks)} 个分片...\033[0m",
+                    end="",
+                    flush=True,
+                )
+    results.sort(key=lambda result: result["shard"])
+
+    elapsed = time.perf_counter() - start
+    total_rows = sum(result["rows"] for result in results)
+    print(
+        f"\n生成借阅记录总数: {total_rows}，分片 {len(results)} 个，"
+        f"耗时 {elapsed:.2f}s，{int(total_rows / elapsed) if elapsed else total_rows} 行/s"
+    )
+    print(f"借阅记录已保存 -> {output_dir}")
+    return results
+
 
-    generate_borrow_records()
+def main(args: argparse.Namespace = None):
+    if not all(os.path.exists(f) for f in [READERS_FILE, BOOKS_FILE]):
+        raise RuntimeError(f"{READERS_FILE} 或 {BOOKS_FILE} 文件不存在")
+
+    if args is not None and args.workers:
+        generate_borrow_records_sharded(
+            args.seed if args.seed is not None else 0,
+            args.workers,
+            args.shard_size,
+            args.output_dir,
+            args.min_borrows,
+            args.max_borrows,
+            args.row_group_size,
+        )
+    elif args is not None:
+        generate_borrow_records(np.random.default_rng(args.seed), args.row_group_size)
+    else:
+        generate_borrow_records(np.random.default_rng())
     print("\033[92m借阅记录生成完成\033[0m")
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="生成虚拟借阅记录")
+    parser.add_argument("--seed", type=int, help="主随机种子，相同种子生成相同数据")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="工作进程数，指定后使用分片模式输出分区 Parquet",
+    )
+    parser.add_argument(
+        "--shard-size", type=int, default=SHARD_SIZE, help="每个分片的读者数"
+    )
+    parser.add_argument(
+        "--output-dir", default=BORROW_PARQUET_DIR, help="分片模式的输出目录"
+    )
+    parser.add_argument(
+        "--min-borrows",
+        type=int,
+        default=MIN_BORROWS_PER_READER,
+        help="分片模式下每位读者的最少借阅次数",
+    )
+    parser.add_argument(
+        "--max-borrows",
+        type=int,
+        default=MAX_BORROWS_PER_READER,
+        help="分片模式下每位读者的最多借阅次数",
+    )
+    parser.add_argument(
+        "--row-group-size",
+        type=int,
+        default=ROW_GROUP_SIZE,
+        help="Parquet 每个行组的行数",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    main()
+    main(parse_args())
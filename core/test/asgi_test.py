@@ -0,0 +1,242 @@
+import unittest
+from unittest import mock
+from starlette.testclient import TestClient
+from src.api import asgi, recommendation_service
+from src.api.asgi import API_PREFIX, create_asgi_app
+from src.query.async_query import AsyncLibraryQuery
+from src.query.base_query import READER_INFO_QUERY
+from src.query.library_query import (
+    READER_BORROW_HISTORY_QUERY,
+    READER_HISTORY_QUERY,
+    READERS_HISTORY_BATCH_QUERY,
+    READERS_STATISTICS_BATCH_QUERY,
+    invalidate_reader,
+    reader_cache,
+    reader_cache_key,
+)
+
+READERS = {"R1": {"reader_id": "R1", "department": "音乐系"}}
+HISTORY = {
+    "R1": [
+        {
+            "borrow_id": 1,
+            "book_id": "B1",
+            "borrow_date": "2024-03-01",
+            "due_date": "2024-04-01",
+            "return_date": None,
+            "status": "借阅中",
+            "book_title": "红楼梦",
+            "author": "曹雪芹",
+            "publisher": "中华书局",
+            "publish_year": 1982,
+            "call_no": "I242",
+            "language": "中文",
+            "doc_type": "图书",
+        }
+    ]
+}
+
+
+class FakeAsyncDatabase:
+    """
+    按语句返回固定结果的异步数据库连接，failing 为真时所有语句执行失败
+    """
+
+    failing = False
+
+    def __init__(self):
+        self.errors = 0
+
+    def _failed(self) -> bool:
+        if FakeAsyncDatabase.failing:
+            self.errors += 1
+        return FakeAsyncDatabase.failing
+
+    async def execute_query(self, query, params=()):
+        if self._failed():
+            return []
+        if query == READER_BORROW_HISTORY_QUERY:
+            return [dict(record) for record in HISTORY.get(params[0], [])]
+        if query == READERS_HISTORY_BATCH_QUERY:
+            return [
+                {
+                    "reader_id": reader_id,
+                    "reader_info": READERS[reader_id],
+                    "borrow_records": [dict(r) for r in HISTORY.get(reader_id, [])],
+                    "total_records": len(HISTORY.get(reader_id, [])),
+                    "unique_books": len(HISTORY.get(reader_id, [])),
+                    "status_count": None,
+                }
+                for reader_id in params["reader_ids"]
+                if reader_id in READERS
+            ]
+        if query == READERS_STATISTICS_BATCH_QUERY:
+            return [
+                {
+                    "reader_id": reader_id,
+                    "total_records": len(HISTORY.get(reader_id, [])),
+                    "unique_books": len(HISTORY.get(reader_id, [])),
+                    "status_count": {},
+                }
+                for reader_id in params["reader_ids"]
+                if reader_id in READERS
+            ]
+        return []
+
+    async def execute_single_query(self, query, params=()):
+        if self._failed():
+            return None
+        if query == READER_INFO_QUERY:
+            return READERS.get(params[0])
+        if query == READER_HISTORY_QUERY:
+            reader_id = params["reader_id"]
+            if reader_id not in READERS:
+                return None
+            return {
+                "reader_info": READERS[reader_id],
+                "borrow_records": [dict(r) for r in HISTORY.get(reader_id, [])],
+                "total_records": 1,
+                "unique_books": 1,
+                "status_count": {"借阅中": 1},
+            }
+        return {"count": 0}
+
+
+class StubLibraryQuery(AsyncLibraryQuery):
+    """
+    使用伪造连接的 AsyncLibraryQuery，查询逻辑与分页校验保持不变
+    """
+
+    def __init__(self, config=None, search_backend=None):
+        super().__init__(config, "ilike")
+        self.db = FakeAsyncDatabase()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class StubClient:
+    async def get_recommendations_async(self, recent_books, query, count):
+        return []
+
+
+class TestASGI(unittest.TestCase):
+    """
+    ASGI 应用的测试套件，使用伪造的异步查询不依赖数据库
+    """
+
+    def setUp(self):
+        patches = (
+            mock.patch.object(asgi, "AsyncLibraryQuery", StubLibraryQuery),
+            mock.patch.object(
+                recommendation_service, "AsyncLibraryQuery", StubLibraryQuery
+            ),
+            mock.patch.object(
+                recommendation_service,
+                "get_recommendation_client",
+                lambda model: StubClient(),
+            ),
+            mock.patch.object(FakeAsyncDatabase, "failing", False),
+            mock.patch.object(asgi.QueryConfig, "CATALOG_ENABLED", False),
+        )
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for reader_id in ("R1", "NOPE"):
+            invalidate_reader(reader_id)
+            self.addCleanup(invalidate_reader, reader_id)
+        self.client = TestClient(create_asgi_app())
+
+    def get(self, path: str, **kwargs):
+        return self.client.get(f"{API_PREFIX}{path}", **kwargs)
+
+    def test_books_bad_arguments(self):
+        for path in (
+            "/books?after=bad",
+            "/books?page=x",
+            "/books?page=0",
+            "/books/search?search=网络&after=bad",
+            "/books/search?year=abc",
+        ):
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("message", response.json())
+        self.assertEqual(self.get("/books?limit=5").status_code, 200)
+
+    def test_reader_not_found(self):
+        for path in (
+            "/readers/NOPE",
+            "/readers/NOPE/history",
+            "/readers/NOPE/full-history",
+            "/readers/NOPE/recommendations",
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path).status_code, 404)
+        self.assertEqual(self.get("/readers/R1/history?limit=x").status_code, 400)
+
+    def test_reader_found(self):
+        self.assertEqual(self.get("/readers/R1").json()["department"], "音乐系")
+        records = self.get("/readers/R1/history").json()
+        self.assertEqual(records[0]["book"]["author"], "曹雪芹")
+        history = self.get("/readers/R1/full-history").json()
+        self.assertEqual(history["borrow_records"][0]["book"]["book_id"], "B1")
+
+    def post_batch(self, **kwargs):
+        return self.client.post(f"{API_PREFIX}/readers/batch", **kwargs)
+
+    def test_batch_validation(self):
+        for payload in (
+            {"reader_ids": "R1"},
+            {"reader_ids": ["R1", 2]},
+            {"reader_ids": ["R1"], "limit": "10"},
+            {"reader_ids": ["R1"], "limit": 1.5},
+            {"reader_ids": ["R1"], "limit": True},
+            {"reader_ids": ["R1"], "statistics_only": "yes"},
+            ["R1"],
+        ):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post_batch(json=payload).status_code, 400)
+        response = self.post_batch(
+            content="not json", headers={"Content-Type": "application/json"}
+        )
+        self.assertEqual(response.status_code, 400)
+        with mock.patch.object(asgi.QueryConfig, "READER_BATCH_MAX_SIZE", 1):
+            response = self.post_batch(json={"reader_ids": ["R1", "R2"]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_reports_missing(self):
+        response = self.post_batch(json={"reader_ids": ["R1", "NOPE"], "limit": 5})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([r["reader_id"] for r in data["readers"]], ["R1"])
+        self.assertEqual(
+            data["readers"][0]["borrow_records"][0]["book"]["title"], "红楼梦"
+        )
+        self.assertEqual(data["missing"], ["NOPE"])
+
+        response = self.post_batch(
+            json={"reader_ids": ["R1", "NOPE"], "statistics_only": True}
+        )
+        data = response.json()
+        self.assertEqual(data["readers"][0]["statistics"]["total_records"], 1)
+        self.assertEqual(data["missing"], ["NOPE"])
+
+    def test_recommendation_history_not_cached_on_error(self):
+        key = reader_cache_key("borrow_history", "R1", 10)
+        FakeAsyncDatabase.failing = True
+        self.get("/readers/R1/recommendations")
+        self.assertNotIn(key, reader_cache, "查询出错时的空结果不应缓存")
+
+        FakeAsyncDatabase.failing = False
+        self.get("/readers/NOPE/recommendations")
+        self.assertNotIn(reader_cache_key("borrow_history", "NOPE", 10), reader_cache)
+        self.get("/readers/R1/recommendations")
+        self.assertEqual(reader_cache.get(key)[0]["book_title"], "红楼梦")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from src.load.bulk_load import ParquetCSVStream, source_files
+
+
+class TestBulkLoad(unittest.TestCase):
+    """
+    批量导入的 COPY 数据流测试套件
+    """
+
+    def test_stream_csv_batches(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            parquet_file = os.path.join(tmpdir, "readers.parquet")
+            pd.DataFrame(
+                {
+                    "ID": ["R1", "R2", "R3"],
+                    "ENROLLYEAR": [2020, None, 2022],
+                    "DEPARTMENT": ["信息学院", "", "文学院, 二系"],
+                }
+            ).to_parquet(parquet_file, index=False)
+            stream = ParquetCSVStream(
+                parquet_file, ["ID", "ENROLLYEAR", "DEPARTMENT"], batch_size=2
+            )
+            chunks = []
+            while True:
+                chunk = stream.read(7)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+
+        lines = b"".join(chunks).decode("utf-8").splitlines()
+        self.assertEqual(stream.rows, 3)
+        # 缺失的整数写为未加引号的空值，COPY 会识别为 NULL；空字符串保留引号
+        self.assertEqual(
+            lines,
+            ['"R1",2020,"信息学院"', '"R2",,""', '"R3",2022,"文学院, 二系"'],
+        )
+
+    def test_stream_read_offsets(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            parquet_file = os.path.join(tmpdir, "books.parquet")
+            pd.DataFrame({"ID": [f"B{i}" for i in range(10)]}).to_parquet(
+                parquet_file, index=False
+            )
+            expected = ParquetCSVStream(parquet_file, ["ID"], batch_size=3).read()
+            stream = ParquetCSVStream(parquet_file, ["ID"], batch_size=3)
+            # 单次读取不跨越批次，余下部分可一次读完
+            first = stream.read(1 << 20)
+            rest = stream.read(4) + stream.read()
+
+        self.assertEqual(first, b'"B0"\n"B1"\n"B2"\n')
+        self.assertEqual(first + rest, expected)
+        self.assertEqual(expected.count(b"\n"), 10)
+        self.assertEqual(stream.read(5), b"")
+
+    def test_source_files_prefer_shards(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            spec = {
+                "file": os.path.join(tmpdir, "borrow_records.parquet"),
+                "shards": os.path.join(tmpdir, "borrow_records"),
+            }
+            self.assertEqual(source_files(spec), [])
+            pd.DataFrame({"ID": ["BR0"]}).to_parquet(spec["file"], index=False)
+            self.assertEqual(source_files(spec), [spec["file"]])
+
+            # 分片模式的输出按文件名顺序导入，全量文件不再参与
+            os.makedirs(spec["shards"])
+            for shard in (1, 0):
+                pd.DataFrame({"ID": [f"BR{shard}1", f"BR{shard}2"]}).to_parquet(
+                    os.path.join(spec["shards"], f"part-{shard:05d}.parquet"),
+                    index=False,
+                )
+            files = source_files(spec)
+            self.assertEqual(
+                [os.path.basename(f) for f in files],
+                ["part-00000.parquet", "part-00001.parquet"],
+            )
+            data = ParquetCSVStream(files, ["ID"], batch_size=10).read()
+        self.assertEqual(data, b'"BR01"\n"BR02"\n"BR11"\n"BR12"\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import time
+import unittest
+from src.query.cache import LRUCache
+from src.query.library_query import (
+    get_or_set_reader,
+    get_or_set_reader_async,
+    invalidate_reader,
+)
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    LRU 缓存的测试套件
+    """
+
+    def test_lru_eviction(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertNotIn("b", cache, "最久未使用的条目应被淘汰")
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiration(self):
+        cache = LRUCache(ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        stats = cache.stats()
+        self.assertEqual((stats["expirations"], stats["misses"]), (1, 1))
+
+    def test_max_bytes(self):
+        cache = LRUCache(max_bytes=200)
+        cache.set("a", "x" * 80)
+        cache.set("b", "y" * 80)
+        cache.set("c", "z" * 80)
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.stats()["bytes"], 200)
+        cache.set("big", "w" * 500)
+        self.assertNotIn("big", cache, "超过字节上限的单个值不应缓存")
+
+    def test_invalidate_tag(self):
+        cache = LRUCache()
+        cache.set(("info", "R1"), 1, tags=("R1",))
+        cache.set(("stats", "R1"), 2, tags=("R1",))
+        cache.set(("info", "R2"), 3, tags=("R2",))
+        self.assertEqual(cache.invalidate_tag("R1"), 2)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get(("info", "R2")), 3)
+        self.assertEqual(cache.invalidate_tag("R1"), 0)
+
+    def test_reader_get_or_set_shared_by_async(self):
+        cache = LRUCache()
+        calls = []
+
+        def load():
+            calls.append(1)
+            return [{"book_id": "B1"}]
+
+        async def load_async():
+            calls.append(1)
+            return []
+
+        history = get_or_set_reader("borrow_history", "R1", (10,), load, cache=cache)
+        cached = asyncio.run(
+            get_or_set_reader_async(
+                "borrow_history", "R1", (10,), load_async, cache=cache
+            )
+        )
+        self.assertEqual(cached, history, "异步查询应命中同步查询写入的缓存")
+        self.assertEqual(len(calls), 1)
+
+        # store 为假的结果不缓存，失效读者后重新查询
+        self.assertEqual(
+            asyncio.run(
+                get_or_set_reader_async("statistics", "R1", (), load_async, cache=cache)
+            ),
+            [],
+        )
+        self.assertNotIn(("statistics", "R1"), cache)
+        invalidate_reader("R1", cache)
+        get_or_set_reader("borrow_history", "R1", (10,), load, cache=cache)
+        self.assertEqual(len(calls), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,237 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from src.clean import clean_books_csv, clean_readers_csv
+from src.clean.dataset import dataset_files, read_dataset
+from src.clean.incremental import encode_ids
+from src.clean.utils import ChunkedExporter, ValueCounters, non_blank_mask
+
+
+class TestCleanCSV(unittest.TestCase):
+    """
+    分块清洗与多进程清洗的测试套件
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.readers_file = os.path.join(self.temp_dir.name, "readers.csv")
+        pd.DataFrame(
+            {
+                "NO": range(8),
+                "ID": [
+                    "PCSAS00001",
+                    "PCSAS00002",
+                    "bad",
+                    " PCSAS00001 ",
+                    "PCSAS00003",
+                    "PCSAS00002",
+                    "PCSAS00004",
+                    "PCSAS00005",
+                ],
+                "GENDER": ["F", "m", "F", "M", "X", "F", "F", "M"],
+                "ENROLLYEAR": [
+                    "2016",
+                    "2020.0",
+                    "2018",
+                    "2019",
+                    "2018",
+                    "2017",
+                    "",
+                    "2021",
+                ],
+                "TYPE": [
+                    "本科生",
+                    " 研究生 ",
+                    "本科生",
+                    "本科生",
+                    "本科生",
+                    "教师",
+                    "本科生",
+                    "本科生",
+                ],
+                "DEPARTMENT": ["音乐系"] * 8,
+            }
+        ).to_csv(self.readers_file, index=False)
+        self.books_file = os.path.join(self.temp_dir.name, "books.csv")
+        pd.DataFrame(
+            {
+                "NO": range(5),
+                "ID": [f"BK{i:06d}" for i in range(5)],
+                "TITLE": ["数据管理", "算法", " ", "红楼梦", "编程"],
+                "AUTHOR": ["张三"] * 5,
+                "PUBLISHER": [
+                    "人民出版社, ",
+                    "Springer",
+                    "清华大学出版社",
+                    "中华书局",
+                    "x",
+                ],
+                "YEAR": ["1996", "2001.0", "2010", "20x", "2010.5"],
+                "CALLNO": ["TP312/1"] * 5,
+                "LANGUAGE": ["中文"] * 5,
+                "DOCTYPE": ["图书"] * 5,
+            }
+        ).to_csv(self.books_file, index=False)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_non_blank_mask(self):
+        df = pd.DataFrame(
+            {"ID": ["A", " ", "B", "C", None], "YEAR": [1, 2, None, 4, 5]}
+        )
+        self.assertEqual(non_blank_mask(df).tolist(), [True, False, False, True, False])
+        self.assertTrue(clean_readers_csv.validate_id("PCSAS00001"))
+        self.assertFalse(clean_readers_csv.validate_id("PCSAS０００01"))
+
+    def test_value_counters(self):
+        df = pd.DataFrame(
+            {
+                "LANGUAGE": ["英文", "中文", "中文", "日文", "英文", "法文"],
+                "YEAR": [3, 1, 2, 1, 3, 3],
+            }
+        )
+        counters = ValueCounters(["LANGUAGE", "YEAR"])
+        counters.update(df.iloc[:2])
+        rest = ValueCounters(["LANGUAGE", "YEAR"])
+        rest.update(df.iloc[2:])
+        counters.merge(rest)
+        self.assertEqual(counters.total, len(df))
+        self.assertEqual(
+            list(counters.most_common("LANGUAGE").items()),
+            list(df["LANGUAGE"].value_counts().to_dict().items()),
+            "合并后的分布及同次数取值的顺序应与 value_counts 一致",
+        )
+        self.assertEqual(counters.most_common("LANGUAGE", 1), {"英文": 2})
+        self.assertEqual(counters.sorted_by_value("YEAR"), {1: 2, 2: 1, 3: 3})
+
+    def test_chunked_exporter(self):
+        parquet_file = os.path.join(self.temp_dir.name, "out", "books.parquet")
+        csv_file = os.path.join(self.temp_dir.name, "out", "books.csv")
+        exporter = ChunkedExporter(parquet_file, csv_file)
+        exporter.write(pd.DataFrame({"NO": [1, 2], "ID": ["A", "B"]}))
+        exporter.write(pd.DataFrame({"NO": [3.0], "ID": ["C"]}))
+        self.assertFalse(os.path.exists(parquet_file), "完成前不应替换目标文件")
+        exporter.close()
+        expected = pd.DataFrame({"NO": [1, 2, 3], "ID": ["A", "B", "C"]})
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(parquet_file), expected, check_dtype=False
+        )
+        pd.testing.assert_frame_equal(
+            pd.read_csv(csv_file), expected, check_dtype=False
+        )
+
+        exporter = ChunkedExporter(parquet_file, csv_file)
+        exporter.write(pd.DataFrame({"NO": [9], "ID": ["Z"]}))
+        exporter.abort()
+        self.assertEqual(len(pd.read_parquet(parquet_file)), 3, "中止时应保留原有文件")
+        self.assertEqual(
+            sorted(os.listdir(os.path.dirname(parquet_file))),
+            ["books.csv", "books.parquet"],
+        )
+
+    def test_readers_dedup_across_chunks(self):
+        with mock.patch.object(clean_readers_csv, "CHUNK_SIZE", 3):
+            df = clean_readers_csv.clean_csv_to_dataframe(1, self.readers_file)
+            parallel = clean_readers_csv.clean_csv_to_dataframe(2, self.readers_file)
+        self.assertEqual(
+            df["ID"].tolist(),
+            ["PCSAS00001", "PCSAS00002", "PCSAS00005"],
+            "跨分块的重复 ID 应只保留第一次出现的记录",
+        )
+        self.assertEqual(df["NO"].tolist(), [0, 1, 7])
+        self.assertEqual(df["TYPE"].tolist(), ["本科生", "研究生", "本科生"])
+        pd.testing.assert_frame_equal(df, parallel)
+
+    def test_arrow_engine(self):
+        for module, csv_file in (
+            (clean_readers_csv, self.readers_file),
+            (clean_books_csv, self.books_file),
+        ):
+            # 第一条记录的 NO 不是整数，应被清洗掉而不是使读取失败
+            dirty_file = os.path.join(
+                self.temp_dir.name, f"dirty_{module.__name__}.csv"
+            )
+            with open(csv_file, "rb") as f:
+                lines = f.readlines()
+            lines[1] = b"x" + lines[1][1:]
+            with open(dirty_file, "wb") as f:
+                f.writelines(lines)
+
+            for source in (csv_file, dirty_file):
+                with mock.patch.object(module, "CHUNK_SIZE", 3):
+                    expected = module.clean_csv_to_dataframe(1, source, "pandas")
+                    df = module.clean_csv_to_dataframe(1, source, "arrow")
+                self.assertIsInstance(df["ID"].dtype, pd.StringDtype)
+                self.assertTrue(pd.api.types.is_integer_dtype(df["NO"]))
+                pd.testing.assert_frame_equal(
+                    df.astype(object), expected.astype(object), check_dtype=False
+                )
+            self.assertNotIn(0, df["NO"].tolist())
+
+    def run_readers_main(self, out_dir: str, csv_file: str, incremental: bool):
+        paths = {
+            "CSV_FILE": csv_file,
+            "PARQUET_FILE": os.path.join(out_dir, "readers.parquet"),
+            "CLEANED_CSV_FILE": os.path.join(out_dir, "readers_cleaned.csv"),
+            "STATS_OUTPUT": os.path.join(out_dir, "readers_stats.json"),
+            "STATE_FILE": os.path.join(out_dir, "state", "readers_state.json"),
+            "COUNTS_FILE": os.path.join(out_dir, "state", "readers_counts.json"),
+            "SEEN_IDS_FILE": os.path.join(out_dir, "state", "readers_ids.npy"),
+            "CHUNK_SIZE": 3,
+        }
+        with mock.patch.multiple(clean_readers_csv, **paths):
+            clean_readers_csv.main(incremental=incremental)
+        return paths
+
+    def test_readers_incremental(self):
+        with open(self.readers_file, "rb") as f:
+            lines = f.readlines()
+        delta_file = os.path.join(self.temp_dir.name, "delta.csv")
+        delta_dir = os.path.join(self.temp_dir.name, "delta")
+        with open(delta_file, "wb") as f:
+            f.writelines(lines[:5])
+        self.run_readers_main(delta_dir, delta_file, True)
+        with open(delta_file, "ab") as f:
+            f.writelines(lines[5:])
+        paths = self.run_readers_main(delta_dir, delta_file, True)
+        full = self.run_readers_main(
+            os.path.join(self.temp_dir.name, "full"), self.readers_file, False
+        )
+
+        self.assertEqual(len(dataset_files(paths["PARQUET_FILE"])), 2)
+        pd.testing.assert_frame_equal(
+            read_dataset(paths["PARQUET_FILE"]).to_pandas(),
+            pd.read_parquet(full["PARQUET_FILE"]),
+            "增量清洗应与全量清洗结果一致，之前已清洗的读者 ID 不应重复写入",
+        )
+        for key in ("CLEANED_CSV_FILE", "STATS_OUTPUT"):
+            with open(paths[key], "rb") as a, open(full[key], "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+        # 原始文件开头被改写时回退为全量清洗，增量分片被清除
+        with open(delta_file, "wb") as f:
+            f.writelines(lines[:1] + lines[2:])
+        self.run_readers_main(delta_dir, delta_file, True)
+        self.assertEqual(dataset_files(paths["PARQUET_FILE"]), [paths["PARQUET_FILE"]])
+
+    def test_encode_ids(self):
+        ids = ["AAA00001", "ZZZZZ99999", "AAAA00001", "PCSAS00001", "AAA00002"]
+        codes = encode_ids(ids)
+        self.assertEqual(len(set(codes.tolist())), len(ids))
+        self.assertEqual(codes[0], (1 * 27 * 27 + 1 * 27 + 1) * 100000 + 1)
+
+    def test_books_parallel(self):
+        with mock.patch.object(clean_books_csv, "CHUNK_SIZE", 2):
+            df = clean_books_csv.clean_csv_to_dataframe(1, self.books_file)
+            parallel = clean_books_csv.clean_csv_to_dataframe(2, self.books_file)
+        self.assertEqual(df["ID"].tolist(), ["BK000000", "BK000001"])
+        self.assertEqual(df["PUBLISHER"].tolist(), ["人民出版社", "Springer"])
+        self.assertEqual(df["YEAR"].tolist(), [1996, 2001])
+        pd.testing.assert_frame_equal(df, parallel)
+
+
+if __name__ == "__main__":
+    unittest.main()
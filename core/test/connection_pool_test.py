@@ -0,0 +1,133 @@
+import os
+import threading
+import unittest
+from unittest import mock
+import psycopg2.extensions
+from src.query import connection_pool
+from src.query.config import Config
+from src.query.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def execute(self, query, params=()):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor()
+
+    def rollback(self):
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = 1
+
+
+class FakePool(ConnectionPool):
+    def _create(self):
+        conn = FakeConnection()
+        with self._cond:
+            self._uses[id(conn)] = 0
+            self._counters["created"] += 1
+        return conn
+
+
+class TestConnectionPool(unittest.TestCase):
+    """
+    ConnectionPool 的测试套件，使用伪造连接不依赖数据库
+    """
+
+    def test_reuse_connection(self):
+        pool = FakePool(min_size=1, max_size=2, timeout=1, max_uses=10)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(), conn, "归还的连接应被复用")
+        self.assertEqual(pool.stats()["created"], 1)
+
+    def test_checkout_timeout(self):
+        pool = FakePool(min_size=0, max_size=1, timeout=0.05, max_uses=10)
+        pool.getconn()
+        with self.assertRaises(PoolTimeoutError):
+            pool.getconn()
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        pool = FakePool(min_size=0, max_size=1, timeout=2, max_uses=10)
+        conn = pool.getconn()
+        timer = threading.Timer(0.05, pool.putconn, args=(conn,))
+        timer.start()
+        self.assertIs(pool.getconn(), conn, "等待者应拿到被归还的连接")
+        timer.join()
+
+    def test_recycle_after_max_uses(self):
+        pool = FakePool(min_size=0, max_size=1, timeout=1, max_uses=2)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        pool.putconn(pool.getconn())
+        self.assertTrue(conn.closed, "达到最大使用次数的连接应被关闭")
+        self.assertIsNot(pool.getconn(), conn)
+        self.assertEqual(pool.stats()["recycled"], 1)
+
+    def test_unhealthy_connection_replaced(self):
+        pool = FakePool(min_size=1, max_size=1, timeout=1, max_uses=10)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.closed = 1
+        self.assertIsNot(pool.getconn(), conn, "已断开的连接不应被借出")
+        self.assertEqual(pool.stats()["discarded"], 1)
+
+    def test_open_transaction_rolled_back(self):
+        pool = FakePool(min_size=0, max_size=1, timeout=1, max_uses=10)
+        conn = pool.getconn()
+        conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        pool.putconn(conn)
+        self.assertEqual(
+            conn.get_transaction_status(),
+            psycopg2.extensions.TRANSACTION_STATUS_IDLE,
+        )
+
+    def test_forked_child_keeps_inherited_pools(self):
+        inherited = FakePool(min_size=1, max_size=1, timeout=1, max_uses=10)
+        conn = inherited.getconn()
+        key = connection_pool._pool_key(Config())
+        state = (dict(connection_pool._pools), connection_pool._pools_pid)
+        self.addCleanup(self.restore_pools, *state)
+        connection_pool._pools.clear()
+        connection_pool._pools[key] = inherited
+        # 模拟 fork 后的子进程: 记录的进程号与当前进程不同
+        connection_pool._pools_pid = os.getpid() + 1
+
+        with mock.patch.object(
+            connection_pool,
+            "ConnectionPool",
+            lambda config: FakePool(config, min_size=0, max_size=1),
+        ):
+            pool = connection_pool.get_pool()
+        self.assertIsNot(pool, inherited, "子进程应创建自己的连接池")
+        self.assertIn(inherited, connection_pool._inherited_pools)
+        connection_pool.close_pools()
+        self.assertFalse(conn.closed, "父进程的连接不应在子进程中关闭")
+
+    def restore_pools(self, pools, pid):
+        connection_pool._inherited_pools.clear()
+        connection_pool._pools.clear()
+        connection_pool._pools.update(pools)
+        connection_pool._pools_pid = pid
+
+
+if __name__ == "__main__":
+    unittest.main()
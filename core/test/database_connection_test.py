@@ -0,0 +1,47 @@
+import unittest
+import psycopg2
+from src.query.database_connection import DatabaseConnection
+
+
+class FailingCursor:
+    def __init__(self):
+        self.closed = False
+
+    def execute(self, query, params=()):
+        raise psycopg2.OperationalError("server closed the connection")
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cursors = []
+        self.rolled_back = False
+
+    def cursor(self, name=None, cursor_factory=None):
+        cursor = FailingCursor()
+        self.cursors.append(cursor)
+        return cursor
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+class TestDatabaseConnection(unittest.TestCase):
+    """
+    DatabaseConnection 的测试套件，使用伪造连接不依赖数据库
+    """
+
+    def test_iter_query_raises_after_cleanup(self):
+        db = DatabaseConnection(pooled=False)
+        db.conn = FakeConnection()
+        for row_format in ("dict", "arrow"):
+            with self.assertRaises(psycopg2.OperationalError):
+                list(db.iter_query("SELECT * FROM books", row_format=row_format))
+            self.assertTrue(db.conn.cursors[-1].closed, "出错时应关闭游标")
+            self.assertTrue(db.conn.rolled_back, "出错时应结束事务")
+
+
+if __name__ == "__main__":
+    unittest.main()
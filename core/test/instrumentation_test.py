@@ -0,0 +1,71 @@
+import unittest
+from src.query.instrumentation import (
+    QueryMetrics,
+    SlowQueryLog,
+    normalize_sql,
+    redact_params,
+    render_prometheus,
+)
+
+
+def make_event(query, duration, rows=1, error=None, params=()):
+    return {
+        "query": query,
+        "normalized": normalize_sql(query),
+        "params": params,
+        "duration": duration,
+        "rows": rows,
+        "error": error,
+        "explain": None,
+    }
+
+
+class TestInstrumentation(unittest.TestCase):
+    """
+    查询耗时统计与慢查询日志的测试套件
+    """
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT *\n  FROM books WHERE id IN (%s, %s,%s) LIMIT 10"),
+            "SELECT * FROM books WHERE id IN (%s, ...) LIMIT ?",
+        )
+        self.assertEqual(
+            normalize_sql("SELECT 'a''b' FROM t"), normalize_sql("SELECT 'c' FROM t")
+        )
+
+    def test_redact_params(self):
+        self.assertEqual(
+            redact_params({"reader_id": "R1", "ids": ["a", "b"], "year": None}),
+            {"reader_id": "<str>", "ids": "<list[2]>", "year": "NULL"},
+        )
+        self.assertEqual(redact_params(("R1", 10)), ["<str>", "<int>"])
+
+    def test_metrics_histogram(self):
+        metrics = QueryMetrics(buckets=(0.01, 0.1), max_statements=1)
+        metrics.record(make_event("SELECT 1", 0.005, rows=2))
+        metrics.record(make_event("SELECT  2", 0.05, rows=None, error="失败"))
+        metrics.record(make_event("SELECT * FROM t", 1.0))
+        snapshot = metrics.snapshot()
+        self.assertEqual(set(snapshot), {"SELECT ?", "<other>"}, "超过上限的语句应合并")
+        stats = snapshot["SELECT ?"]
+        self.assertEqual(stats["buckets"], [1, 1])
+        self.assertEqual((stats["count"], stats["rows"], stats["errors"]), (2, 2, 1))
+
+        text = render_prometheus([("db_pool", {}, {"size": 3})], metrics=metrics)
+        self.assertIn('le="0.1"} 2', text)
+        self.assertIn('le="+Inf"} 2', text)
+        self.assertIn("db_pool_size 3", text)
+
+    def test_slow_query_log(self):
+        log = SlowQueryLog(threshold=0.1, explain=False, max_entries=2)
+        log(make_event("SELECT 1", 0.01))
+        log(make_event("SELECT %s", 0.2, params=("R1",)))
+        self.assertEqual(log.total, 1)
+        entry = log.entries()[0]
+        self.assertEqual(entry["params"], ["<str>"])
+        self.assertEqual(entry["duration_ms"], 200.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
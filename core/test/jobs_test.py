@@ -0,0 +1,95 @@
+import os
+import tempfile
+import time
+import unittest
+from src.api import jobs
+from src.progress import report_progress
+
+
+def slow_job():
+    for step in range(1, 5):
+        time.sleep(0.1)
+        report_progress(step * 100, step / 4)
+
+
+def failing_job():
+    raise RuntimeError("输入文件不存在")
+
+
+class TestJobs(unittest.TestCase):
+    """
+    后台任务的测试套件
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.jobs_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def wait(self, job_id: str) -> dict:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            job = jobs.load_job(job_id, self.jobs_dir)
+            if job["status"] in jobs.FINISHED_STATUSES:
+                return job
+            time.sleep(0.05)
+        self.fail("任务未在限定时间内完成")
+
+    def wait_unlocked(self, job_type: str):
+        deadline = time.monotonic() + 5
+        while jobs._lock_holder(job_type, self.jobs_dir) is not None:
+            if time.monotonic() >= deadline:
+                self.fail("任务结束后锁未释放")
+            time.sleep(0.01)
+
+    def test_single_run_per_type(self):
+        job, created = jobs.submit_job("slow", self.jobs_dir, slow_job)
+        self.assertTrue(created)
+        other, created = jobs.submit_job("slow", self.jobs_dir, slow_job)
+        self.assertFalse(created, "同一类型同时只能有一个任务")
+        self.assertEqual(other["id"], job["id"])
+
+        job = self.wait(job["id"])
+        summary = jobs.job_summary(job)
+        self.assertEqual(summary["status"], "succeeded")
+        self.assertEqual(summary["progress"], 100.0)
+        self.assertEqual(summary["rows_processed"], 400)
+        self.assertGreater(summary["throughput"], 0)
+        self.wait_unlocked("slow")
+        self.assertEqual(os.listdir(self.jobs_dir), [f"{job['id']}.json"])
+
+        _, created = jobs.submit_job("slow", self.jobs_dir, slow_job)
+        self.assertTrue(created, "上一个任务结束后应可再次提交")
+
+    def test_failed_job(self):
+        job, _ = jobs.submit_job("failing", self.jobs_dir, failing_job)
+        job = self.wait(job["id"])
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["error"], "输入文件不存在")
+        self.assertIsNone(jobs.load_job("../failing", self.jobs_dir))
+
+    def test_stale_lock(self):
+        # 持有锁的任务所在进程已不存在，例如服务重启前提交的任务
+        stale = {"id": "0" * 32, "type": "slow", "status": "running", "pid": None}
+        jobs._write_job(stale, self.jobs_dir)
+        with open(os.path.join(self.jobs_dir, "slow.lock"), "w") as f:
+            f.write(stale["id"])
+        job, created = jobs.submit_job("slow", self.jobs_dir, slow_job)
+        self.assertTrue(created)
+        self.wait(job["id"])
+
+    def test_release_only_own_lock(self):
+        lock_file = os.path.join(self.jobs_dir, "slow.lock")
+        with open(lock_file, "w") as f:
+            f.write("a" * 32)
+        jobs._release_lock("slow", "b" * 32, self.jobs_dir)
+        self.assertEqual(jobs._lock_holder("slow", self.jobs_dir), "a" * 32)
+        self.assertEqual(os.listdir(self.jobs_dir), ["slow.lock"])
+        jobs._release_lock("slow", "a" * 32, self.jobs_dir)
+        self.assertEqual(os.listdir(self.jobs_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
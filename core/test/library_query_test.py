@@ -1,6 +1,68 @@
 import time
 import unittest
-from src.query.library_query import LibraryQuery, CachedLibraryQuery
+from datetime import date
+import psycopg2
+from src.query.base_query import READER_INFO_QUERY
+from src.query.cache import LRUCache
+from src.query.library_query import (
+    READER_BORROW_HISTORY_QUERY,
+    READER_STATS_QUERY,
+    LibraryQuery,
+    CachedLibraryQuery,
+    nest_borrow_record,
+    parse_reader_history,
+    parse_reader_statistics,
+)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.query = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def execute(self, query, params=()):
+        if self.conn.failing:
+            raise psycopg2.OperationalError("statement timeout")
+        self.query, self.reader_id = query, params[0]
+
+    def fetchone(self):
+        if self.query == READER_INFO_QUERY:
+            exists = self.reader_id in self.conn.readers
+            return {"reader_id": self.reader_id} if exists else None
+        if self.query == READER_STATS_QUERY:
+            return {"total_records": 0, "unique_books": 0}
+        return None
+
+    def fetchall(self):
+        if self.query == READER_BORROW_HISTORY_QUERY:
+            return list(self.conn.history.get(self.reader_id, []))
+        return []
+
+
+class FakeConnection:
+    """
+    按读者返回固定结果的伪造连接，failing 为真时所有语句执行失败
+    """
+
+    def __init__(self, readers=(), history=None):
+        self.readers = set(readers)
+        self.history = history or {}
+        self.failing = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
 
 
 class TestLibraryQuery(unittest.TestCase):
@@ -62,5 +124,136 @@ class TestLibraryQuery(unittest.TestCase):
             self.fail(f"缓存查询异常: {e}")
 
 
+class TestCachedLibraryQuery(unittest.TestCase):
+    """
+    CachedLibraryQuery 缓存写入条件的测试套件，使用伪造连接不依赖数据库
+    """
+
+    def setUp(self):
+        self.cache = LRUCache()
+        self.query = CachedLibraryQuery(cache=self.cache)
+        self.query.db.conn = FakeConnection(
+            readers=["R1", "R2"], history={"R1": [{"borrow_id": 1}]}
+        )
+
+    def test_failed_queries_not_cached(self):
+        self.query.db.conn.failing = True
+        self.assertEqual(self.query.get_reader_borrow_history("R1"), [])
+        self.assertEqual(self.query.get_reader_statistics("R1")["total_records"], 0)
+        self.assertEqual(len(self.cache), 0, "查询出错时的空结果不应缓存")
+
+        self.query.db.conn.failing = False
+        self.assertEqual(self.query.get_reader_borrow_history("R1"), [{"borrow_id": 1}])
+        self.assertIn(("borrow_history", "R1", 10), self.cache)
+
+    def test_unknown_reader_not_cached(self):
+        self.assertEqual(self.query.get_reader_statistics("NOPE")["total_records"], 0)
+        self.assertEqual(self.query.get_reader_borrow_history("NOPE"), [])
+        self.assertEqual(len(self.cache), 0, "不存在的读者不应缓存")
+
+        # 存在但没有借阅记录的读者照常缓存
+        self.query.get_reader_statistics("R2")
+        self.query.get_reader_borrow_history("R2")
+        self.assertIn(("statistics", "R2"), self.cache)
+        self.assertIn(("borrow_history", "R2", 10), self.cache)
+
+
+class TestReaderParsing(unittest.TestCase):
+    """
+    合并查询结果行解析的测试套件，不依赖数据库
+    """
+
+    def history_row(self, **overrides):
+        row = {
+            "reader_info": {"reader_id": "R1", "department": "音乐系"},
+            "borrow_records": [
+                {
+                    "borrow_id": 1,
+                    "book_id": "B1",
+                    "borrow_date": "2024-03-01",
+                    "due_date": "2024-04-01",
+                    "return_date": None,
+                    "status": "借阅中",
+                    "book_title": "红楼梦",
+                    "author": "曹雪芹",
+                    "publisher": "中华书局",
+                    "publish_year": 1982,
+                    "call_no": "I242",
+                    "language": "中文",
+                    "doc_type": "图书",
+                }
+            ],
+            "total_records": 3,
+            "unique_books": 2,
+            "status_count": {"借阅中": 1, "已归还": 2},
+        }
+        row.update(overrides)
+        return row
+
+    def test_parse_reader_history(self):
+        history = parse_reader_history(self.history_row())
+        record = history["borrow_records"][0]
+        # json_agg 序列化的日期应还原为 date，空值保持为 None
+        self.assertEqual(record["borrow_date"], date(2024, 3, 1))
+        self.assertEqual(record["due_date"], date(2024, 4, 1))
+        self.assertIsNone(record["return_date"])
+        self.assertEqual(history["reader_info"]["reader_id"], "R1")
+        self.assertEqual(
+            history["statistics"],
+            {
+                "total_records": 3,
+                "unique_books": 2,
+                "status_count": {"借阅中": 1, "已归还": 2},
+            },
+        )
+        nested = nest_borrow_record(record)
+        self.assertEqual(nested["book"]["title"], "红楼梦")
+        self.assertEqual(nested["book"]["publication_year"], 1982)
+
+    def test_parse_reader_history_without_records(self):
+        self.assertIsNone(parse_reader_history(None))
+        history = parse_reader_history(
+            self.history_row(
+                borrow_records=None,
+                total_records=0,
+                unique_books=0,
+                status_count=None,
+            )
+        )
+        self.assertEqual(history["borrow_records"], [])
+        self.assertEqual(history["statistics"]["status_count"], {})
+
+    def test_parse_reader_statistics(self):
+        empty = {"total_records": 0, "unique_books": 0, "status_count": {}}
+        self.assertEqual(parse_reader_statistics(None), empty)
+        self.assertEqual(
+            parse_reader_statistics(
+                {"total_records": None, "unique_books": None, "status_count": {}}
+            ),
+            empty,
+        )
+        stats = parse_reader_statistics(
+            {"total_records": "5", "unique_books": 4, "status_count": {"逾期": 5}}
+        )
+        self.assertEqual(stats["total_records"], 5)
+        self.assertEqual(stats["status_count"], {"逾期": 5})
+
+    def test_statistics_batch_reports_unknown_readers(self):
+        query = LibraryQuery()
+        query.db.conn = FakeConnection()
+        query.db.execute_query = lambda sql, params: [
+            {
+                "reader_id": "R1",
+                "total_records": 0,
+                "unique_books": 0,
+                "status_count": {},
+            }
+        ]
+        result = query.get_readers_statistics_batch(["R1", "NOPE", "R1"])
+        self.assertEqual(list(result), ["R1", "NOPE"])
+        self.assertEqual(result["R1"]["total_records"], 0)
+        self.assertIsNone(result["NOPE"], "不存在的读者应对应 None")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from src.query.pagination import (
+    count_cache,
+    decode_cursor,
+    encode_cursor,
+    keyset_condition,
+    normalize_filters,
+    resolve_total,
+    validate_page,
+)
+from src.query.base_query import books_list_plan, books_search_plan
+
+
+class TestPagination(unittest.TestCase):
+    """
+    键集分页游标的测试套件
+    """
+
+    def test_cursor_round_trip(self):
+        token = encode_cursor("title", "计算机网络", "BK000001")
+        self.assertEqual(decode_cursor(token, "title"), ("计算机网络", "BK000001"))
+
+    def test_cursor_sort_field_mismatch(self):
+        token = encode_cursor("publication_year", 2020, "BK000001")
+        with self.assertRaises(ValueError):
+            decode_cursor(token, "title")
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            decode_cursor("not-a-cursor", "title")
+
+    def test_keyset_condition_direction(self):
+        clause, params = keyset_condition("title", "ASC", "A", "BK1")
+        self.assertIn(">", clause)
+        self.assertEqual(params, ["A", "BK1"])
+        clause, params = keyset_condition("title", "DESC", None, "BK1")
+        self.assertIn("IS NOT NULL", clause)
+        self.assertEqual(params, ["BK1"])
+
+    def test_invalid_page_and_limit(self):
+        validate_page(1, 20)
+        for page, limit in ((0, 20), (-1, 20), (1, 0), (1, -5), (1, 100000)):
+            with self.assertRaises(ValueError):
+                validate_page(page, limit)
+        # 负数 OFFSET 不应传给数据库
+        with self.assertRaises(ValueError):
+            books_list_plan(page=0, limit=20, sort_by="title", sort_order="asc")
+        with self.assertRaises(ValueError):
+            books_search_plan("ilike", search="python", page=1, limit=0)
+
+    def test_cached_count_shared_by_normalized_filters(self):
+        count_cache.clear()
+        calls = []
+
+        def count_exact():
+            calls.append(1)
+            return 42
+
+        first = normalize_filters(search="Python", language="", year=None)
+        second = normalize_filters(search="python")
+        self.assertEqual(first, second)
+        # 首尾空白会改变 ILIKE 的匹配结果，不能与去除空白后的条件共用总数
+        self.assertNotEqual(normalize_filters(search=" python "), second)
+        self.assertEqual(resolve_total("cached", "books", first, count_exact, None), 42)
+        self.assertEqual(
+            resolve_total("cached", "books", second, count_exact, None), 42
+        )
+        self.assertEqual(len(calls), 1, "相同筛选条件应命中缓存")
+
+    def test_estimate_and_none_modes(self):
+        self.assertEqual(
+            resolve_total("estimate", "books", (), None, lambda: 1000), 1000
+        )
+        self.assertIsNone(resolve_total("none", "books", (), None, None))
+        with self.assertRaises(ValueError):
+            resolve_total("bogus", "books", (), None, None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.clean import clean_books_csv
+from src.pipeline import run_pipeline
+
+
+def copy_upper(source: str, target: str):
+    with open(source, "r", encoding="utf-8") as f:
+        content = f.read()
+    with open(target, "w", encoding="utf-8") as f:
+        f.write(content.upper())
+
+
+def concat(sources: list, target: str):
+    with open(target, "w", encoding="utf-8") as out:
+        for source in sources:
+            with open(source, "r", encoding="utf-8") as f:
+                out.write(f.read())
+
+
+class TestPipeline(unittest.TestCase):
+    """
+    增量流水线的测试套件
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manifest = self.path("manifest.json")
+        for name in ("a", "b"):
+            with open(self.path(f"{name}.txt"), "w", encoding="utf-8") as f:
+                f.write(name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.temp_dir.name, name)
+
+    def stages(self) -> dict:
+        stages = {}
+        for name in ("a", "b"):
+            source, target = self.path(f"{name}.txt"), self.path(f"{name}.out")
+            stages[name] = {
+                "run": copy_upper,
+                "args": (source, target),
+                "inputs": [source],
+                "outputs": [target],
+            }
+        stages["merged"] = {
+            "run": concat,
+            "args": ([self.path("a.out"), self.path("b.out")], self.path("merged")),
+            "inputs": [self.path("a.out"), self.path("b.out")],
+            "outputs": [self.path("merged")],
+            "depends": ["a", "b"],
+        }
+        return stages
+
+    def statuses(self, **kwargs) -> dict:
+        results = run_pipeline(self.stages(), manifest_file=self.manifest, **kwargs)
+        return {name: result["status"] for name, result in results.items()}
+
+    def test_incremental(self):
+        self.assertEqual(
+            self.statuses(workers=2), {"a": "done", "b": "done", "merged": "done"}
+        )
+        with open(self.path("merged"), "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "AB")
+        self.assertEqual(
+            self.statuses(workers=1),
+            {"a": "skipped", "b": "skipped", "merged": "skipped"},
+        )
+
+        # 内容不变时只更新修改时间不会触发重新执行
+        os.utime(self.path("a.txt"))
+        self.assertEqual(self.statuses(workers=1)["a"], "skipped")
+
+        with open(self.path("b.txt"), "w", encoding="utf-8") as f:
+            f.write("c")
+        self.assertEqual(
+            self.statuses(workers=1),
+            {"a": "skipped", "b": "done", "merged": "done"},
+            "输入变化的阶段及其下游应重新执行",
+        )
+
+        os.remove(self.path("merged"))
+        self.assertEqual(self.statuses(workers=1)["merged"], "done")
+        self.assertEqual(set(self.statuses(workers=1, force=True).values()), {"done"})
+
+    def test_failed_dependency(self):
+        os.remove(self.path("a.txt"))
+        self.assertEqual(
+            self.statuses(workers=1),
+            {"a": "failed", "b": "done", "merged": "blocked"},
+        )
+
+    def test_failed_stage_with_stale_outputs(self):
+        # 阶段执行失败时，上次留下的输出文件不能使其被视为完成
+        stages = {
+            "books": {
+                "run": clean_books_csv.main,
+                "args": (1, "pandas", False),
+                "outputs": [self.path("a.txt")],
+            }
+        }
+        with mock.patch.object(clean_books_csv, "CSV_FILE", self.path("missing.csv")):
+            results = run_pipeline(stages, workers=1, manifest_file=self.manifest)
+        self.assertEqual(results["books"]["status"], "failed")
+        self.assertIn("missing.csv", results["books"]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
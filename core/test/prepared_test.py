@@ -0,0 +1,45 @@
+import unittest
+from src.query.prepared import PREPARABLE_PATTERN, convert_placeholders
+
+
+class TestPreparedStatements(unittest.TestCase):
+    """
+    预备语句占位符转换的测试套件
+    """
+
+    def test_positional_placeholders(self):
+        sql, values = convert_placeholders(
+            "SELECT * FROM books WHERE title ILIKE %s AND note LIKE '100%%' LIMIT %s",
+            ("%网络%", 10),
+        )
+        self.assertEqual(
+            sql,
+            "SELECT * FROM books WHERE title ILIKE $1 AND note LIKE '100%' LIMIT $2",
+        )
+        self.assertEqual(values, ["%网络%", 10])
+
+    def test_named_placeholders(self):
+        sql, values = convert_placeholders(
+            "SELECT %(id)s, %(limit)s, %(id)s",
+            {"limit": 5, "id": "R1", "unused": 0},
+        )
+        self.assertEqual(sql, "SELECT $1, $2, $1", "同名参数应复用同一编号")
+        self.assertEqual(values, ["R1", 5])
+
+    def test_without_params(self):
+        query = "SELECT 1 WHERE 'a' LIKE 'a%'"
+        self.assertEqual(convert_placeholders(query, ()), (query, []))
+
+    def test_invalid_params(self):
+        with self.assertRaises(ValueError):
+            convert_placeholders("SELECT %s, %s", (1,))
+        with self.assertRaises(ValueError):
+            convert_placeholders("SELECT %(id)s", ("R1",))
+
+    def test_preparable_statements(self):
+        self.assertTrue(PREPARABLE_PATTERN.match("\n  WITH t AS (SELECT 1) SELECT *"))
+        self.assertFalse(PREPARABLE_PATTERN.match("CREATE INDEX ix ON books (title)"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from flask import Flask
+from flask_restx import Api, Namespace, Resource, fields, reqparse
+from src import catalog_version
+from src.api import auth, response_cache as response_cache_module
+from src.api.response_cache import cached_response, response_cache
+from src.query.config import Config as QueryConfig
+
+ns = Namespace("books")
+model = ns.model(
+    "图书列表",
+    {"page": fields.Integer, "limit": fields.Integer, "title": fields.String},
+)
+parser = reqparse.RequestParser()
+parser.add_argument("page", type=int, default=1)
+parser.add_argument("limit", type=int, default=20)
+calls = []
+
+
+class FakeCatalog:
+    """
+    模拟进程内目录，loaded_mtime 与 title 在重新加载后一起变化
+    """
+
+    loaded_mtime = 1.0
+    title = "旧书名"
+
+
+catalog = FakeCatalog()
+
+
+@ns.route("")
+class Books(Resource):
+    @cached_response("books", parser)
+    @ns.marshal_with(model)
+    def get(self):
+        args = parser.parse_args()
+        calls.append(args)
+        if args["limit"] <= 0:
+            ns.abort(400, "limit 无效")
+        return dict(args, title=catalog.title)
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    响应缓存与条件请求的测试套件
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.version_file = os.path.join(self.temp_dir.name, "catalog_version")
+        patches = (
+            mock.patch.object(catalog_version, "VERSION_FILE", self.version_file),
+            mock.patch.object(QueryConfig, "RESPONSE_CACHE_ENABLED", True),
+            mock.patch.object(auth, "API_KEY", "test-key"),
+        )
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        from src.api.routes import ops_ns
+
+        app = Flask(__name__)
+        api = Api(app)
+        api.add_namespace(ns, path="/books")
+        api.add_namespace(ops_ns, path="/operations")
+        self.client = app.test_client()
+        response_cache.clear()
+        calls.clear()
+        catalog.loaded_mtime, catalog.title = 1.0, "旧书名"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_cache_and_etag(self):
+        first = self.client.get("/books")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertIn("max-age=", first.headers["Cache-Control"])
+        etag = first.headers["ETag"]
+
+        second = self.client.get("/books?page=1&limit=20")
+        self.assertEqual(
+            second.headers["X-Cache"], "HIT", "默认参数应归一化为同一缓存键"
+        )
+        self.assertEqual(second.headers["ETag"], etag)
+        self.assertEqual(second.get_json(), first.get_json())
+        self.assertEqual(len(calls), 1)
+
+        not_modified = self.client.get("/books", headers={"If-None-Match": etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.data, b"")
+        self.assertEqual(not_modified.headers["ETag"], etag)
+
+        self.assertNotEqual(self.client.get("/books?page=2").headers["ETag"], etag)
+
+        # 清洗或导入后版本号递增，原 ETag 与缓存均失效
+        catalog_version.bump_catalog_version()
+        changed = self.client.get("/books", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.headers["X-Cache"], "MISS")
+        self.assertNotEqual(changed.headers["ETag"], etag)
+        self.assertEqual(catalog_version.catalog_version(), 1)
+
+    def test_not_modified_requires_fresh_entry(self):
+        etag = self.client.get("/books").headers["ETag"]
+        # 缓存条目过期 (此处直接清空) 后即使 ETag 一致也重新查询并返回完整响应
+        response_cache.clear()
+        response = self.client.get("/books", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Cache"], "MISS")
+        self.assertEqual(len(calls), 2)
+
+    def test_bump_before_catalog_reload(self):
+        patches = (
+            mock.patch.object(QueryConfig, "CATALOG_ENABLED", True),
+            mock.patch.object(response_cache_module, "get_catalog", lambda: catalog),
+        )
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        first = self.client.get("/books")
+        # 导出数据后版本号先递增，目录尚未在后台重新加载完成，此时的响应仍是旧内容
+        catalog_version.bump_catalog_version()
+        stale = self.client.get("/books")
+        self.assertEqual(stale.get_json()["title"], "旧书名")
+        self.assertNotEqual(stale.headers["ETag"], first.headers["ETag"])
+
+        # 目录重新加载后，新版本号下缓存的旧内容与 ETag 都不再使用
+        catalog.loaded_mtime, catalog.title = 2.0, "新书名"
+        fresh = self.client.get(
+            "/books", headers={"If-None-Match": stale.headers["ETag"]}
+        )
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.headers["X-Cache"], "MISS")
+        self.assertEqual(fresh.get_json()["title"], "新书名")
+        self.assertNotEqual(fresh.headers["ETag"], stale.headers["ETag"])
+
+    def test_invalidate_endpoint(self):
+        etag = self.client.get("/books").headers["ETag"]
+        response = self.client.post("/operations/cache/catalog")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.client.get("/books").headers["X-Cache"], "HIT")
+
+        # 外部服务直接写入 books 表后调用，版本号递增，缓存与 ETag 均失效
+        response = self.client.post(
+            "/operations/cache/catalog", headers={"X-API-KEY": "test-key"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["catalog_version"], 1)
+        self.assertEqual(len(response_cache), 0)
+        changed = self.client.get("/books", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.headers["X-Cache"], "MISS")
+
+    def test_errors_not_cached(self):
+        for _ in range(2):
+            response = self.client.get("/books?limit=0")
+            self.assertEqual(response.status_code, 400)
+            self.assertNotIn("ETag", response.headers)
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from src.query.catalog import CatalogIndex
+from src.query.search import InMemoryBookIndex, build_tsquery, tokenize
+
+
+class TestSearch(unittest.TestCase):
+    """
+    中文分词与进程内倒排索引的测试套件
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.parquet_file = os.path.join(cls.tmpdir.name, "books.parquet")
+        pd.DataFrame(
+            {
+                "NO": [1, 2, 3, 4],
+                "ID": ["B1", "B2", "B3", "B4"],
+                "TITLE": ["计算机网络", "Python 编程", "网络安全", "数据结构"],
+                "AUTHOR": ["谢希仁", "Mark", "张三", "严蔚敏计算机"],
+                "PUBLISHER": [
+                    "电子工业出版社",
+                    "O'Reilly",
+                    "清华大学出版社",
+                    "清华大学出版社",
+                ],
+                "YEAR": [2017, 2019, 2020, 2011],
+                "CALLNO": ["TP393/1", "TP312/2", "TP393/3", "TP311/4"],
+                "LANGUAGE": ["中文", "英文", "中文", "中文"],
+                "DOCTYPE": ["图书", "图书", "图书", "图书"],
+            }
+        ).to_parquet(cls.parquet_file, index=False)
+        cls.index = InMemoryBookIndex(cls.parquet_file).load()
+        cls.catalog = CatalogIndex(cls.parquet_file).load()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_tokenize_cjk_bigrams(self):
+        self.assertEqual(tokenize("计算机 TP312"), ["计算", "算机", "tp312"])
+        self.assertEqual(build_tsquery("网络 Py"), "'网络' & 'py':*")
+        # 单个汉字可能只作为二元组的第二个字被索引 (例如 "数学" 中的 "学")，回退到 ILIKE
+        self.assertIsNone(build_tsquery("学"))
+        self.assertIsNone(build_tsquery("网 Py"))
+        self.assertIsNone(build_tsquery("/ -"))
+
+    def test_substring_semantics(self):
+        result = self.index.search_books(search="网络")
+        self.assertEqual({b["book_id"] for b in result["books"]}, {"B1", "B3"})
+        result = self.index.search_books(search="计算机")
+        self.assertEqual(
+            result["books"][0]["book_id"], "B1", "书名命中应排在作者命中之前"
+        )
+        self.assertEqual(result["pagination"]["total"], 2)
+
+    def test_filters(self):
+        result = self.index.search_books(search="tp3", publisher="清华")
+        self.assertEqual({b["book_id"] for b in result["books"]}, {"B3", "B4"})
+        result = self.index.search_books(language="英文", year=2019)
+        self.assertEqual([b["book_id"] for b in result["books"]], ["B2"])
+
+    def test_cursor_pages_cover_results(self):
+        first = self.index.search_books(search="tp3", limit=3)
+        self.assertTrue(first["pagination"]["has_more"])
+        second = self.index.search_books(
+            search="tp3", limit=3, after=first["pagination"]["next_cursor"]
+        )
+        ids = [b["book_id"] for b in first["books"] + second["books"]]
+        self.assertEqual(sorted(ids), ["B1", "B2", "B3", "B4"])
+        self.assertFalse(second["pagination"]["has_more"])
+
+    def test_catalog_prefix_index(self):
+        rows = self.catalog.prefix_rows("call_no", "tp39")
+        self.assertEqual(
+            sorted(self.catalog.columns["book_id"][r] for r in rows), ["B1", "B3"]
+        )
+        result = self.catalog.search_books(search="网络")
+        self.assertEqual(result["books"][0]["book_id"], "B3", "书名前缀命中应排在前面")
+
+    def test_invalid_page_and_limit(self):
+        for kwargs in ({"page": 0}, {"limit": 0}):
+            with self.assertRaises(ValueError):
+                self.catalog.get_all_books(**kwargs)
+            with self.assertRaises(ValueError):
+                self.index.search_books(search="tp3", **kwargs)
+
+    def test_catalog_search_without_conditions(self):
+        # 无条件时走书名有序索引，结果与逐行扫描的内存索引一致
+        for limit in (2, 3):
+            expected = self.index.search_books(limit=limit)
+            result = self.catalog.search_books(limit=limit)
+            self.assertEqual(result["books"], expected["books"])
+            self.assertEqual(result["pagination"], expected["pagination"])
+            after = result["pagination"]["next_cursor"]
+            self.assertEqual(
+                self.catalog.search_books(limit=limit, after=after)["books"],
+                self.index.search_books(limit=limit, after=after)["books"],
+            )
+
+    def test_catalog_sorted_pages(self):
+        first = self.catalog.get_all_books(limit=3, sort_by="publication_year")
+        self.assertEqual([b["book_id"] for b in first["books"]], ["B4", "B1", "B2"])
+        self.assertEqual(first["pagination"]["total"], 4)
+        desc = self.catalog.get_all_books(
+            limit=2, sort_by="publication_year", sort_order="DESC"
+        )
+        second = self.catalog.get_all_books(
+            limit=2,
+            sort_by="publication_year",
+            sort_order="DESC",
+            after=desc["pagination"]["next_cursor"],
+        )
+        ids = [b["book_id"] for b in desc["books"] + second["books"]]
+        self.assertEqual(ids, ["B3", "B2", "B1", "B4"])
+        self.assertFalse(second["pagination"]["has_more"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -41,6 +41,18 @@ def test_get_reader_history(client):
     assert len(data) <= 3
 
 
+def test_get_readers_batch(client):
+    response = client.post(
+        "/api/v1/query/readers/batch",
+        json={"reader_ids": ["PCSCS19139", "NOT_EXISTS"], "limit": 3},
+    )
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [r["reader_id"] for r in data["readers"]] == ["PCSCS19139"]
+    assert len(data["readers"][0]["borrow_records"]) <= 3
+    assert data["missing"] == ["NOT_EXISTS"]
+
+
 def test_get_recommendations(client):
     # ollama 测试
     response = client.get(
@@ -74,7 +86,7 @@ def test_clean_books_authorized(client):
         "/api/v1/operations/cleaning/books", headers={"X-API-KEY": API_KEY}
     )
 
-    assert response.status_code == 200
+    assert response.status_code == 202
 
 
 def test_clean_readers_unauthorized(client):
@@ -90,7 +102,7 @@ def test_clean_readers_authorized(client):
         "/api/v1/operations/cleaning/readers", headers={"X-API-KEY": API_KEY}
     )
 
-    assert response.status_code == 200
+    assert response.status_code == 202
 
 
 def test_generate_borrow_records_unauthorized(client):
@@ -106,4 +118,4 @@ def test_generate_borrow_records_authorized(client):
         "/api/v1/operations/virtual/borrow-records", headers={"X-API-KEY": API_KEY}
     )
 
-    assert response.status_code == 200
+    assert response.status_code == 202
@@ -0,0 +1,148 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.virtual.virtual_borrow_records import (
+    BORROW_PERIOD_DAYS,
+    BorrowRecordWriter,
+    MAX_BORROWS_PER_READER,
+    MIN_BORROWS_PER_READER,
+    _init_worker,
+    calculate_department_probabilities,
+    calculate_department_weights,
+    extract_callno_prefixes,
+    generate_reader_records,
+    generate_shard,
+    get_callno_prefix,
+    plan_shards,
+)
+
+
+class TestVirtualBorrowRecords(unittest.TestCase):
+    """
+    向量化借阅记录生成的测试套件
+    """
+
+    def setUp(self):
+        self.readers = pd.DataFrame(
+            {
+                "ID": ["R1", "R2", "R3", "R4"],
+                "ENROLLYEAR": [2018, np.nan, 2020, 2030],
+                "DEPARTMENT": ["法学院", "法学院", "信息学院", "音乐系"],
+            }
+        )
+        self.books = pd.DataFrame(
+            {"ID": ["B1", "B2", "B3"], "CALLNO": ["D920/1", "TP312/2", "J6/3"]}
+        )
+        popularity = np.full(len(self.books), 1 / len(self.books))
+        self.probabilities = calculate_department_probabilities(
+            self.books, self.readers["DEPARTMENT"].unique(), popularity
+        )
+
+    def generate(self, seed: int, start_id: int = 1) -> pd.DataFrame:
+        return generate_reader_records(
+            self.readers,
+            self.books["ID"].to_numpy(),
+            self.probabilities,
+            np.random.default_rng(seed),
+            start_id,
+        ).to_pandas()
+
+    def test_callno_prefixes(self):
+        callnos = pd.Series(
+            ["D920/1", " TP312.8 ", "O4-1", "A1B2", "ABCD1", "12345", "x_y", "", None]
+        )
+        self.assertEqual(
+            extract_callno_prefixes(callnos).tolist(),
+            callnos.apply(get_callno_prefix).tolist(),
+            "向量化提取应与逐字符提取结果一致",
+        )
+        weights = calculate_department_weights(self.books, ["信息学院", "未知院系"])
+        self.assertEqual(weights["信息学院"].tolist(), [1.0, 3.0, 1.0])
+        self.assertEqual(weights["未知院系"].tolist(), [1.0, 1.0, 1.0])
+
+    def test_records(self):
+        df = self.generate(0, start_id=5)
+        self.assertEqual(
+            set(df["READER_ID"]), {"R1", "R3"}, "入学年份无效或过晚的读者不应生成记录"
+        )
+        self.assertTrue(df["READER_ID"].is_monotonic_increasing, "记录应按读者顺序排列")
+        counts = df.groupby("READER_ID").size()
+        self.assertTrue(
+            counts.between(MIN_BORROWS_PER_READER, MAX_BORROWS_PER_READER).all()
+        )
+        self.assertEqual(df["BORROW_ID"].iloc[0], "BR00000005")
+        self.assertTrue(df["BORROW_ID"].is_monotonic_increasing)
+
+        borrow = pd.to_datetime(df["BORROW_DATE"])
+        due = pd.to_datetime(df["DUE_DATE"])
+        returned = pd.to_datetime(df["RETURN_DATE"])
+        self.assertTrue((borrow[df["READER_ID"] == "R1"] >= "2018-09-01").all())
+        self.assertTrue(((due - borrow).dt.days == BORROW_PERIOD_DAYS).all())
+        self.assertTrue(returned[df["STATUS"] == "借阅中"].isna().all())
+        overdue = df["STATUS"] == "逾期归还"
+        on_time = df["STATUS"] == "已归还"
+        self.assertTrue((returned[overdue] > due[overdue]).all())
+        self.assertTrue((returned[on_time] <= due[on_time]).all())
+
+    def test_writer(self):
+        table = generate_reader_records(
+            self.readers,
+            self.books["ID"].to_numpy(),
+            self.probabilities,
+            np.random.default_rng(1),
+        )
+        self.assertEqual(table.schema.field("BORROW_DATE").type, pa.date32())
+        with tempfile.TemporaryDirectory() as output_dir:
+            parquet_path = os.path.join(output_dir, "records.parquet")
+            csv_path = os.path.join(output_dir, "records.csv")
+            with BorrowRecordWriter(parquet_path, csv_path, row_group_size=8) as writer:
+                writer.write(table.slice(0, 0))
+                self.assertFalse(os.path.exists(parquet_path), "没有记录时不应创建文件")
+                for offset in range(0, table.num_rows, 5):
+                    writer.write(table.slice(offset, 5))
+            self.assertEqual(writer.rows, table.num_rows)
+
+            metadata = pq.ParquetFile(parquet_path).metadata
+            sizes = [
+                metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)
+            ]
+            self.assertEqual(sum(sizes), table.num_rows)
+            self.assertTrue(all(size == 8 for size in sizes[:-1]), "行组应按行数切分")
+            self.assertTrue(pq.read_table(parquet_path).equals(table))
+            csv_df = pd.read_csv(csv_path)
+            self.assertEqual(len(csv_df), table.num_rows)
+            self.assertEqual(
+                csv_df["BORROW_DATE"].tolist(),
+                [d.isoformat() for d in table["BORROW_DATE"].to_pylist()],
+            )
+
+    def test_seed_reproducible(self):
+        pd.testing.assert_frame_equal(self.generate(42), self.generate(42))
+
+    def test_shards(self):
+        readers = pd.concat([self.readers] * 5, ignore_index=True)
+        readers["ID"] = [f"R{i:02d}" for i in range(len(readers))]
+        _init_worker(self.books["ID"].to_numpy(), self.probabilities)
+        _, tasks = plan_shards(readers, seed=3, shard_size=6)
+        self.assertEqual(len(tasks), 4)
+        with tempfile.TemporaryDirectory() as output_dir:
+            results = [generate_shard(task, output_dir) for task in reversed(tasks)]
+            results.sort(key=lambda result: result["shard"])
+            frames = [pd.read_parquet(result["path"]) for result in results]
+            rerun = generate_shard(
+                plan_shards(readers, seed=3, shard_size=6)[1][2], output_dir
+            )
+            pd.testing.assert_frame_equal(frames[2], pd.read_parquet(rerun["path"]))
+            self.assertEqual(len(os.listdir(output_dir)), 4)
+        df = pd.concat(frames, ignore_index=True)
+        expected = [f"BR{i:08d}" for i in range(1, len(df) + 1)]
+        self.assertEqual(df["BORROW_ID"].tolist(), expected, "分片的借阅 ID 应连续")
+        self.assertEqual(sum(result["rows"] for result in results), len(df))
+
+
+if __name__ == "__main__":
+    unittest.main()